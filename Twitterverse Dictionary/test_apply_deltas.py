@@ -0,0 +1,71 @@
+import io
+import unittest
+import twitterverse_functions as tf
+import twitterverse_deltas as td
+
+
+class TestApplyDeltas(unittest.TestCase):
+
+    def setUp (self):
+        """ Make a small Twitterverse where a and c follow b."""
+
+        self.twitter_data = tf.Twitterverse({\
+            'a':{'name':'Zed', 'location':'Toronto', 'web':'', 'bio':'', \
+                 'following':['b']}, 
+            'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', \
+                 'following':[]}, 
+            'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', \
+                 'following':['b']}})
+
+    def test_add_and_follow (self):
+        """ Test adding a user and a follow, and that the new follower is \
+        listed in dictionary order."""
+
+        count = td.apply_deltas(self.twitter_data, io.StringIO(\
+            "ADD d\nDee\n\n\nENDBIO\nb\nEND\n\nFOLLOW a c\nFOLLOW d a\n"))
+        self.assertEqual (3, count)
+        self.assertEqual (['a', 'c', 'd'], \
+                          tf.all_followers(self.twitter_data, 'b'))
+        self.assertEqual (['a'], tf.all_followers(self.twitter_data, 'c'))
+        self.assertEqual (['d'], tf.all_followers(self.twitter_data, 'a'))
+        self.assertEqual (['b', 'c'], self.twitter_data['a']['following'])
+
+    def test_unfollow_and_update (self):
+        """ Test an unfollow and a profile update, including the name \
+        filter and sorting by popularity afterwards."""
+
+        td.apply_deltas(self.twitter_data, io.StringIO(\
+            "UNFOLLOW a b\nUPDATE c\nname Annabelle\nbio\nHello\nthere\n" \
+            "ENDBIO\nEND\n"))
+        self.assertEqual (['c'], tf.all_followers(self.twitter_data, 'b'))
+        self.assertEqual ('Hello\nthere', self.twitter_data['c']['bio'])
+        self.assertEqual (['c'], tf.get_filter_results(self.twitter_data, \
+            ['a', 'b', 'c'], {'name-includes':'belle'}))
+        results = ['a', 'c', 'b']
+        tf.sort_by(self.twitter_data, results, {'sort-by':'popularity'})
+        self.assertEqual (['b', 'a', 'c'], results)
+
+    def test_delete_removes_follows (self):
+        """ Test that deleting a user also removes it from the following \
+        lists of its followers."""
+
+        td.apply_deltas(self.twitter_data, io.StringIO("DELETE b\n"))
+        self.assertNotIn ('b', self.twitter_data)
+        self.assertEqual ([], self.twitter_data['a']['following'])
+        self.assertEqual ([], tf.all_followers(self.twitter_data, 'b'))
+
+    def test_bad_deltas (self):
+        """ Test that deltas about missing or existing users are rejected."""
+
+        self.assertRaises (ValueError, td.apply_deltas, self.twitter_data, \
+                           io.StringIO("FOLLOW a x\n"))
+        self.assertRaises (ValueError, td.apply_deltas, self.twitter_data, \
+                           io.StringIO("ADD a\nZed\n\n\nENDBIO\nEND\n"))
+        self.assertRaises (ValueError, td.apply_deltas, self.twitter_data, \
+                           io.StringIO("RENAME a b\n"))
+        self.assertRaises (TypeError, td.apply_deltas, {}, \
+                           io.StringIO("DELETE a\n"))
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,85 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+import twitterverse_functions as tf
+import twitterverse_binary as tb
+import twitterverse_program as tp
+
+
+class TestBatchArguments(unittest.TestCase):
+
+    def setUp (self):
+        """ Make the parser of the arguments that follow --batch."""
+
+        self.parser = tp.batch_parser ()
+
+    def assertUsageError (self, arguments):
+        """ Assert that batch_main exits with a usage error for arguments."""
+
+        with contextlib.redirect_stderr (io.StringIO ()) as errors:
+            with self.assertRaises (SystemExit) as context:
+                tp.batch_main (arguments)
+        self.assertEqual (2, context.exception.code)
+        self.assertIn ('usage:', errors.getvalue ())
+
+    def test_options (self):
+        """ Test that every option is read, in any order, and that the data
+        file comes before one or more query sources."""
+
+        options = self.parser.parse_args (['--records', '--processes', '3', \
+            '--explain', '--metrics', 'm.json', 'data.txt', 'query1.txt', \
+            '-'])
+        self.assertEqual (3, options.processes)
+        self.assertEqual ('m.json', options.metrics)
+        self.assertTrue (options.records and options.explain)
+        self.assertFalse (options.lazy or options.numpy)
+        self.assertEqual ('data.txt', options.data_file)
+        self.assertEqual (['query1.txt', '-'], options.query_sources)
+
+    def test_usage_errors (self):
+        """ Test that unknown flags, bad process counts, missing query
+        sources and conflicting flags are usage errors."""
+
+        for arguments in [['--bogus', 'data.txt', 'query1.txt'], \
+                          ['--processes', '0', 'data.txt', 'query1.txt'], \
+                          ['--processes', 'two', 'data.txt', 'query1.txt'], \
+                          ['data.txt'], \
+                          ['--lazy', '--processes', '2', 'data.txt', \
+                           'query1.txt'], \
+                          ['--lazy', '--records', 'data.txt', 'query1.txt']]:
+            self.assertUsageError (arguments)
+
+    def test_binary_usage_errors (self):
+        """ Test that --lazy, --records and --processes are usage errors
+        with a binary data file."""
+
+        handle, binary_filename = tempfile.mkstemp (suffix='.twvb')
+        os.close (handle)
+        try:
+            tb.convert_data_file ('data.txt', binary_filename)
+            for option in [['--lazy'], ['--records'], ['--processes', '2']]:
+                self.assertUsageError (option + [binary_filename, \
+                                                 'query1.txt'])
+        finally:
+            os.remove (binary_filename)
+
+    def test_batch (self):
+        """ Test that batch_main answers the queries in order."""
+
+        with contextlib.redirect_stdout (io.StringIO ()) as output, \
+                contextlib.redirect_stderr (io.StringIO ()):
+            tp.batch_main (['data.txt', 'query1.txt', 'query1.txt'])
+        query_file = open ('query1.txt')
+        query = tf.process_query (query_file)
+        query_file.close ()
+        data_file = open ('data.txt')
+        result = tp.answer_query (tf.process_data (data_file), query)
+        data_file.close ()
+        if not result.endswith ('\n'):
+            result = result + '\n'
+        self.assertEqual (result * 2, output.getvalue ())
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
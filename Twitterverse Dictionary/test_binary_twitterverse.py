@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+import twitterverse_functions as tf
+import twitterverse_binary as tb
+
+
+class TestBinaryTwitterverse(unittest.TestCase):
+
+    def setUp (self):
+        """ Convert rdata.txt into a temporary binary Twitterverse file."""
+
+        handle, self.binary_filename = tempfile.mkstemp(suffix='.twvb')
+        os.close(handle)
+        tb.convert_data_file('rdata.txt', self.binary_filename)
+        data_file = open('rdata.txt', 'r')
+        self.data = tf.process_data(data_file)
+        data_file.close()
+
+    def tearDown (self):
+        os.remove(self.binary_filename)
+
+    def test_round_trip (self):
+        """ Test that the memory-mapped Twitterverse has the same users, \
+        fields and followers as process_data."""
+
+        binary = tb.load_binary(self.binary_filename)
+        self.assertEqual (list(self.data), list(binary))
+        for username in self.data:
+            self.assertEqual (self.data[username], dict(binary[username]))
+            self.assertEqual (tf.all_followers(self.data, username), \
+                              tf.all_followers(binary, username))
+        self.assertNotIn ('nobody', binary)
+
+    def test_load_twitterverse (self):
+        """ Test that load_twitterverse reads both binary and data files."""
+
+        self.assertTrue (tb.is_binary_file(self.binary_filename))
+        self.assertFalse (tb.is_binary_file('rdata.txt'))
+        self.assertEqual (dict(tb.load_twitterverse(self.binary_filename)), \
+                          tb.load_twitterverse('rdata.txt'))
+        self.assertRaises (ValueError, tb.load_twitterverse, 'rdata.txt', \
+                           2, True)
+        self.assertRaises (ValueError, tb.load_twitterverse, 'rdata.txt', \
+                           lazy=True, records=True)
+
+    def test_binary_options (self):
+        """ Test that a binary file cannot be loaded lazily, as records or
+        on processes."""
+
+        self.assertRaises (ValueError, tb.load_twitterverse, \
+                           self.binary_filename, lazy=True)
+        self.assertRaises (ValueError, tb.load_twitterverse, \
+                           self.binary_filename, records=True)
+        self.assertRaises (ValueError, tb.load_twitterverse, \
+                           self.binary_filename, 2)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
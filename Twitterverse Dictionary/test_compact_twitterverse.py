@@ -0,0 +1,72 @@
+import unittest
+import twitterverse_functions as tf
+import twitterverse_compact as tc
+
+
+class TestCompactTwitterverse(unittest.TestCase):
+
+    def load_both (self, filename):
+        """ Return the Twitterverse dictionary and the CompactTwitterverse \
+        of the data file filename."""
+
+        data_file = open(filename, 'r')
+        data = tf.process_data(data_file)
+        data_file.close()
+        data_file = open(filename, 'r')
+        compact = tc.process_data_compact(data_file)
+        data_file.close()
+        return (data, compact)
+
+    def test_same_users (self):
+        """ Test that the compact store has the same users, in the same \
+        order and with the same fields, as process_data."""
+
+        data, compact = self.load_both('rdata.txt')
+        self.assertEqual (list(data), list(compact))
+        for username in data:
+            self.assertEqual (data[username], dict(compact[username]))
+
+    def test_same_followers (self):
+        """ Test that all_followers returns the same lists, in the same \
+        order, for the compact store as for process_data."""
+
+        data, compact = self.load_both('rdata.txt')
+        for username in list(data) + ['nobody']:
+            self.assertEqual (tf.all_followers(data, username), \
+                              tf.all_followers(compact, username))
+
+    def test_same_present_string (self):
+        """ Test that a whole query gives the same output on the compact \
+        store as on process_data."""
+
+        data, compact = self.load_both('data.txt')
+        query = {'search': {'username': 'tomCruise', \
+                            'operations': ['following', 'followers']}, \
+                 'filter': {'name-includes': 'a'}, \
+                 'present': {'sort-by': 'popularity', 'format': 'long'}}
+        results = []
+        for twitterverse in (data, compact):
+            search_results = tf.get_search_results(twitterverse, \
+                                                   query['search'])
+            filtered_results = tf.get_filter_results(twitterverse, \
+                                                     search_results, \
+                                                     query['filter'])
+            results.append (tf.get_present_string(twitterverse, \
+                                                  filtered_results, \
+                                                  query['present']))
+        self.assertEqual (results[0], results[1])
+
+    def test_missing_user (self):
+        """ Test that a username that is only followed is not a user of the \
+        compact store."""
+
+        compact = tc.CompactTwitterverse.from_users([\
+            ('a', {'name':'Zed', 'location':'', 'web':'', 'bio':'', \
+                   'following':['x']})])
+        self.assertNotIn ('x', compact)
+        self.assertRaises (KeyError, compact.__getitem__, 'x')
+        self.assertEqual (['a'], tf.all_followers(compact, 'x'))
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -1,5 +1,6 @@
 import unittest
 import twitterverse_functions as tf
+import twitterverse_index as ti
 
 
 class TestGetFilterResults(unittest.TestCase):
@@ -369,6 +370,69 @@ class TestGetFilterResults(unittest.TestCase):
                                                      filter_spec_dict) 
         self.assertEqual (expected_list, obtained_list)                
     
+    def test_indexed_mix_multiple_char_name_value (self):
+        """ Test get_filter_results on a Twitterverse, whose name filter goes \
+        through a trigram index, with a mixed case "name-includes" value."""
+        
+        twitter_data = tf.Twitterverse({\
+            'a':{'name':'Zed Annan', 'location':'', 'web':'', 'bio':'', \
+                 'following':[]}, 
+            'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', \
+                 'following':[]}, 
+            'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', \
+                 'following':[]}})
+        usernames = ['c', 'b', 'a']
+        expected_list = ['c', 'a']
+        obtained_list = tf.get_filter_results(twitter_data, usernames, \
+                                              {"name-includes":"aNN"})
+        self.assertEqual (expected_list, obtained_list)
+    
+    def test_indexed_location_value_after_change (self):
+        """ Test get_filter_results on a Twitterverse with a \
+        "location-includes" value, before and after a user's location \
+        changes."""
+        
+        twitter_data = tf.Twitterverse({\
+            'a':{'name':'Zed', 'location':'Toronto', 'web':'', 'bio':'', \
+                 'following':[]}, 
+            'b':{'name':'Lee', 'location':'Ottawa', 'web':'', 'bio':'', \
+                 'following':[]}})
+        usernames = ['a', 'b']
+        filter_spec_dict = {"location-includes":"TORONTO"}
+        obtained_list = tf.get_filter_results(twitter_data, usernames, \
+                                              filter_spec_dict)
+        self.assertEqual (['a'], obtained_list)
+        twitter_data['b']['location'] = 'Toronto, ON'
+        twitter_data.mark_changed()
+        obtained_list = tf.get_filter_results(twitter_data, usernames, \
+                                              filter_spec_dict)
+        self.assertEqual (['a', 'b'], obtained_list)
+
+    def test_small_frontier_not_indexed (self):
+        """ Test that filter_usernames with "name-includes" over a small \
+        share of the users scans them instead of building an index, and \
+        that it uses an index once one has been built."""
+        
+        twitter_data = tf.Twitterverse({\
+            'a':{'name':'Zed Annan', 'location':'', 'web':'', 'bio':'', \
+                 'following':[]}, 
+            'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', \
+                 'following':[]}, 
+            'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', \
+                 'following':[]},
+            'd':{'name':'Ann', 'location':'', 'web':'', 'bio':'', \
+                 'following':[]}})
+        filter_spec_dict = {"name-includes":"ANN"}
+        obtained_list = tf.filter_usernames(twitter_data, ['c'], \
+                                            "name-includes", filter_spec_dict)
+        self.assertEqual (['c'], obtained_list)
+        self.assertFalse (hasattr (twitter_data, 'substring_indexes'))
+        ti.build_substring_indexes (twitter_data)
+        self.assertIsNotNone (ti.current_substring_index (twitter_data, \
+                                                          'name'))
+        obtained_list = tf.filter_usernames(twitter_data, ['b', 'a'], \
+                                            "name-includes", filter_spec_dict)
+        self.assertEqual (['a'], obtained_list)
 
 
 if __name__ == '__main__':
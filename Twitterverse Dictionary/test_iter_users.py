@@ -0,0 +1,73 @@
+import io
+import unittest
+import twitterverse_functions as tf
+
+
+class TestIterUsers(unittest.TestCase):
+
+    def setUp (self):
+        """ Read data.txt, and make a file with a bio of several lines, a
+        blank bio line and a following list with spaces around it."""
+
+        data_file = open ('data.txt')
+        self.data_text = data_file.read ()
+        data_file.close ()
+        self.text = "a\nZed\n Toronto \n\nfirst\n\nlast\nENDBIO\n b \nc\n" \
+                    "END\nb\nLee\n\n\nENDBIO\nEND\n"
+
+    def readline_users (self, text):
+        """ Return the users of text read one line at a time by
+        process_username, as process_data used to."""
+
+        data_file = io.StringIO (text)
+        users = {}
+        username = data_file.readline ().strip ()
+        while (username != ''):
+            tf.process_username (data_file, username, users)
+            username = data_file.readline ().strip ()
+        return (users)
+
+    def test_same_as_readline_parser (self):
+        """ Test that iter_users reads the same users as the line by line
+        parser."""
+
+        for text in [self.data_text, self.text]:
+            expected = self.readline_users (text)
+            users = list (tf.iter_users (io.StringIO (text)))
+            self.assertEqual (list (expected), \
+                              [username for username, user in users])
+            self.assertEqual (expected, dict (users))
+
+    def test_fields (self):
+        """ Test that lines are stripped and bios keep their blank lines."""
+
+        users = dict (tf.iter_users (io.StringIO (self.text)))
+        self.assertEqual ('Toronto', users['a']['location'])
+        self.assertEqual ('first\n\nlast', users['a']['bio'])
+        self.assertEqual (['b', 'c'], users['a']['following'])
+        self.assertEqual ({'name':'Lee', 'location':'', 'web':'', 'bio':'', \
+                           'following':[]}, users['b'])
+
+    def test_end_of_file (self):
+        """ Test that a blank username line ends the users, and that a last
+        line without a newline is still read."""
+
+        self.assertEqual (['a'], [username for username, user in \
+            tf.iter_users (io.StringIO (self.text.replace ("\nb\nLee", \
+                                                           "\n\nLee")))])
+        username, user = next (tf.iter_users (io.StringIO (\
+            "x\nEx\n\n\nENDBIO\ny\nEND")))
+        self.assertEqual (('x', ['y']), (username, user['following']))
+        self.assertEqual ([], list (tf.iter_users (io.StringIO (""))))
+
+    def test_lazy (self):
+        """ Test that iter_users only reads as far as the users asked for."""
+
+        data_file = io.StringIO (self.text)
+        users = tf.iter_users (data_file)
+        self.assertEqual ('a', next (users)[0])
+        self.assertTrue (data_file.tell () < len (self.text))
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
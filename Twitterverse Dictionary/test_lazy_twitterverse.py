@@ -0,0 +1,61 @@
+import io
+import os
+import tempfile
+import unittest
+import twitterverse_functions as tf
+import twitterverse_deltas as td
+import twitterverse_lazy as tl
+
+
+class TestLazyTwitterverse(unittest.TestCase):
+
+    def setUp (self):
+        """ Write a data file with a web line that is ENDBIO, a bio with \
+        several lines and a last record without a newline."""
+
+        data_file = tempfile.NamedTemporaryFile ("w", suffix=".txt", \
+                                                 delete=False)
+        data_file.write (\
+            "a\nZed\nToronto\nENDBIO\nhi\n there \nENDBIO\nb\nc\nEND\n" \
+            "b\nLee\n\nhttp://lee.ca\nENDBIO\nEND\n" \
+            "c\nanna\nOttawa\n\nEND\nENDBIO\na\nEND")
+        data_file.close ()
+        self.data_filename = data_file.name
+
+    def tearDown (self):
+        """ Remove the data file."""
+
+        os.remove (self.data_filename)
+
+    def test_same_as_process_data (self):
+        """ Test that every field and the long format are the same as \
+        when the data file is loaded by process_data."""
+
+        data_file = open (self.data_filename)
+        expected = tf.process_data (data_file)
+        data_file.close ()
+        twitter_data = tl.process_data_lazy (self.data_filename)
+        self.assertEqual (list (expected), list (twitter_data))
+        for username in expected:
+            self.assertEqual (expected[username], dict (twitter_data[username]))
+        self.assertEqual ('hi\nthere', twitter_data['a']['bio'])
+        present = {'sort-by':'popularity', 'format':'long'}
+        self.assertEqual (\
+            tf.get_present_string (expected, list (expected), present), \
+            tf.get_present_string (twitter_data, list (twitter_data), present))
+
+    def test_update_lazy_user (self):
+        """ Test that an updated bio replaces the one in the data file."""
+
+        twitter_data = tl.process_data_lazy (self.data_filename)
+        td.apply_deltas (twitter_data, io.StringIO (\
+            "UPDATE b\nname Leo\nbio\nnew\nENDBIO\nEND\nFOLLOW b a\n"))
+        self.assertEqual ('new', twitter_data['b']['bio'])
+        self.assertEqual ('http://lee.ca', twitter_data['b']['web'])
+        self.assertEqual (['b'], tf.get_filter_results (twitter_data, \
+            ['a', 'b', 'c'], {'name-includes':'leo'}))
+        self.assertEqual (['b', 'c'], tf.all_followers (twitter_data, 'a'))
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
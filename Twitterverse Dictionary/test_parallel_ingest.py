@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+import twitterverse_functions as tf
+import twitterverse_ingest as ti
+
+
+class TestParallelIngest(unittest.TestCase):
+
+    def setUp (self):
+        """ Write a data file with a bio line that is END, a duplicate \
+        user and a user that is only followed, and split it into small \
+        ranges."""
+
+        records = []
+        for number in range(40):
+            bio = "END\nstill the bio" if number % 7 == 0 else "hello"
+            records.append ("u{}\nName {}\nToronto\n\n{}\nENDBIO\nu{}\nu{}\n" \
+                "zz\nEND\n".format (number % 35, number, bio, \
+                                  (number * 3) % 40, (number + 1) % 40))
+        data_file = tempfile.NamedTemporaryFile ("w", suffix=".txt", \
+                                                 delete=False)
+        data_file.write ("".join (records))
+        data_file.close ()
+        self.data_filename = data_file.name
+        self.min_range_size = ti.MIN_RANGE_SIZE
+        ti.MIN_RANGE_SIZE = 64
+
+    def tearDown (self):
+        """ Remove the data file."""
+
+        ti.MIN_RANGE_SIZE = self.min_range_size
+        os.remove (self.data_filename)
+
+    def test_same_as_process_data (self):
+        """ Test that the parallel loader returns the same users, in the \
+        same order, and the same followers as process_data."""
+
+        data_file = open (self.data_filename)
+        expected = tf.process_data (data_file)
+        data_file.close ()
+        self.assertTrue (len (ti.find_ranges (self.data_filename, 8)) > 1)
+        twitter_data = ti.process_data_parallel (self.data_filename, 3)
+        self.assertEqual (list (expected), list (twitter_data))
+        self.assertEqual (expected, twitter_data)
+        for username in expected:
+            self.assertEqual (tf.all_followers (expected, username), \
+                              tf.all_followers (twitter_data, username))
+
+    def test_records (self):
+        """ Test that the parallel loader makes slotted User records when \
+        asked to, as process_data does."""
+
+        data_file = open (self.data_filename)
+        expected = tf.process_data (data_file, True)
+        data_file.close ()
+        twitter_data = ti.process_data_parallel (self.data_filename, 3, \
+                                                 records=True)
+        self.assertEqual (list (expected), list (twitter_data))
+        for username in expected:
+            self.assertIs (type (expected[username]), \
+                           type (twitter_data[username]))
+            self.assertEqual (dict (expected[username]), \
+                              dict (twitter_data[username]))
+
+    def test_range_inside_bio (self):
+        """ Test that a range starting after a bio line that is END is \
+        reported as not ending at a record."""
+
+        text = open (self.data_filename).read ()
+        split = text.index ("END\nstill") + len ("END\n")
+        users, complete, stopped = ti.parse_range (self.data_filename, 0, \
+                                                   split)
+        self.assertEqual ((False, False), (complete, stopped))
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
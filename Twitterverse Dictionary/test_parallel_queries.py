@@ -0,0 +1,48 @@
+import unittest
+import twitterverse_functions as tf
+import twitterverse_parallel as tp
+
+
+class TestParallelQueries(unittest.TestCase):
+
+    def setUp (self):
+        """ Load data.txt and the sample queries that run against it, each
+        repeated so that they are spread over the workers."""
+
+        data_file = open ('data.txt')
+        self.data = tf.process_data (data_file)
+        data_file.close ()
+        self.queries = []
+        for query_filename in ['query1.txt', 'query2.txt', 'query3.txt']:
+            query_file = open (query_filename)
+            self.queries.append (tf.process_query (query_file))
+            query_file.close ()
+        self.queries = self.queries * 7
+        self.expected = [tp.answer_query (self.data, query) \
+                         for query in self.queries]
+
+    def test_forked_workers (self):
+        """ Test that workers sharing the loaded Twitterverse give the same
+        results as answering the queries in turn, in order."""
+
+        with tp.ParallelQueryExecutor (self.data, processes=3, \
+                                       chunk_size=2) as executor:
+            self.assertEqual (self.expected, executor.map (self.queries))
+            self.assertEqual (self.expected, \
+                              list (executor.imap (iter (self.queries))))
+
+    def test_workers_load_data_file (self):
+        """ Test that workers given only the data file load it themselves."""
+
+        with tp.ParallelQueryExecutor (data_filename='data.txt', \
+                                       processes=2) as executor:
+            self.assertEqual (self.expected, executor.map (self.queries))
+
+    def test_needs_data (self):
+        """ Test that an executor needs a Twitterverse or a data file."""
+
+        self.assertRaises (ValueError, tp.ParallelQueryExecutor)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,97 @@
+import itertools
+import unittest
+import twitterverse_functions as tf
+import twitterverse_index as ti
+import twitterverse_metrics as tm
+
+
+class TestPlanFilters(unittest.TestCase):
+
+    def setUp (self):
+        """ Make a Twitterverse where a, b and c follow d, only a follows e,
+        and everyone's name includes an "n"."""
+
+        self.users = {\
+            'a':{'name':'Ann', 'location':'Toronto', 'web':'', 'bio':'', \
+                 'following':['d', 'e']},
+            'b':{'name':'Ben', 'location':'Toronto', 'web':'', 'bio':'', \
+                 'following':['d']},
+            'c':{'name':'Nia', 'location':'Lagos', 'web':'', 'bio':'', \
+                 'following':['d']},
+            'd':{'name':'Dan', 'location':'Toronto', 'web':'', 'bio':'', \
+                 'following':['a', 'b']},
+            'e':{'name':'Eun', 'location':'Tokyo', 'web':'', 'bio':'', \
+                 'following':[]}}
+        self.twitter_data = tf.Twitterverse (self.users)
+        self.usernames = list (self.users)
+
+    def test_estimates (self):
+        """ Test that estimates come from follower counts, following lists
+        and built substring indexes, and never exceed the usernames."""
+
+        self.assertEqual (3, tf.estimate_filter_size (self.twitter_data, \
+            self.usernames, 'following', 'd'))
+        self.assertEqual (2, tf.estimate_filter_size (self.twitter_data, \
+            self.usernames, 'follower', 'd'))
+        self.assertEqual (0, tf.estimate_filter_size (self.twitter_data, \
+            self.usernames, 'follower', 'nobody'))
+        ti.build_substring_indexes (self.twitter_data)
+        self.assertEqual (1, tf.estimate_filter_size (self.twitter_data, \
+            self.usernames, 'location-includes', 'lagos'))
+        self.assertEqual (2, tf.estimate_filter_size (self.twitter_data, \
+            ['a', 'b'], 'following', 'd'))
+
+    def test_planning_builds_no_index (self):
+        """ Test that estimating a substring filter without an index keeps
+        every username instead of building the index, and that filtering a
+        few usernames builds none either."""
+
+        self.assertEqual (5, tf.estimate_filter_size (self.twitter_data, \
+            self.usernames, 'location-includes', 'lagos'))
+        self.assertIsNone (ti.current_substring_index (self.twitter_data, \
+                                                       'location'))
+        self.assertEqual (['c'], tf.get_filter_results (self.twitter_data, \
+            ['c'], {'location-includes':'lagos'}))
+        self.assertIsNone (ti.current_substring_index (self.twitter_data, \
+                                                       'location'))
+
+    def test_most_selective_first (self):
+        """ Test that the filter expected to keep the fewest usernames is
+        applied first, and that ties keep their order."""
+
+        spec = {'name-includes':'n', 'following':'d', 'follower':'a'}
+        self.assertEqual (['follower', 'following', 'name-includes'], \
+            tf.plan_filters (self.twitter_data, self.usernames, spec))
+        spec = {'following':'e', 'follower':'b'}
+        self.assertEqual (['following', 'follower'], \
+            tf.plan_filters (self.twitter_data, self.usernames, spec))
+
+    def test_order_does_not_change_results (self):
+        """ Test that every order of the same filters gives the results of
+        applying them one by one to a plain dict."""
+
+        spec = {'name-includes':'n', 'following':'d', \
+                'location-includes':'toronto', 'follower':'d'}
+        expected = self.usernames
+        for operation in spec:
+            expected = tf.filter_usernames (self.users, expected, \
+                                            operation, spec)
+        self.assertEqual (['a', 'b'], expected)
+        for order in itertools.permutations (spec):
+            ordered_spec = {operation: spec[operation] for operation in order}
+            for twitter_data in [self.users, self.twitter_data]:
+                self.assertEqual (expected, tf.get_filter_results (\
+                    twitter_data, self.usernames, ordered_spec))
+
+    def test_stops_when_empty (self):
+        """ Test that no filter is applied once none of the usernames are
+        left."""
+
+        with tm.collecting () as metrics:
+            self.assertEqual ([], tf.get_filter_results (self.twitter_data, \
+                self.usernames, {'name-includes':'n', 'follower':'nobody'}))
+        self.assertEqual (1, metrics.to_dict ()['filter_usernames']['calls'])
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,138 @@
+import io
+import unittest
+import twitterverse_functions as tf
+import twitterverse_plan as tq
+import twitterverse_popularity as tp
+from twitterverse_graph import TwitterverseGraph
+
+
+class TestPopularityIndex(unittest.TestCase):
+
+    def setUp (self):
+        """ Make a Twitterverse where b has two followers, c and x (who is
+        not a user) have one and a and d have none."""
+
+        self.twitter_data = tf.Twitterverse ({\
+            'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', \
+                 'following':['b', 'c']},
+            'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', \
+                 'following':['x']},
+            'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', \
+                 'following':['b']},
+            'd':{'name':'Ann', 'location':'', 'web':'', 'bio':'', \
+                 'following':[]}})
+        self.index = self.twitter_data.graph.popularity_index ()
+
+    def assertIndexCurrent (self):
+        """ Assert that the index matches one built from scratch."""
+
+        fresh = TwitterverseGraph (self.twitter_data).popularity_index ()
+        self.assertEqual (list (fresh.iter_popular ()), \
+                          list (self.index.iter_popular ()))
+        self.assertEqual (dict (fresh.sort_keys), dict (self.index.sort_keys))
+
+    def test_order (self):
+        """ Test that the index orders users and followed usernames by
+        followers, then by username."""
+
+        self.assertEqual (['b', 'c', 'x', 'a', 'd'], \
+                          list (self.index.iter_popular ()))
+        self.assertEqual (['b', 'c', 'a'], \
+                          tf.most_followed (self.twitter_data, 3))
+        self.assertEqual (tf.most_followed (dict (self.twitter_data), 10), \
+                          tf.most_followed (self.twitter_data, 10))
+
+    def test_follow_and_unfollow (self):
+        """ Test that follows and unfollows move usernames in the index."""
+
+        self.twitter_data.follow ('d', 'a')
+        self.twitter_data.follow ('c', 'a')
+        self.assertIndexCurrent ()
+        self.assertEqual (['a', 'b'], tf.most_followed (self.twitter_data, 2))
+        self.twitter_data.unfollow ('b', 'x')
+        self.assertIndexCurrent ()
+        self.assertNotIn ('x', self.index)
+
+    def test_add_and_delete_users (self):
+        """ Test that adding, replacing and deleting users keeps the index
+        up to date, including deleted users that are still followed."""
+
+        self.twitter_data['e'] = {'name':'Eve', 'location':'', 'web':'', \
+                                  'bio':'', 'following':['c', 'd']}
+        self.assertIndexCurrent ()
+        self.twitter_data['a'] = {'name':'Zed', 'location':'', 'web':'', \
+                                  'bio':'', 'following':['d']}
+        self.assertIndexCurrent ()
+        del self.twitter_data['b']
+        self.assertIndexCurrent ()
+        self.assertEqual (1, self.index.count ('b'))
+        del self.twitter_data['c']
+        self.assertIndexCurrent ()
+        self.assertEqual (['d', 'a', 'e'], \
+                          tf.most_followed (self.twitter_data, 5))
+
+    def test_popularity_sort (self):
+        """ Test that sorting by popularity with the index matches sorting
+        a plain dict, for usernames in and out of the index."""
+
+        usernames = ['d', 'nobody', 'x', 'a', 'c', 'b']
+        expected = usernames[:]
+        tf.sort_by (dict (self.twitter_data), expected, \
+                    {'sort-by':'popularity', 'format':'short'})
+        tf.sort_by (self.twitter_data, usernames, \
+                    {'sort-by':'popularity', 'format':'short'})
+        self.assertEqual (expected, usernames)
+
+    def test_sort_without_index (self):
+        """ Test that sorting by popularity before the index is built gives
+        the same order without building it."""
+
+        twitter_data = tf.Twitterverse (self.twitter_data)
+        usernames = ['d', 'nobody', 'x', 'a', 'c', 'b']
+        tf.sort_by (twitter_data, usernames, \
+                    {'sort-by':'popularity', 'format':'short'})
+        self.assertEqual (['b', 'c', 'x', 'a', 'd', 'nobody'], usernames)
+        self.assertIsNone (tp.current_popularity_index (twitter_data))
+
+    def test_large_groups (self):
+        """ Test that groups split into several runs stay in order as
+        usernames move between them."""
+
+        run_size = tp.RUN_SIZE
+        tp.RUN_SIZE = 2
+        try:
+            counts = {'u' + str (number): number % 3 for number in range (40)}
+            index = tp.PopularityIndex (counts)
+            for number in range (0, 40, 7):
+                counts['u' + str (number)] = 3
+                index.set_count ('u' + str (number), 3)
+            for number in range (1, 40, 5):
+                del counts['u' + str (number)]
+                index.remove ('u' + str (number))
+        finally:
+            tp.RUN_SIZE = run_size
+        expected = sorted (counts, key=lambda username: \
+                           (-counts[username], username))
+        self.assertEqual (expected, list (index.iter_popular ()))
+        self.assertEqual (expected[:9], index.top (9))
+
+    def test_most_followed_in_query (self):
+        """ Test the most-followed search operation in a query and a plan,
+        after the index has changed."""
+
+        self.twitter_data.follow ('d', 'c')
+        query = tf.process_query (io.StringIO (\
+            "SEARCH\nd\nmost-followed*2\nFILTER\nPRESENT\n" \
+            "sort-by username\nformat short\n"))
+        for twitter_data in [self.twitter_data, dict (self.twitter_data)]:
+            self.assertEqual (['b', 'c'], tf.get_search_results (\
+                twitter_data, query['search']))
+            self.assertEqual ("['b', 'c']", tq.compile_query (\
+                query, twitter_data).present (twitter_data))
+        self.assertRaises (ValueError, tf.process_query, io.StringIO (\
+            "SEARCH\na\nmost-followed*0\nFILTER\nPRESENT\n" \
+            "sort-by username\nformat short\n"))
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,84 @@
+import io
+import unittest
+import twitterverse_functions as tf
+
+
+def concatenated_long (twitter_data, username):
+    """ Return the long format of username built by concatenation, as
+    format_long used to build it."""
+
+    user = twitter_data[username]
+    text = "----------\n" + username + "\nname: " + user['name'] + \
+        "\nlocation: " + user['location'] + "\nwebsite: " + user['web'] + \
+        "\nbio:\n" + user['bio'] + "\nfollowing: ["
+    if (len (user['following']) == 0):
+        return (text + "]\n")
+    for names in user['following']:
+        if (names == user['following'][-1]):
+            text = text + "'" + names + "']\n"
+        else:
+            text = text + "'" + names + "', "
+    return (text)
+
+
+class TestPresentChunks(unittest.TestCase):
+
+    def setUp (self):
+        """ Make a Twitterverse with a bio of two lines and a following list
+        that names its last username twice."""
+
+        self.twitter_data = {\
+            'a':{'name':'Zed', 'location':'Toronto', 'web':'zed.com', \
+                 'bio':'one\ntwo', 'following':['c', 'b', 'c']},
+            'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', \
+                 'following':[]},
+            'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', \
+                 'following':['a']}}
+
+    def test_long_format (self):
+        """ Test that the long format of each user and of all of them is the
+        text concatenation used to build."""
+
+        for username in self.twitter_data:
+            self.assertEqual (concatenated_long (self.twitter_data, \
+                                                 username), \
+                tf.format_long (self.twitter_data, username))
+        expected = "".join (concatenated_long (self.twitter_data, username) \
+                            for username in ['a', 'b', 'c']) + "----------\n"
+        self.assertEqual (expected, tf.get_present_string (\
+            self.twitter_data, ['c', 'a', 'b'], \
+            {'sort-by':'username', 'format':'long'}))
+
+    def test_short_format (self):
+        """ Test the short format of no, one and several usernames."""
+
+        self.assertEqual ("['b']", tf.format_short (['b']))
+        self.assertEqual ("['a', 'b', 'c']", tf.get_present_string (\
+            self.twitter_data, ['b', 'c', 'a'], \
+            {'sort-by':'username', 'format':'short'}))
+        self.assertEqual ("----------\n----------", tf.get_present_string (\
+            self.twitter_data, [], {'sort-by':'name', 'format':'short'}))
+
+    def test_chunks_and_writer (self):
+        """ Test that the chunks, and what the writer writes, join up into
+        the presented string, and that the usernames are not changed."""
+
+        usernames = ['c', 'a', 'b']
+        for present in [{'sort-by':'name', 'format':'long'}, \
+                        {'sort-by':'popularity', 'format':'short'}, \
+                        {'sort-by':'username', 'format':'long', 'limit':2}]:
+            expected = tf.get_present_string (self.twitter_data, usernames, \
+                                              present)
+            chunks = list (tf.iter_present_chunks (self.twitter_data, \
+                                                   usernames, present))
+            self.assertTrue (len (chunks) > 1)
+            self.assertEqual (expected, "".join (chunks))
+            output = io.StringIO ()
+            tf.write_present_string (self.twitter_data, usernames, present, \
+                                     output)
+            self.assertEqual (expected, output.getvalue ())
+        self.assertEqual (['c', 'a', 'b'], usernames)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
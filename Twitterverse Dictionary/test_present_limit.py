@@ -0,0 +1,58 @@
+import io
+import unittest
+import twitterverse_functions as tf
+
+
+class TestPresentLimit(unittest.TestCase):
+
+    def setUp (self):
+        """ Make a Twitterverse where b has two followers, c has one and the
+        others have none."""
+
+        self.twitter_data = tf.Twitterverse({\
+            'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', \
+                 'following':['b', 'c']}, 
+            'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', \
+                 'following':[]}, 
+            'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', \
+                 'following':['b']},
+            'd':{'name':'Ann', 'location':'', 'web':'', 'bio':'', \
+                 'following':[]}})
+
+    def test_limit_matches_full_sort (self):
+        """ Test that every limit keeps the start of the fully sorted \
+        results, for every sort order."""
+
+        usernames = ['d', 'c', 'b', 'a']
+        for sort in ['username', 'name', 'popularity']:
+            full = usernames[:]
+            tf.sort_by (self.twitter_data, full, {'sort-by':sort, \
+                                                  'format':'short'})
+            for limit in range(6):
+                limited = usernames[:]
+                tf.sort_by (self.twitter_data, limited, {'sort-by':sort, \
+                    'format':'short', 'limit':limit})
+                self.assertEqual (full[:limit], limited)
+
+    def test_limit_in_query (self):
+        """ Test a limit line in a query, including a limit of zero."""
+
+        query = tf.process_query (io.StringIO (\
+            "SEARCH\na\nfollowing\nFILTER\nPRESENT\nsort-by popularity\n" \
+            "format long\nlimit 1\n"))
+        self.assertEqual (1, query['present']['limit'])
+        results = tf.get_search_results (self.twitter_data, query['search'])
+        expected = tf.get_present_string (self.twitter_data, ['b'], \
+            {'sort-by':'popularity', 'format':'long'})
+        self.assertEqual (expected, tf.get_present_string (\
+            self.twitter_data, results, query['present']))
+        self.assertEqual ('----------\n----------', tf.get_present_string (\
+            self.twitter_data, results, {'sort-by':'popularity', \
+                                         'format':'long', 'limit':0}))
+        self.assertRaises (ValueError, tf.process_query, io.StringIO (\
+            "SEARCH\na\nFILTER\nPRESENT\nsort-by name\nformat short\n" \
+            "limit ten\n"))
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,83 @@
+import unittest
+import twitterverse_functions as tf
+import twitterverse_parallel as tp
+import twitterverse_plan as tq
+
+
+class TestQueryPlan(unittest.TestCase):
+
+    def setUp (self):
+        """ Load the sample data file and its query files."""
+
+        data_file = open ('data.txt', 'r')
+        self.twitter_data = tf.process_data (data_file)
+        data_file.close ()
+        self.queries = []
+        for query_filename in ['query1.txt', 'query2.txt', 'query3.txt', \
+                               'query4.txt', 'typecheck_query.txt']:
+            query_file = open (query_filename, 'r')
+            self.queries.append (tf.process_query (query_file))
+            query_file.close ()
+
+    def query (self, username, operations, filter_spec, present_spec):
+        """ Return a query dictionary with the given parts."""
+
+        return ({'search':{'username':username, 'operations':operations}, \
+                 'filter':filter_spec, 'present':present_spec})
+
+    def test_plan_matches_query_functions (self):
+        """ Test that plans present the same results as the search, filter
+        and present functions, for Twitterverses and plain dicts."""
+
+        for query in self.queries:
+            plan = tq.compile_query (query)
+            for twitter_data in [self.twitter_data, dict (self.twitter_data)]:
+                self.assertEqual (tp.answer_query (twitter_data, query), \
+                                  plan.present (twitter_data))
+
+    def test_plan_runs_again_after_changes (self):
+        """ Test that a plan sees changes made after it was compiled."""
+
+        plan = tq.compile_query (self.query ('tomCruise', ['following'], {}, \
+            {'sort-by':'username', 'format':'short'}), self.twitter_data)
+        before = plan.execute (self.twitter_data)
+        self.twitter_data.follow ('tomCruise', 'tomfan')
+        self.assertEqual (sorted (set (before + ['tomfan'])), \
+                          plan.execute (self.twitter_data))
+
+    def test_rejects_bad_queries (self):
+        """ Test that compile_query rejects bad queries up front."""
+
+        present = {'sort-by':'username', 'format':'short'}
+        bad_queries = [self.query ('', [], {}, present), \
+            self.query ('tomCruise', ['friends'], {}, present), \
+            self.query ('tomCruise', ['following*0'], {}, present), \
+            self.query ('tomCruise', [], {'bio-includes':'x'}, present), \
+            self.query ('tomCruise', [], {}, {'sort-by':'age', \
+                                              'format':'short'}), \
+            self.query ('tomCruise', [], {}, {'sort-by':'name', \
+                                              'format':'wide'}), \
+            self.query ('tomCruise', [], {}, {'format':'short'})]
+        for query in bad_queries:
+            self.assertRaises (ValueError, tq.compile_query, query)
+        self.assertRaises (ValueError, tq.compile_query, \
+            self.query ('nobody', [], {}, present), self.twitter_data)
+        tq.compile_query (self.query ('nobody', [], {}, present))
+
+    def test_explain (self):
+        """ Test that explain lists every stage in the order they run, with
+        estimates that never grow after the search."""
+
+        plan = tq.compile_query (self.queries[-1], self.twitter_data)
+        lines = plan.explain ().split ('\n')
+        self.assertEqual (['search from tomCruise', 'search following', \
+            'search followers'], lines[:3])
+        self.assertEqual ('present sort-by username, format long', lines[-1])
+        estimates = [int (line.split ('~')[1].split ()[0]) for line in \
+                     plan.explain (self.twitter_data).split ('\n')]
+        self.assertEqual (len (lines), len (estimates))
+        self.assertEqual (sorted (estimates[2:], reverse=True), estimates[2:])
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
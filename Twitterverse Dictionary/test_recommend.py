@@ -0,0 +1,67 @@
+import io
+import unittest
+import twitterverse_functions as tf
+import twitterverse_compact as tc
+import twitterverse_plan as tq
+from twitterverse_recommend import recommend, common_neighbour_counts
+
+
+class TestRecommend(unittest.TestCase):
+
+    def setUp (self):
+        """ Make a Twitterverse where a follows b, c and d, who between them
+        follow e three times, f twice, g once and a and b as well."""
+
+        self.users = {\
+            'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', \
+                 'following':['b', 'c', 'd']},
+            'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', \
+                 'following':['e', 'f', 'a', 'e']},
+            'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', \
+                 'following':['e', 'g', 'b']},
+            'd':{'name':'Ann', 'location':'', 'web':'', 'bio':'', \
+                 'following':['e', 'f']},
+            'e':{'name':'Eve', 'location':'', 'web':'', 'bio':'', \
+                 'following':['a']}}
+        self.twitterverses = [self.users, tf.Twitterverse (self.users), \
+            tc.CompactTwitterverse.from_users (self.users.items ())]
+
+    def test_counts (self):
+        """ Test that each username two steps away is counted once per
+        followee, leaving out the user and who they already follow."""
+
+        for twitter_data in self.twitterverses:
+            self.assertEqual ({'e':3, 'f':2, 'g':1}, \
+                dict (common_neighbour_counts (twitter_data, 'a')))
+            self.assertEqual ({}, dict (common_neighbour_counts (\
+                twitter_data, 'nobody')))
+
+    def test_top_k (self):
+        """ Test that recommendations come highest count first, with ties in
+        username order."""
+
+        for twitter_data in self.twitterverses:
+            self.assertEqual (['e', 'f'], recommend (twitter_data, 'a', 2))
+            self.assertEqual (['e', 'f', 'g'], \
+                              recommend (twitter_data, 'a', 10))
+            self.assertEqual (['b', 'c'], \
+                              recommend (twitter_data, 'e', 2))
+
+    def test_recommend_in_query (self):
+        """ Test the recommend search operation in a query and a plan."""
+
+        query = tf.process_query (io.StringIO (\
+            "SEARCH\na\nrecommend*2\nFILTER\nPRESENT\n" \
+            "sort-by username\nformat short\n"))
+        for twitter_data in self.twitterverses:
+            self.assertEqual (['e', 'f'], tf.get_search_results (\
+                twitter_data, query['search']))
+            self.assertEqual ("['e', 'f']", tq.compile_query (\
+                query, twitter_data).present (twitter_data))
+        self.assertRaises (ValueError, tf.process_query, io.StringIO (\
+            "SEARCH\na\nrecommend*none\nFILTER\nPRESENT\n" \
+            "sort-by username\nformat short\n"))
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,62 @@
+import unittest
+import twitterverse_functions as tf
+import twitterverse_metrics as tm
+
+
+class TestSearchFrontier(unittest.TestCase):
+
+    def setUp (self):
+        """ Make a Twitterverse where everyone follows everyone else, and
+        read data.txt."""
+
+        names = ['u' + str (number) for number in range (30)]
+        self.users = {}
+        for username in names:
+            self.users[username] = {'name':username, 'location':'', \
+                'web':'', 'bio':'', \
+                'following':[other for other in names if other != username]}
+        data_file = open ('data.txt')
+        self.data = tf.process_data (data_file)
+        data_file.close ()
+
+    def expected_results (self, twitter_data, search_spec):
+        """ Return the results of search_spec found by expanding the whole
+        frontier and then removing duplicates, one operation at a time."""
+
+        results = [search_spec['username']]
+        for operation in search_spec['operations']:
+            results = tf.remove_dups (tf.search_usernames (twitter_data, \
+                                                           results, operation))
+        return (results)
+
+    def test_same_as_remove_dups (self):
+        """ Test that the search gives the same usernames in the same order
+        as removing duplicates after each operation."""
+
+        for twitter_data in [self.users, tf.Twitterverse (self.users), \
+                             self.data, dict (self.data)]:
+            for username in list (twitter_data)[:5]:
+                for operations in [['following'], ['followers'], \
+                                   ['following', 'followers'], \
+                                   ['followers', 'followers', 'following']]:
+                    search_spec = {'username':username, \
+                                   'operations':operations}
+                    self.assertEqual (\
+                        self.expected_results (twitter_data, search_spec), \
+                        tf.get_search_results (twitter_data, search_spec))
+
+    def test_each_user_expanded_once (self):
+        """ Test that a user reached again by a later operation of the same
+        kind is not expanded again."""
+
+        with tm.collecting () as metrics:
+            results = tf.get_search_results (self.users, \
+                {'username':'u0', \
+                 'operations':['following', 'followers', 'following']})
+        self.assertEqual (30, len (results))
+        # u0 is expanded by the first following step and not by the third.
+        self.assertEqual (1 + 29 + 29, \
+                          metrics.to_dict ()['search_usernames']['calls'])
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
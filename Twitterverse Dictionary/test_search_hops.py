@@ -0,0 +1,146 @@
+import io
+import unittest
+import twitterverse_functions as tf
+import twitterverse_compact as tc
+
+
+class TestSearchHops(unittest.TestCase):
+
+    def setUp (self):
+        """ Make a Twitterverse where a, b and c follow each other in a
+        circle, c also follows d, and d follows x, who is not a user."""
+
+        self.users = {\
+            'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', \
+                 'following':['b']},
+            'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', \
+                 'following':['c']},
+            'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', \
+                 'following':['a', 'd']},
+            'd':{'name':'Ann', 'location':'', 'web':'', 'bio':'', \
+                 'following':['x']}}
+        self.twitterverses = [self.users, tf.Twitterverse (self.users), \
+            tc.CompactTwitterverse.from_users (self.users.items ())]
+
+    def search (self, twitter_data, username, operations):
+        """ Return the sorted results of searching twitter_data."""
+
+        return (sorted (tf.get_search_results (twitter_data, \
+            {'username':username, 'operations':operations})))
+
+    def test_repeat_matches_repeated_operations (self):
+        """ Test that step*N finds the same users as N separate steps, for
+        every kind of Twitterverse."""
+
+        for twitter_data in self.twitterverses:
+            for step in ['following', 'followers']:
+                for hops in range (1, 4):
+                    self.assertEqual (\
+                        self.search (self.users, 'b', [step] * hops), \
+                        self.search (twitter_data, 'b', \
+                                     [step + '*' + str (hops)]))
+
+    def test_within_hops (self):
+        """ Test that step*<=N finds every user one to N steps away, in
+        Twitterverse order, including the starting user after a cycle."""
+
+        for twitter_data in self.twitterverses:
+            self.assertEqual (['b', 'c'], tf.get_search_results (\
+                twitter_data, {'username':'a', \
+                               'operations':['following*<=2']}))
+            self.assertEqual (['a', 'b', 'c', 'd', 'x'], \
+                tf.get_search_results (twitter_data, \
+                    {'username':'a', 'operations':['following*<=4']}))
+            self.assertEqual (['a', 'b', 'c'], tf.get_search_results (\
+                twitter_data, {'username':'x', \
+                               'operations':['followers*<=3', 'followers']}))
+
+    def test_missing_users (self):
+        """ Test that following cannot step from a username that is not a
+        user, as with separate steps, but followers can."""
+
+        for twitter_data in self.twitterverses:
+            self.assertRaises (KeyError, tf.get_search_results, twitter_data, \
+                {'username':'d', 'operations':['following*2']})
+            self.assertEqual ([], tf.get_search_results (twitter_data, \
+                {'username':'nobody', 'operations':['followers*2']}))
+
+    def test_changes_after_search (self):
+        """ Test that a search sees follows made after an earlier search."""
+
+        twitter_data = tf.Twitterverse (self.users)
+        self.assertEqual (['c'], tf.get_search_results (twitter_data, \
+            {'username':'a', 'operations':['following*2']}))
+        twitter_data.follow ('b', 'd')
+        self.assertEqual (['c', 'd'], tf.get_search_results (twitter_data, \
+            {'username':'a', 'operations':['following*2']}))
+
+    def test_index_patched (self):
+        """ Test that adding, replacing and deleting users and follows
+        patches the hop index in place, with the same results as an index
+        built from scratch."""
+
+        twitter_data = tf.Twitterverse (self.users)
+        tf.get_search_results (twitter_data, \
+            {'username':'a', 'operations':['following*2']})
+        index = twitter_data.hop_index[1]
+        twitter_data['e'] = {'name':'Eve', 'location':'', 'web':'', \
+                             'bio':'', 'following':['x', 'y']}
+        twitter_data['x'] = {'name':'Ex', 'location':'', 'web':'', \
+                             'bio':'', 'following':['a']}
+        twitter_data.follow ('a', 'e')
+        twitter_data.unfollow ('c', 'd')
+        del twitter_data['d']
+        for operation in ['following*2', 'followers*<=4', 'followers*2']:
+            self.assertEqual (tf.get_search_results (\
+                tf.Twitterverse (dict (twitter_data)), \
+                {'username':'a', 'operations':[operation]}), \
+                tf.get_search_results (twitter_data, \
+                {'username':'a', 'operations':[operation]}))
+        self.assertIs (index, twitter_data.hop_index[1])
+
+    def test_non_users_in_order_reached (self):
+        """ Test that usernames that are not users come after the users, in
+        the order the search first reached them, for every kind of
+        Twitterverse and after follows that gave them ids out of order."""
+
+        users = {\
+            'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', \
+                 'following':['x']},
+            'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', \
+                 'following':['y']},
+            's':{'name':'Sam', 'location':'', 'web':'', 'bio':'', \
+                 'following':['b', 'a']}}
+        changed = tf.Twitterverse ({'a':users['a'], 'b':users['b'], \
+            's':dict (users['s'], following=[])})
+        tf.get_search_results (changed, \
+            {'username':'s', 'operations':['following*2']})
+        changed.follow ('s', 'b')
+        changed.follow ('s', 'a')
+        for twitter_data in [users, tf.Twitterverse (users), changed, \
+                tc.CompactTwitterverse.from_users (users.items ())]:
+            self.assertEqual (['y', 'x'], tf.get_search_results (\
+                twitter_data, {'username':'s', \
+                               'operations':['following*2']}))
+            self.assertEqual (['a', 'b', 'y', 'x'], tf.get_search_results (\
+                twitter_data, {'username':'s', \
+                               'operations':['following*<=2']}))
+
+    def test_operations_in_query (self):
+        """ Test that queries keep multi-hop operations and reject badly
+        formed ones."""
+
+        query = tf.process_query (io.StringIO (\
+            "SEARCH\na\nfollowing*3\nfollowers*<=2\nFILTER\nPRESENT\n" \
+            "sort-by username\nformat short\n"))
+        self.assertEqual (['following*3', 'followers*<=2'], \
+                          query['search']['operations'])
+        for operation in ['following*', 'following*0', 'follow*2', \
+                          'followers*<2']:
+            self.assertRaises (ValueError, tf.process_query, io.StringIO (\
+                "SEARCH\na\n" + operation + "\nFILTER\nPRESENT\n" \
+                "sort-by username\nformat short\n"))
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,54 @@
+import unittest
+import twitterverse_functions as tf
+
+
+class TestTweetSort(unittest.TestCase):
+
+    def setUp (self):
+        """ Make a Twitterverse where a and c follow b, and x is followed
+        but is not a user."""
+
+        self.users = {\
+            'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', \
+                 'following':['b', 'x']},
+            'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', \
+                 'following':[]},
+            'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', \
+                 'following':['b']}}
+        self.twitterverses = [self.users, tf.Twitterverse (self.users)]
+
+    def test_keys_match_comparisons (self):
+        """ Test that sorting with keys gives the order the comparison
+        functions give."""
+
+        for twitter_data in self.twitterverses:
+            for cmp in [tf.username_first, tf.name_first, tf.more_popular]:
+                usernames = ['c', 'a', 'b']
+                tf.tweet_sort (twitter_data, usernames, cmp)
+                expected = ['c', 'a', 'b']
+                tf.tweet_sort (twitter_data, expected, \
+                               lambda data, a, b: cmp (data, a, b))
+                self.assertEqual (expected, usernames)
+
+    def test_single_unknown_username (self):
+        """ Test that a lone username that is not a user is left as it is,
+        whatever the sort order, as the insertion sort left it."""
+
+        for twitter_data in self.twitterverses:
+            for sort in ['username', 'name', 'popularity']:
+                for limit in [None, 0, 1, 5]:
+                    present = {'sort-by':sort, 'format':'short'}
+                    if limit is not None:
+                        present['limit'] = limit
+                    usernames = ['x']
+                    tf.sort_by (twitter_data, usernames, present)
+                    self.assertEqual (['x'][:limit], usernames)
+            self.assertEqual ([], tf.tweet_top_k (twitter_data, [], \
+                                                  tf.name_first, 1))
+            self.assertEqual ("['nobody']", tf.get_present_string (\
+                twitter_data, ['nobody'], {'sort-by':'name', \
+                                           'format':'short'}))
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
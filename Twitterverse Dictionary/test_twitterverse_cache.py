@@ -0,0 +1,97 @@
+import unittest
+import twitterverse_functions as tf
+from twitterverse_cache import QueryCache
+
+
+class TestQueryCache(unittest.TestCase):
+
+    def setUp (self):
+        """ Make a Twitterverse where a follows b and c, and b follows c."""
+
+        self.users = {\
+            'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', \
+                 'following':['b', 'c']},
+            'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', \
+                 'following':['c']},
+            'c':{'name':'Ann', 'location':'', 'web':'', 'bio':'', \
+                 'following':[]}}
+        self.twitter_data = tf.Twitterverse (self.users)
+        self.query = self.make_query ('a', 'name')
+
+    def make_query (self, username, sort_by):
+        """ Return a query for who username is following, sorted by
+        sort_by."""
+
+        return ({'search':{'username':username, 'operations':['following']}, \
+                 'filter':{}, \
+                 'present':{'sort-by':sort_by, 'format':'short'}})
+
+    def test_counters (self):
+        """ Test that a cold query counts one miss however many stages it
+        looks up, and that repeating it counts one hit."""
+
+        cache = QueryCache ()
+        self.assertEqual ("['c', 'b']", \
+                          cache.answer (self.twitter_data, self.query))
+        self.assertEqual ((0, 1), (cache.hits, cache.misses))
+        self.assertEqual ("['c', 'b']", \
+                          cache.answer (self.twitter_data, self.query))
+        self.assertEqual ((1, 1), (cache.hits, cache.misses))
+
+    def test_shared_stages (self):
+        """ Test that queries that only differ in presentation share their
+        search and filter results."""
+
+        cache = QueryCache ()
+        cache.answer (self.twitter_data, self.query)
+        size = len (cache)
+        self.assertEqual ("['b', 'c']", cache.answer (\
+            self.twitter_data, self.make_query ('a', 'username')))
+        self.assertEqual (size + 1, len (cache))
+        self.assertEqual (['b', 'c'], cache.filter (\
+            self.twitter_data, self.query['search'], self.query['filter']))
+        self.assertEqual ((1, 2), (cache.hits, cache.misses))
+
+    def test_lru_eviction (self):
+        """ Test that the least recently used entry is evicted first."""
+
+        cache = QueryCache (max_size=2)
+        a = {'username':'a', 'operations':['following']}
+        b = {'username':'b', 'operations':['following']}
+        c = {'username':'c', 'operations':['following']}
+        cache.search (self.twitter_data, a)
+        cache.search (self.twitter_data, b)
+        cache.search (self.twitter_data, a)
+        cache.search (self.twitter_data, c)
+        self.assertEqual (2, len (cache))
+        self.assertEqual (1, cache.evictions)
+        cache.search (self.twitter_data, a)
+        self.assertEqual ((2, 3), (cache.hits, cache.misses))
+        cache.search (self.twitter_data, b)
+        self.assertEqual ((2, 4), (cache.hits, cache.misses))
+
+    def test_version_invalidation (self):
+        """ Test that changing the Twitterverse makes its entries stale."""
+
+        cache = QueryCache ()
+        cache.answer (self.twitter_data, self.query)
+        self.twitter_data.follow ('a', 'a')
+        self.assertEqual ("['c', 'b', 'a']", \
+                          cache.answer (self.twitter_data, self.query))
+        self.twitter_data.unfollow ('a', 'b')
+        self.assertEqual ("['c', 'a']", \
+                          cache.answer (self.twitter_data, self.query))
+        self.assertEqual ((0, 3), (cache.hits, cache.misses))
+
+    def test_plain_dict (self):
+        """ Test that results over a plain dict are never cached."""
+
+        cache = QueryCache ()
+        cache.answer (self.users, self.query)
+        cache.answer (self.users, self.query)
+        self.assertEqual (0, len (cache))
+        self.assertEqual ((0, 0), (cache.hits, cache.misses))
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
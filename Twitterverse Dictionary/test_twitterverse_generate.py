@@ -0,0 +1,79 @@
+import io
+import os
+import statistics
+import tempfile
+import unittest
+import twitterverse_functions as tf
+import twitterverse_generate as tg
+import twitterverse_benchmark as tbm
+
+
+class TestTwitterverseGenerate(unittest.TestCase):
+
+    def setUp (self):
+        """ Generate a synthetic Twitterverse of 2000 users."""
+
+        self.users = list (tg.iter_synthetic_users (2000, 3))
+
+    def test_written_file_loads (self):
+        """ Test that process_data reads back exactly the users written."""
+
+        data_file = io.StringIO ()
+        for username, user in self.users:
+            tg.write_user (data_file, username, user)
+        data_file.seek (0)
+        self.assertEqual (dict (self.users), tf.process_data (data_file))
+
+    def test_seeded (self):
+        """ Test that a seed always gives the same users, and that another
+        seed gives different ones."""
+
+        data_files = []
+        for seed in [3, 3, 4]:
+            data_file = io.StringIO ()
+            tg.write_synthetic_data (data_file, 200, seed)
+            data_files.append (data_file.getvalue ())
+        self.assertEqual (data_files[0], data_files[1])
+        self.assertNotEqual (data_files[0], data_files[2])
+
+    def test_heavy_tail (self):
+        """ Test that nobody follows themselves or anyone twice, and that the
+        most followed users have far more followers than a typical one."""
+
+        counts = {}
+        for username, user in self.users:
+            self.assertNotIn (username, user['following'])
+            self.assertEqual (len (set (user['following'])), \
+                              len (user['following']))
+            self.assertTrue (tg.MIN_FOLLOWING <= len (user['following']) \
+                             <= tg.MAX_FOLLOWING)
+            for followed in user['following']:
+                counts[followed] = counts.get (followed, 0) + 1
+        follower_counts = [counts.get (username, 0) \
+                           for username, user in self.users]
+        self.assertTrue (max (follower_counts) > \
+                         20 * max (1, statistics.median (follower_counts)))
+
+    def test_benchmark_files_and_comparison (self):
+        """ Test that the benchmark generates each data file once, and only
+        reports rows that got slower by more than the factor."""
+
+        workdir = tempfile.mkdtemp ()
+        filename = tbm.synthetic_data_filename (workdir, 50, 1)
+        modified = os.path.getmtime (filename)
+        self.assertEqual (filename, tbm.synthetic_data_filename (workdir, 50, 1))
+        self.assertEqual (modified, os.path.getmtime (filename))
+        os.remove (filename)
+        os.rmdir (workdir)
+        old = [{'stage':'sort_by', 'users':50, 'seconds_median':1.0, \
+                'result_size':3}, \
+               {'stage':'filter', 'users':50, 'seconds_median':1.0}]
+        new = [{'stage':'sort_by', 'users':50, 'seconds_median':1.2, \
+                'result_size':4}, \
+               {'stage':'filter', 'users':50, 'seconds_median':2.0}, \
+               {'stage':'search', 'users':50, 'seconds_median':9.0}]
+        self.assertEqual ([(new[1], 2.0)], tbm.compare (old, new, 1.5))
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
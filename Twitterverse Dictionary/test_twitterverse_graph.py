@@ -0,0 +1,166 @@
+import unittest
+import twitterverse_functions as tf
+from twitterverse_graph import Twitterverse, TwitterverseGraph
+from twitterverse_index import get_substring_index
+
+
+def make_user (name, following):
+    """ Return a user dictionary with name who follows following."""
+
+    return ({'name':name, 'location':'', 'web':'', 'bio':'', \
+             'following':following})
+
+
+class TestTwitterverseGraph(unittest.TestCase):
+
+    def setUp (self):
+        """ Make a Twitterverse where a follows b and x, who is not a user,
+        and b and c follow a, and build its indexes."""
+
+        self.twitter_data = Twitterverse ({\
+            'a':make_user ('Zed', ['b', 'x']), \
+            'b':make_user ('Lee', ['a']), \
+            'c':make_user ('anna', ['a'])})
+        get_substring_index (self.twitter_data, 'name')
+        self.twitter_data.graph.popularity_index ()
+        tf.get_search_results (self.twitter_data, \
+            {'username':'a', 'operations':['followers*<=2']})
+
+    def assertCurrent (self):
+        """ Assert that the graph and indexes match ones built from
+        scratch, with every user's followers in the same order."""
+
+        fresh = TwitterverseGraph (self.twitter_data)
+        graph = self.twitter_data.graph
+        self.assertEqual (sorted (fresh.followed_usernames ()), \
+                          sorted (graph.followed_usernames ()))
+        for username in ['a', 'b', 'c', 'd', 'x'] + \
+                fresh.followed_usernames ():
+            self.assertEqual (fresh.followers (username), \
+                              graph.followers (username))
+        self.assertEqual (list (fresh.popularity_index ().iter_popular ()), \
+            list (self.twitter_data.graph.popularity_index ().iter_popular ()))
+        fresh_data = Twitterverse (dict (self.twitter_data))
+        for needle in ['e', 'an', 'z']:
+            self.assertEqual (\
+                get_substring_index (fresh_data, 'name').filter (\
+                    list (fresh_data), needle), \
+                get_substring_index (self.twitter_data, 'name').filter (\
+                    list (self.twitter_data), needle))
+        for username in self.twitter_data:
+            self.assertEqual (tf.get_search_results (fresh_data, \
+                {'username':username, 'operations':['followers*<=3']}), \
+                tf.get_search_results (self.twitter_data, \
+                {'username':username, 'operations':['followers*<=3']}))
+
+    def assertChanges (self, change):
+        """ Assert that change moves the Twitterverse on to a new version
+        and keeps it current."""
+
+        version = self.twitter_data.version
+        change ()
+        self.assertTrue (self.twitter_data.version > version)
+        self.assertCurrent ()
+
+    def test_followers_match_scan (self):
+        """ Test that the reverse index gives the followers and follower
+        counts that scanning every following list gives, in Twitterverse
+        order, counting a repeated follow once."""
+
+        users = {'b':make_user ('Lee', ['a', 'a']), \
+                 'c':make_user ('anna', ['x', 'a']), \
+                 'a':make_user ('Zed', ['x'])}
+        twitter_data = Twitterverse (users)
+        for username in ['a', 'b', 'c', 'x', 'nobody']:
+            self.assertEqual (tf.all_followers (users, username), \
+                              tf.all_followers (twitter_data, username))
+            self.assertEqual (len (tf.all_followers (users, username)), \
+                              twitter_data.graph.follower_count (username))
+        self.assertEqual (['a', 'x'], sorted (\
+            twitter_data.graph.followed_usernames ()))
+
+    def test_followers_keep_order (self):
+        """ Test that a follow added later is placed by the follower's
+        position in the Twitterverse, not by when it was made."""
+
+        self.twitter_data.follow ('c', 'b')
+        self.twitter_data.follow ('a', 'c')
+        self.assertEqual (['a', 'c'], self.twitter_data.graph.followers ('b'))
+        self.twitter_data['d'] = make_user ('Dee', ['b'])
+        self.twitter_data.follow ('b', 'b')
+        self.assertEqual (['a', 'b', 'c', 'd'], \
+                          self.twitter_data.graph.followers ('b'))
+        self.assertCurrent ()
+
+    def test_set_and_delete (self):
+        """ Test that setting and deleting users keeps the graph current."""
+
+        self.assertChanges (lambda: self.twitter_data.__setitem__ (\
+            'd', make_user ('Dee', ['c', 'a', 'x'])))
+        self.assertChanges (lambda: self.twitter_data.__setitem__ (\
+            'b', make_user ('Lee', ['a', 'x'])))
+        self.assertEqual (['a', 'b', 'd'], \
+                          self.twitter_data.graph.followers ('x'))
+        self.assertChanges (lambda: self.twitter_data.__delitem__ ('a'))
+        self.assertEqual (['b', 'c', 'd'], \
+                          self.twitter_data.graph.followers ('a'))
+
+    def test_delete_user (self):
+        """ Test that delete_user removes every follow to and from the user,
+        and that the followers left keep their order."""
+
+        self.assertChanges (lambda: self.twitter_data.__setitem__ (\
+            'd', make_user ('Dee', ['b', 'a'])))
+        self.assertChanges (lambda: self.twitter_data.unfollow ('a', 'b'))
+        self.assertChanges (lambda: self.twitter_data.follow ('a', 'b'))
+        self.assertChanges (lambda: self.twitter_data.delete_user ('a'))
+        self.assertEqual ([[], ['b']], [self.twitter_data[username] \
+            ['following'] for username in ['b', 'd']])
+        self.assertEqual ([], self.twitter_data.graph.followers ('a'))
+        self.assertEqual (['d'], self.twitter_data.graph.followers ('b'))
+
+    def test_update (self):
+        """ Test that update and |= go through the graph."""
+
+        self.assertChanges (lambda: self.twitter_data.update (\
+            {'d':make_user ('Dee', ['c'])}, b=make_user ('Lee', ['d'])))
+        self.assertChanges (lambda: self.twitter_data.update (\
+            [('e', make_user ('Eve', ['d']))]))
+        self.assertEqual (['b', 'e'], \
+                          self.twitter_data.graph.followers ('d'))
+
+        def merge ():
+            self.twitter_data |= {'f':make_user ('Fay', ['e'])}
+
+        self.assertChanges (merge)
+        self.assertIsInstance (self.twitter_data, Twitterverse)
+        self.assertEqual (['f'], self.twitter_data.graph.followers ('e'))
+
+    def test_pop_and_setdefault (self):
+        """ Test that pop, popitem and setdefault go through the graph."""
+
+        self.assertChanges (lambda: self.assertEqual (\
+            make_user ('Lee', ['a']), self.twitter_data.pop ('b')))
+        self.assertEqual (None, self.twitter_data.pop ('b', None))
+        self.assertRaises (KeyError, self.twitter_data.pop, 'b')
+        self.assertChanges (lambda: self.assertEqual (\
+            ('c', make_user ('anna', ['a'])), self.twitter_data.popitem ()))
+        self.assertEqual ([], self.twitter_data.graph.followers ('a'))
+        self.assertChanges (lambda: self.twitter_data.setdefault (\
+            'd', make_user ('Dee', ['a'])))
+        version = self.twitter_data.version
+        self.assertEqual ('Dee', self.twitter_data.setdefault (\
+            'd', make_user ('Other', []))['name'])
+        self.assertEqual (version, self.twitter_data.version)
+
+    def test_clear (self):
+        """ Test that clear empties the graph, and popitem then fails."""
+
+        self.assertChanges (self.twitter_data.clear)
+        self.assertEqual ([], self.twitter_data.graph.followers ('a'))
+        self.assertEqual ([], tf.most_followed (self.twitter_data, 3))
+        self.assertRaises (KeyError, self.twitter_data.popitem)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,74 @@
+import io
+import unittest
+import twitterverse_functions as tf
+import twitterverse_metrics as tm
+import twitterverse_parallel as tp
+
+
+class TestTwitterverseMetrics(unittest.TestCase):
+
+    def setUp (self):
+        """ Load a small Twitterverse where a and c follow b."""
+
+        self.data_file = io.StringIO(\
+            "a\nZed\nToronto\n\nENDBIO\nb\nEND\n" \
+            "b\nLee\n\n\nENDBIO\nEND\n" \
+            "c\nanna\n\n\nENDBIO\nb\nEND\n")
+
+    def test_stages_recorded (self):
+        """ Test that every stage of a query records its calls and \
+        counters while collecting."""
+
+        with tm.collecting() as metrics:
+            twitter_data = tf.process_data(self.data_file)
+            results = tf.get_search_results(twitter_data, \
+                {'username':'b', 'operations':['followers']})
+            results = tf.get_filter_results(twitter_data, results, \
+                {'location-includes':'toronto'})
+            tf.get_present_string(twitter_data, results, \
+                {'sort-by':'username', 'format':'short'})
+        stages = metrics.to_dict()
+        self.assertEqual (3, stages['process_data']['users_loaded'])
+        self.assertEqual (1, stages['search_usernames']['frontier_in'])
+        self.assertEqual (2, stages['search_usernames']['frontier_out'])
+        self.assertEqual (2, stages['filter_usernames']['users_scanned'])
+        self.assertEqual (1, stages['filter_usernames']['users_kept'])
+        self.assertEqual (1, stages['tweet_sort']['users_sorted'])
+        self.assertEqual (1, stages['get_present_string']['calls'])
+        self.assertEqual (None, tm.active())
+
+    def test_off_by_default (self):
+        """ Test that instrumented functions called with no collector active
+        record nothing, even into a Metrics that was started and stopped."""
+
+        self.assertEqual (None, tm.active())
+        metrics = tm.start()
+        tm.stop()
+        self.assertEqual (None, tm.active())
+        twitter_data = tf.process_data(self.data_file)
+        results = tf.get_search_results(twitter_data, \
+            {'username':'b', 'operations':['followers']})
+        tf.get_present_string(twitter_data, results, \
+            {'sort-by':'username', 'format':'short'})
+        self.assertEqual (['a', 'c'], results)
+        self.assertEqual ({}, metrics.to_dict())
+
+    def test_worker_metrics_merged (self):
+        """ Test that the metrics of queries answered by worker processes are
+        merged into the collecting Metrics."""
+
+        twitter_data = tf.process_data(self.data_file)
+        query = {'search':{'username':'b', 'operations':['followers']}, \
+                 'filter':{}, \
+                 'present':{'sort-by':'username', 'format':'short'}}
+        with tm.collecting() as metrics:
+            with tp.ParallelQueryExecutor(twitter_data, processes=2) \
+                    as executor:
+                results = executor.map([query] * 5)
+        self.assertEqual (["['a', 'c']"] * 5, results)
+        stages = metrics.to_dict()
+        self.assertEqual (5, stages['get_present_string']['calls'])
+        self.assertEqual (5, stages['search_usernames']['frontier_in'])
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,88 @@
+import unittest
+import twitterverse_functions as tf
+import twitterverse_compact as tc
+import twitterverse_numpy as tn
+
+
+class TestTwitterverseNumpy(unittest.TestCase):
+
+    def setUp (self):
+        """ Make a Twitterverse where b has three followers, d is followed \
+        but not a user, and a follows b twice."""
+
+        self.users = {\
+            'a':{'name':'Zed', 'location':'Toronto', 'web':'', 'bio':'', \
+                 'following':['b', 'b', 'd']}, 
+            'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', \
+                 'following':['c']}, 
+            'c':{'name':'anna', 'location':'toronto', 'web':'', 'bio':'', \
+                 'following':['b']},
+            'e':{'name':'Ann', 'location':'', 'web':'', 'bio':'', \
+                 'following':['b', 'c']}}
+        self.filters = [{}, {'following':'b'}, {'follower':'a'}, \
+            {'name-includes':'AN', 'location-includes':'to'}, \
+            {'following':'c', 'name-includes':'n'}, {'follower':'x'}]
+
+    def tearDown (self):
+        """ Leave the backend off for the other tests."""
+
+        tn.disable ()
+
+    def results (self, twitter_data):
+        """ Return the filtered and popularity-sorted results of every \
+        filter in self.filters."""
+
+        results = []
+        for filter_spec in self.filters:
+            usernames = tf.get_filter_results (twitter_data, \
+                ['e', 'c', 'b', 'a'], filter_spec)
+            tf.sort_by (twitter_data, usernames, {'sort-by':'popularity'})
+            results.append (usernames)
+        return (results)
+
+    def test_fallback_without_numpy (self):
+        """ Test that enabling the backend without NumPy keeps it off."""
+
+        self.assertEqual (tn.numpy is not None, tn.enable ())
+        self.assertEqual (tn.numpy is not None, tn.is_enabled ())
+
+    @unittest.skipIf (tn.numpy is None, "NumPy is not installed")
+    def test_same_as_python (self):
+        """ Test that sorting and filtering with the backend gives the same \
+        results as without it, for a Twitterverse and a compact one."""
+
+        expected = self.results (tf.Twitterverse (self.users))
+        tn.enable ()
+        self.assertEqual (expected, self.results (tf.Twitterverse (self.users)))
+        self.assertEqual (expected, self.results (\
+            tc.CompactTwitterverse.from_users (self.users.items ())))
+        arrays = tn.get_degree_arrays (tf.Twitterverse (self.users))
+        self.assertEqual ([0, 3, 2, 0, 1], arrays.follower_counts.tolist ())
+
+    @unittest.skipIf (tn.numpy is None, "NumPy is not installed")
+    def test_frontier_with_non_user (self):
+        """ Test that a frontier holding a username that is followed but is \
+        not a user is filtered the same way with the backend as without \
+        it."""
+
+        users = {\
+            'u1':{'name':'Zed', 'location':'', 'web':'', 'bio':'', \
+                  'following':['u2', 'u3']},
+            'u3':{'name':'Ann', 'location':'', 'web':'', 'bio':'', \
+                  'following':['u1']}}
+        filter_spec = {'follower':'u1', 'following':'u1', \
+                       'name-includes':'a'}
+        twitter_data = tf.Twitterverse (users)
+        expected = tf.get_filter_results (twitter_data, ['u2', 'u3'], \
+                                          filter_spec)
+        self.assertEqual (['u3'], expected)
+        tn.enable ()
+        self.assertEqual (expected, tf.get_filter_results (\
+            tf.Twitterverse (users), ['u2', 'u3'], filter_spec))
+        index = tf.get_substring_index (twitter_data, 'name')
+        self.assertEqual (['u3'], index.filter (['u2', 'u3'], 'a'))
+        self.assertEqual (['u3'], index.filter (['u2', 'u3'], 'ann'))
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,147 @@
+import asyncio
+import contextlib
+import io
+import unittest
+import twitterverse_functions as tf
+import twitterverse_parallel as tp
+import twitterverse_server as ts
+
+
+class TestTwitterverseServer(unittest.TestCase):
+
+    def setUp (self):
+        """ Load data.txt and the text and expected results of the sample \
+        queries."""
+
+        data_file = open('data.txt', 'r')
+        self.data = tf.process_data(data_file)
+        data_file.close()
+        self.query_texts = []
+        self.expected_results = []
+        for query_filename in ['query1.txt', 'query2.txt', 'query3.txt', \
+                               'query4.txt']:
+            query_file = open(query_filename, 'r')
+            query_text = query_file.read()
+            query_file.close()
+            self.query_texts.append (query_text)
+            self.expected_results.append (tp.answer_query(self.data, \
+                ts.parse_query_text(query_text)))
+
+    def test_many_concurrent_clients (self):
+        """ Test that many clients connected at once all get the results \
+        get_present_string gives for their queries."""
+
+        async def run_clients ():
+            server = ts.TwitterverseServer(self.data)
+            listener = await server.start(port=0)
+            port = listener.sockets[0].getsockname()[1]
+            async with listener:
+                return await asyncio.gather(*[\
+                    ts.ask(self.query_texts[i % 4], port=port) \
+                    for i in range(200)])
+
+        results = asyncio.run(run_clients())
+        for i in range(200):
+            self.assertEqual (self.expected_results[i % 4], results[i])
+
+    def test_several_queries_and_an_error_on_one_connection (self):
+        """ Test that one connection can send several queries, and that a \
+        bad query gets an error without closing the connection."""
+
+        async def run_client ():
+            server = ts.TwitterverseServer(self.data)
+            listener = await server.start(port=0)
+            port = listener.sockets[0].getsockname()[1]
+            async with listener:
+                reader, writer = await asyncio.open_connection( \
+                    ts.DEFAULT_HOST, port)
+                results = [await ts.send_query(reader, writer, \
+                                               self.query_texts[0])]
+                try:
+                    await ts.send_query(reader, writer, 'SEARCH\na\nFILTER')
+                except ValueError as error:
+                    results.append (str(error))
+                results.append (await ts.send_query(reader, writer, \
+                                                    self.query_texts[3]))
+                writer.close()
+                await writer.wait_closed()
+                return results
+
+        results = asyncio.run(run_client())
+        self.assertEqual ([self.expected_results[0], \
+                           'query has no PRESENT line', \
+                           self.expected_results[3]], results)
+
+    def test_unexpected_error_keeps_connection (self):
+        """ Test that a query that fails for any reason gets an error \
+        without closing the connection."""
+
+        data = dict (self.data)
+        data['broken'] = None
+
+        async def run_client ():
+            server = ts.TwitterverseServer(data)
+            listener = await server.start(port=0)
+            port = listener.sockets[0].getsockname()[1]
+            async with listener:
+                reader, writer = await asyncio.open_connection( \
+                    ts.DEFAULT_HOST, port)
+                results = []
+                try:
+                    await ts.send_query(reader, writer, 'SEARCH\nbroken\n' \
+                        'FILTER\nPRESENT\nsort-by username\nformat long')
+                except ValueError as error:
+                    results.append (str(error))
+                results.append (await ts.send_query(reader, writer, \
+                                                    self.query_texts[0]))
+                writer.close()
+                await writer.wait_closed()
+                return results
+
+        results = asyncio.run(run_client())
+        self.assertEqual (2, len (results))
+        self.assertNotEqual ('', results[0])
+        self.assertEqual (self.expected_results[0], results[1])
+
+    def test_process_workers (self):
+        """ Test that worker processes answer queries against the \
+        Twitterverse the server loaded."""
+
+        async def run_clients ():
+            executor = tp.shared_process_executor(self.data, 'data.txt', 2)
+            server = ts.TwitterverseServer(self.data, executor)
+            listener = await server.start(port=0)
+            port = listener.sockets[0].getsockname()[1]
+            try:
+                async with listener:
+                    return await asyncio.gather(*[\
+                        ts.ask(self.query_texts[i % 4], port=port) \
+                        for i in range(8)])
+            finally:
+                executor.shutdown()
+
+        results = asyncio.run(run_clients())
+        for i in range(8):
+            self.assertEqual (self.expected_results[i % 4], results[i])
+
+    def test_bad_arguments_print_usage (self):
+        """ Test that a port or process count that is not a number, an
+        unknown option or both a port and a socket exit with the usage
+        message."""
+
+        for arguments in [[], ['data.txt', '--port', 'x'], \
+                          ['data.txt', '--processes', 'two'], \
+                          ['data.txt', '--processes', '0'], \
+                          ['data.txt', '--prot', '9000'], \
+                          ['data.txt', '--port', '9000', '--unix', 'sock'], \
+                          ['data.txt', 'extra']]:
+            with contextlib.redirect_stderr (io.StringIO ()) as errors:
+                with self.assertRaises (SystemExit) as context:
+                    ts.main(arguments)
+            self.assertEqual (2, context.exception.code)
+            self.assertIn ('usage: python twitterverse_server.py', \
+                           errors.getvalue ())
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
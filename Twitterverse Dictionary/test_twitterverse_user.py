@@ -0,0 +1,47 @@
+import io
+import unittest
+import twitterverse_functions as tf
+import twitterverse_deltas as td
+from twitterverse_user import User
+
+
+class TestTwitterverseUser(unittest.TestCase):
+
+    def setUp (self):
+        """ Load the same small data file as dicts and as User records."""
+
+        text = "a\nZed\nToronto\nhttp://zed.ca\nhi\nthere\nENDBIO\nb\nc\n" \
+               "END\nb\nLee\n\n\nENDBIO\nEND\nc\nanna\nOttawa\n\nENDBIO\n" \
+               "b\nEND\n"
+        self.dicts = tf.process_data (io.StringIO (text))
+        self.records = tf.process_data (io.StringIO (text), True)
+
+    def test_same_results (self):
+        """ Test that filtering, sorting and formatting records gives the \
+        same results as dicts."""
+
+        self.assertTrue (isinstance (self.records['a'], User))
+        self.assertEqual (self.dicts, self.records)
+        for present in [{'sort-by':'name', 'format':'long'}, \
+                        {'sort-by':'popularity', 'format':'short'}]:
+            self.assertEqual (\
+                tf.get_present_string (self.dicts, ['a', 'b', 'c'], present), \
+                tf.get_present_string (self.records, ['a', 'b', 'c'], present))
+        self.assertEqual (['a'], tf.get_filter_results (self.records, \
+            ['a', 'b', 'c'], {'name-includes':'z', 'following':'b'}))
+
+    def test_interned_and_updated (self):
+        """ Test that usernames are stored once, and that a record can be \
+        updated by deltas."""
+
+        self.assertTrue (self.records['a']['following'][0] is \
+                         self.records['c']['following'][0])
+        td.apply_deltas (self.records, io.StringIO (\
+            "UPDATE b\nlocation Paris\nEND\n"))
+        self.assertEqual ('Paris', self.records['b']['location'])
+        self.assertRaises (KeyError, self.records['b'].__setitem__, \
+                           'age', 3)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,261 @@
+"""
+Stage-by-stage benchmarks of the Twitterverse functions.
+
+For each size of synthetic Twitterverse (see twitterverse_generate), the
+benchmark times process_data and then, for several query shapes started
+from both the most followed user and a typical user, times
+get_search_results, get_filter_results, sort_by and get_present_string
+separately. Results are written as JSON, and can be compared with the JSON
+of an earlier run to catch regressions.
+
+Usage:
+    python twitterverse_benchmark.py [--sizes 1000,10000] [--repeat 3] \
+[--loader text|compact|binary] [--workdir DIR] [--output results.json] \
+[--compare old.json] [--label NAME]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import twitterverse_functions as tf
+import twitterverse_compact as tc
+import twitterverse_binary as tb
+import twitterverse_generate as tg
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_REPEAT = 3
+# A stage counts as a regression when its median time grows by this factor.
+REGRESSION_FACTOR = 1.2
+
+# Query shapes: name -> (search operations, filter specification).
+QUERY_SHAPES = {
+    "following": (["following"], {}),
+    "followers": (["followers"], {}),
+    "following-followers": (["following", "followers"],
+                            {"name-includes": "ann"}),
+    "followers-followers": (["followers", "followers"],
+                            {"location-includes": "toronto"}),
+    "followers-following-filter": (["followers"], {"following": None}),
+}
+PRESENT_SPECS = tuple({"sort-by": sort_by, "format": format_name}
+                      for sort_by in ("username", "name", "popularity")
+                      for format_name in ("short", "long")) + \
+    ({"sort-by": "popularity", "format": "long", "limit": 50},)
+
+
+def time_call(repeat, function, *arguments):
+    """ (int, function, object...) -> (list of float, object)
+
+    Call function with arguments repeat times and return the seconds each
+    call took and the result of the last call.
+    """
+
+    seconds = []
+    result = None
+    for attempt in range(repeat):
+        start = time.perf_counter()
+        result = function(*arguments)
+        seconds.append(time.perf_counter() - start)
+    return (seconds, result)
+
+
+def record(results, seconds, **fields):
+    """ (list of dict, list of float, **object) -> NoneType
+
+    Append a result row with fields and a summary of seconds to results.
+    """
+
+    row = dict(fields)
+    row["seconds_min"] = min(seconds)
+    row["seconds_median"] = statistics.median(seconds)
+    results.append(row)
+
+
+def synthetic_data_filename(workdir, user_count, seed):
+    """ (str, int, int) -> str
+
+    Return the name of a synthetic data file of user_count users in workdir,
+    generating it first if it does not exist yet.
+    """
+
+    filename = os.path.join(workdir, "synthetic_{}_{}.txt".format(user_count,
+                                                                  seed))
+    if not os.path.exists(filename):
+        data_file = open(filename + ".part", "w")
+        tg.write_synthetic_data(data_file, user_count, seed)
+        data_file.close()
+        os.replace(filename + ".part", filename)
+    return (filename)
+
+
+def load(loader, data_filename):
+    """ (str, str) -> Twitterverse dictionary
+
+    Load data_filename with loader, which is "text" for process_data,
+    "compact" for process_data_compact or "binary" for load_binary (the
+    binary file is converted once, outside of the timed call).
+    """
+
+    if loader == "binary":
+        return (tb.load_binary(data_filename + ".twvb"))
+    data_file = open(data_filename, "r")
+    if loader == "compact":
+        data = tc.process_data_compact(data_file)
+    else:
+        data = tf.process_data(data_file)
+    data_file.close()
+    return (data)
+
+
+def start_users(data):
+    """ (Twitterverse dictionary) -> dict of {str: str}
+
+    Return the users to start searches at: the most followed user and a user
+    with the median number of followers.
+    """
+
+    follower_counts = tf.follower_counts(data, list(data))
+    ranked = sorted(follower_counts, key=follower_counts.__getitem__)
+    return ({"popular": ranked[-1], "typical": ranked[len(ranked) // 2]})
+
+
+def benchmark_size(user_count, loader, repeat, workdir, seed, results):
+    """ (int, str, int, str, int, list of dict) -> NoneType
+
+    Benchmark every stage on a synthetic Twitterverse of user_count users,
+    appending result rows to results.
+    """
+
+    data_filename = synthetic_data_filename(workdir, user_count, seed)
+    if loader == "binary" and not os.path.exists(data_filename + ".twvb"):
+        tb.convert_data_file(data_filename, data_filename + ".twvb")
+    seconds, data = time_call(repeat, load, loader, data_filename)
+    record(results, seconds, users=user_count, stage="process_data",
+           loader=loader)
+
+    for start_name, username in sorted(start_users(data).items()):
+        for shape_name, (operations, filter_spec) in QUERY_SHAPES.items():
+            filter_spec = dict(filter_spec)
+            if "following" in filter_spec:
+                filter_spec["following"] = username
+            common = {"users": user_count, "loader": loader,
+                      "query": shape_name, "start": start_name}
+            search_spec = {"username": username, "operations": operations}
+            seconds, search_results = time_call(
+                repeat, tf.get_search_results, data, search_spec)
+            record(results, seconds, stage="get_search_results",
+                   result_size=len(search_results), **common)
+            seconds, filtered_results = time_call(
+                repeat, tf.get_filter_results, data, search_results,
+                filter_spec)
+            record(results, seconds, stage="get_filter_results",
+                   result_size=len(filtered_results), **common)
+            for present_spec in PRESENT_SPECS:
+                present = dict(present_spec)
+                if present_spec["format"] == "short":
+                    seconds, unused = time_call(
+                        repeat, lambda: tf.sort_by(data, search_results[:],
+                                                   present_spec))
+                    record(results, seconds, stage="sort_by",
+                           result_size=len(search_results),
+                           **dict(common, **present))
+                seconds, unused = time_call(
+                    repeat, tf.get_present_string, data, filtered_results,
+                    present_spec)
+                record(results, seconds, stage="get_present_string",
+                       result_size=len(filtered_results),
+                       **dict(common, **present))
+
+
+def row_key(row):
+    """ (dict) -> tuple
+
+    Return what identifies a result row across runs.
+    """
+
+    return (tuple(sorted((name, value) for name, value in row.items()
+                         if not name.startswith("seconds")
+                         and name != "result_size")))
+
+
+def compare(old_results, new_results, factor=REGRESSION_FACTOR):
+    """ (list of dict, list of dict, float) -> list of (dict, float)
+
+    Return the rows of new_results whose median time is more than factor
+    times that of the same row in old_results, each with its slowdown.
+
+    >>> compare([{"stage": "sort_by", "seconds_median": 1.0}], \
+    [{"stage": "sort_by", "seconds_median": 3.0}])
+    [({'stage': 'sort_by', 'seconds_median': 3.0}, 3.0)]
+    """
+
+    old_medians = {row_key(row): row["seconds_median"] for row in old_results}
+    regressions = []
+    for row in new_results:
+        old_median = old_medians.get(row_key(row))
+        if old_median and row["seconds_median"] > old_median * factor:
+            regressions.append((row, row["seconds_median"] / old_median))
+    return (regressions)
+
+
+def main(arguments):
+    """ (list of str) -> int
+
+    Run the benchmarks described by the command line arguments and return
+    the exit status: 1 if a regression was found, 0 otherwise.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Twitterverse functions stage by stage.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated numbers of users")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--loader", choices=("text", "compact", "binary"),
+                        default="text")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=tempfile.gettempdir(),
+                        help="where synthetic data files are kept")
+    parser.add_argument("--output", help="JSON file to write results to")
+    parser.add_argument("--compare", help="JSON results of an earlier run")
+    parser.add_argument("--label", default="",
+                        help="name of this run, such as a version")
+    options = parser.parse_args(arguments)
+
+    results = []
+    for user_count in [int(size) for size in options.sizes.split(",")]:
+        sys.stderr.write("benchmarking {} users\n".format(user_count))
+        benchmark_size(user_count, options.loader, options.repeat,
+                       options.workdir, options.seed, results)
+    report = {"label": options.label, "python": platform.python_version(),
+              "platform": platform.platform(), "time": time.time(),
+              "seed": options.seed, "repeat": options.repeat,
+              "results": results}
+    if options.output:
+        output_file = open(options.output, "w")
+        json.dump(report, output_file, indent=1)
+        output_file.close()
+    else:
+        json.dump(report, sys.stdout, indent=1)
+        sys.stdout.write("\n")
+
+    if options.compare:
+        old_file = open(options.compare, "r")
+        old_report = json.load(old_file)
+        old_file.close()
+        regressions = compare(old_report["results"], results)
+        for row, slowdown in regressions:
+            sys.stderr.write("regression {:.2f}x: {}\n".format(
+                slowdown, json.dumps(dict(row_key(row)))))
+        if regressions:
+            return (1)
+    return (0)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
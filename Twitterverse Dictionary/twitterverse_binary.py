@@ -0,0 +1,293 @@
+"""
+Binary, memory-mapped Twitterverse files.
+
+convert_data_file turns a data file in the format process_data reads into a
+binary file, once. load_binary then mmaps that file and returns a
+CompactTwitterverse whose id arrays and string columns are read straight out
+of the mapped file, so loading costs a few system calls no matter how many
+users there are.
+
+Binary file layout (all integers in native byte order):
+    - 8 bytes: MAGIC
+    - 8 bytes: byte order marker, BYTE_ORDER_MARK as a signed 64-bit int
+    - 8 bytes each: user count, id count, section count
+    - 16 bytes per section: offset and length in bytes of the section
+    - the sections, each starting at a multiple of 8 bytes, in SECTIONS order
+
+Usage:
+    python twitterverse_binary.py data.txt data.twvb
+"""
+
+import mmap
+import struct
+import sys
+from array import array
+
+import twitterverse_functions as tf
+import twitterverse_compact as tc
+import twitterverse_ingest as ti
+import twitterverse_lazy as tl
+
+MAGIC = b"TWVBIN01"
+BYTE_ORDER_MARK = 0x0102030405060708
+HEADER = struct.Struct("=8sqqqq")
+SECTION = struct.Struct("=qq")
+
+# Section names in file order. For each string table there is an offsets
+# section (64-bit ints, one more than the number of strings) and a blob
+# section of UTF-8 bytes.
+STRING_TABLES = ("usernames", "name", "location", "web", "bio")
+SECTIONS = ("usernames_offsets", "usernames_blob", "usernames_sorted",
+            "following_offsets", "following_targets",
+            "follower_offsets", "follower_targets",
+            "name_offsets", "name_blob", "location_offsets", "location_blob",
+            "web_offsets", "web_blob", "bio_offsets", "bio_blob")
+
+
+class StringColumn:
+    """ A read-only sequence of str decoded on demand from an offsets array
+    and a UTF-8 blob.
+    """
+
+    def __init__(self, offsets, blob):
+        """ (StringColumn, sequence of int, memoryview) -> NoneType """
+
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        """ (StringColumn) -> int """
+
+        return (len(self.offsets) - 1)
+
+    def __getitem__(self, index):
+        """ (StringColumn, int) -> str
+
+        Return the string at index.
+        """
+
+        if index < 0:
+            index = index + len(self)
+        return (str(self.raw(index), "utf-8"))
+
+    def raw(self, index):
+        """ (StringColumn, int) -> memoryview
+
+        Return the UTF-8 bytes of the string at index, without copying them.
+        """
+
+        return (self.blob[self.offsets[index]:self.offsets[index + 1]])
+
+
+def _string_table(strings):
+    """ (iterable of str) -> (array, bytes)
+
+    Return the offsets and UTF-8 blob of a string table holding strings.
+    """
+
+    offsets = array(tc.OFFSET_TYPECODE, [0])
+    encoded = []
+    size = 0
+    for string in strings:
+        data = string.encode("utf-8")
+        encoded.append(data)
+        size = size + len(data)
+        offsets.append(size)
+    return (offsets, b"".join(encoded))
+
+
+def write_binary(compact, binary_file):
+    """ (CompactTwitterverse, file open for writing in binary mode) -> \
+    NoneType
+
+    Write compact to binary_file in the binary Twitterverse layout.
+    """
+
+    sections = {}
+    for table in STRING_TABLES:
+        if table == "usernames":
+            strings = compact.usernames
+        else:
+            strings = compact.columns[table]
+        offsets, blob = _string_table(strings)
+        sections[table + "_offsets"] = offsets.tobytes()
+        sections[table + "_blob"] = blob
+    encoded_usernames = [username.encode("utf-8")
+                         for username in compact.usernames]
+    sections["usernames_sorted"] = array(
+        tc.ID_TYPECODE, sorted(range(len(encoded_usernames)),
+                               key=encoded_usernames.__getitem__)).tobytes()
+    del encoded_usernames
+    for name in ("following_offsets", "following_targets",
+                 "follower_offsets", "follower_targets"):
+        if name.endswith("_offsets"):
+            typecode = tc.OFFSET_TYPECODE
+        else:
+            typecode = tc.ID_TYPECODE
+        sections[name] = array(typecode, getattr(compact, name)).tobytes()
+
+    position = HEADER.size + SECTION.size * len(SECTIONS)
+    table = []
+    for name in SECTIONS:
+        position = _align(position)
+        table.append((position, len(sections[name])))
+        position = position + len(sections[name])
+    binary_file.write(HEADER.pack(MAGIC, BYTE_ORDER_MARK, compact.user_count,
+                                  len(compact.usernames), len(SECTIONS)))
+    for offset, length in table:
+        binary_file.write(SECTION.pack(offset, length))
+    position = HEADER.size + SECTION.size * len(SECTIONS)
+    for name, (offset, length) in zip(SECTIONS, table):
+        binary_file.write(b"\0" * (offset - position))
+        binary_file.write(sections[name])
+        position = offset + length
+
+
+def _align(position):
+    """ (int) -> int
+
+    Return position rounded up to a multiple of 8.
+
+    >>> _align(9)
+    16
+    """
+
+    return ((position + 7) // 8 * 8)
+
+
+def convert_data_file(data_filename, binary_filename):
+    """ (str, str) -> NoneType
+
+    Convert the data file named data_filename into a binary Twitterverse file
+    named binary_filename.
+    """
+
+    data_file = open(data_filename, "r")
+    compact = tc.process_data_compact(data_file)
+    data_file.close()
+    binary_file = open(binary_filename, "wb")
+    write_binary(compact, binary_file)
+    binary_file.close()
+
+
+def load_binary(binary_filename):
+    """ (str) -> CompactTwitterverse
+
+    Return a CompactTwitterverse backed by a read-only memory map of the
+    binary Twitterverse file binary_filename.
+    """
+
+    binary_file = open(binary_filename, "rb")
+    try:
+        mapped = mmap.mmap(binary_file.fileno(), 0, access=mmap.ACCESS_READ)
+    finally:
+        binary_file.close()
+    buffer = memoryview(mapped)
+    magic, mark, user_count, id_count, section_count = HEADER.unpack_from(
+        buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(binary_filename + " is not a binary Twitterverse file")
+    if mark != BYTE_ORDER_MARK:
+        raise ValueError(binary_filename + " was written with another byte order")
+    if section_count != len(SECTIONS):
+        raise ValueError(binary_filename + " has an unknown section layout")
+
+    sections = {}
+    for index, name in enumerate(SECTIONS):
+        offset, length = SECTION.unpack_from(
+            buffer, HEADER.size + SECTION.size * index)
+        section = buffer[offset:offset + length]
+        if name.endswith("_offsets"):
+            section = section.cast(tc.OFFSET_TYPECODE)
+        elif not name.endswith("_blob"):
+            section = section.cast(tc.ID_TYPECODE)
+        sections[name] = section
+
+    usernames = StringColumn(sections["usernames_offsets"],
+                             sections["usernames_blob"])
+    columns = {}
+    for field in STRING_TABLES[1:]:
+        columns[field] = StringColumn(sections[field + "_offsets"],
+                                      sections[field + "_blob"])
+    compact = tc.CompactTwitterverse(
+        usernames, user_count, columns,
+        sections["following_offsets"], sections["following_targets"],
+        sections["follower_offsets"], sections["follower_targets"],
+        _sorted_lookup(usernames, sections["usernames_sorted"]))
+    compact.mapped_file = mapped
+    return (compact)
+
+
+def _sorted_lookup(usernames, sorted_ids):
+    """ (StringColumn, sequence of int) -> function
+
+    Return a function from username to id (or None) that binary searches
+    sorted_ids, the ids of usernames in order of their UTF-8 bytes.
+    """
+
+    def user_id(username):
+        target = username.encode("utf-8")
+        low = 0
+        high = len(sorted_ids)
+        while low < high:
+            middle = (low + high) // 2
+            if bytes(usernames.raw(sorted_ids[middle])) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(sorted_ids) and \
+                bytes(usernames.raw(sorted_ids[low])) == target:
+            return (sorted_ids[low])
+        return (None)
+
+    return (user_id)
+
+
+def is_binary_file(filename):
+    """ (str) -> bool
+
+    Return True if filename is a binary Twitterverse file.
+    """
+
+    binary_file = open(filename, "rb")
+    magic = binary_file.read(len(MAGIC))
+    binary_file.close()
+    return (magic == MAGIC)
+
+
+def load_twitterverse(filename, processes=None, lazy=False, records=False):
+    """ (str, int, bool, bool) -> dict of {str: dict of {str: object}}
+
+    Return the Twitterverse in filename, which is either a binary
+    Twitterverse file or a data file in the format process_data reads. A data
+    file is parsed on processes worker processes when processes is given, and
+    its users are slotted User records if records is True. Alternatively, it
+    is loaded without its webs and bios if lazy is True (see
+    twitterverse_lazy). Raise ValueError if lazy is combined with processes
+    or records, or if a binary file is loaded with any of them, since a
+    binary file is always memory-mapped as it is.
+    """
+
+    if lazy and (processes is not None or records):
+        raise ValueError("lazy loading cannot be combined with processes "
+                         "or records")
+    if is_binary_file(filename):
+        if lazy or records or processes is not None:
+            raise ValueError("a binary file cannot be loaded lazily, as "
+                             "records or on processes")
+        return (load_binary(filename))
+    if lazy:
+        return (tl.process_data_lazy(filename))
+    if processes is not None:
+        return (ti.process_data_parallel(filename, processes,
+                                         records=records))
+    data_file = open(filename, "r")
+    data = tf.process_data(data_file, records)
+    data_file.close()
+    return (data)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        sys.exit("usage: python twitterverse_binary.py DATA_FILE BINARY_FILE")
+    convert_data_file(sys.argv[1], sys.argv[2])
@@ -0,0 +1,229 @@
+"""
+LRU cache of Twitterverse query results.
+
+A QueryCache sits in front of get_search_results, get_filter_results and
+get_present_string. Each stage is keyed on a canonical form of its part of
+the query dictionary and of the stages before it, so queries that only
+differ in the order of their filter or presentation lines share entries,
+and answer caches whole queries so that a repeated query skips search,
+filter and formatting entirely. The hit and miss counters count the calls
+made to the cache, not the stages looked up to answer them.
+
+Entries are tied to the Twitterverse they were computed from and to its
+version attribute, so they go stale as soon as that Twitterverse changes.
+Twitterverses without a version attribute, such as plain dicts, can change
+without anyone noticing, so their results are never cached.
+"""
+
+import weakref
+from collections import OrderedDict
+
+import twitterverse_functions as tf
+
+DEFAULT_MAX_SIZE = 1024
+
+
+def canonical_search_spec(search_spec_dict):
+    """ (dict of {str: object}) -> tuple
+
+    Return a hashable canonical form of search_spec_dict.
+
+    >>> canonical_search_spec({"username":"a", "operations":["followers"]})
+    ('a', ('followers',))
+    """
+
+    return ((search_spec_dict["username"],
+             tuple(search_spec_dict["operations"])))
+
+
+def canonical_spec(spec_dict):
+    """ (dict of {str: str}) -> tuple
+
+    Return a hashable canonical form of a filter or presentation
+    specification dictionary, which does not depend on the order of its keys.
+
+    >>> canonical_spec({"format":"long", "sort-by":"name"})
+    (('format', 'long'), ('sort-by', 'name'))
+    """
+
+    return (tuple(sorted(spec_dict.items())))
+
+
+def canonical_query(query_dict):
+    """ (dict of {str: dict of {str: object}}) -> tuple
+
+    Return a hashable canonical form of query_dict.
+    """
+
+    return ((canonical_search_spec(query_dict["search"]),
+             canonical_spec(query_dict["filter"]),
+             canonical_spec(query_dict["present"])))
+
+
+class QueryCache:
+    """ A size-bounded, least-recently-used cache of query results.
+
+    >>> twitter_data = tf.Twitterverse({\
+    'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b']}, \
+    'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':[]}})
+    >>> cache = QueryCache(max_size=2)
+    >>> cache.search(twitter_data, {"username":"a", "operations":["following"]})
+    ['b']
+    >>> cache.search(twitter_data, {"username":"a", "operations":["following"]})
+    ['b']
+    >>> cache.hits, cache.misses
+    (1, 1)
+    >>> twitter_data['b']['following'].append('a')
+    >>> twitter_data.mark_changed()
+    >>> cache.search(twitter_data, {"username":"b", "operations":["following"]})
+    ['a']
+    >>> cache.hits, cache.misses
+    (1, 2)
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE):
+        """ (QueryCache, int) -> NoneType
+
+        Make an empty cache that holds at most max_size results.
+        """
+
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        """ (QueryCache) -> int """
+
+        return (len(self._entries))
+
+    def clear(self):
+        """ (QueryCache) -> NoneType
+
+        Remove every entry, keeping the hit and miss counters.
+        """
+
+        self._entries.clear()
+
+    def stats(self):
+        """ (QueryCache) -> dict of {str: int}
+
+        Return the size, bound and counters of this cache.
+        """
+
+        return ({"size": len(self._entries), "max_size": self.max_size,
+                 "hits": self.hits, "misses": self.misses,
+                 "evictions": self.evictions})
+
+    def _lookup(self, twitterverse_dict, key, compute, counted=True):
+        """ (QueryCache, dict of {str: dict of {str: object}}, tuple, \
+        function, bool) -> object
+
+        Return the cached value of key for twitterverse_dict, or compute it
+        with compute() and cache it. The hit or miss is only counted if
+        counted is True.
+        """
+
+        version = getattr(twitterverse_dict, "version", None)
+        if version is None:
+            return (compute())
+        key = (id(twitterverse_dict), version) + key
+        entry = self._entries.get(key)
+        # The id of a Twitterverse can be reused once it is garbage
+        # collected, so entries also remember which object they belong to.
+        if entry is not None and entry[0]() is twitterverse_dict:
+            self._entries.move_to_end(key)
+            if counted:
+                self.hits = self.hits + 1
+            return (entry[1])
+        if counted:
+            self.misses = self.misses + 1
+        value = compute()
+        if self.max_size > 0:
+            self._entries[key] = (weakref.ref(twitterverse_dict), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions = self.evictions + 1
+        return (value)
+
+    def _search(self, twitterverse_dict, search_spec_dict, counted):
+        """ (QueryCache, dict of {str: dict of {str: object}}, \
+        dict of {str: object}, bool) -> tuple of str
+
+        Return the cached search results of search_spec_dict.
+        """
+
+        key = ("search", canonical_search_spec(search_spec_dict))
+        return (self._lookup(
+            twitterverse_dict, key,
+            lambda: tuple(tf.get_search_results(twitterverse_dict,
+                                                search_spec_dict)),
+            counted))
+
+    def _filter(self, twitterverse_dict, search_spec_dict, filter_spec_dict,
+                counted):
+        """ (QueryCache, dict of {str: dict of {str: object}}, \
+        dict of {str: object}, dict of {str: str}, bool) -> tuple of str
+
+        Return the cached filtered results of search_spec_dict, keyed on the
+        search it filters rather than on a copy of the search results.
+        """
+
+        def compute():
+            search_results = list(self._search(twitterverse_dict,
+                                               search_spec_dict, False))
+            return (tuple(tf.get_filter_results(twitterverse_dict,
+                                                search_results,
+                                                filter_spec_dict)))
+
+        key = ("filter", canonical_search_spec(search_spec_dict),
+               canonical_spec(filter_spec_dict))
+        return (self._lookup(twitterverse_dict, key, compute, counted))
+
+    def search(self, twitterverse_dict, search_spec_dict):
+        """ (QueryCache, dict of {str: dict of {str: object}}, \
+        dict of {str: object}) -> list of str
+
+        Return get_search_results(twitterverse_dict, search_spec_dict),
+        from the cache if possible.
+        """
+
+        return (list(self._search(twitterverse_dict, search_spec_dict, True)))
+
+    def filter(self, twitterverse_dict, search_spec_dict, filter_spec_dict):
+        """ (QueryCache, dict of {str: dict of {str: object}}, \
+        dict of {str: object}, dict of {str: str}) -> list of str
+
+        Return get_filter_results of the search results of search_spec_dict
+        and filter_spec_dict, from the cache if possible.
+        """
+
+        return (list(self._filter(twitterverse_dict, search_spec_dict,
+                                  filter_spec_dict, True)))
+
+    def answer(self, twitterverse_dict, query_dict):
+        """ (QueryCache, dict of {str: dict of {str: object}}, \
+        dict of {str: dict of {str: object}}) -> str
+
+        Return the presented results of query_dict against
+        twitterverse_dict. A repeated query is answered straight from the
+        cache; otherwise its search and filter stages are looked up in turn,
+        so that queries sharing them share their results. Only the query
+        itself counts as a hit or a miss.
+        """
+
+        def compute():
+            filtered_results = list(self._filter(twitterverse_dict,
+                                                 query_dict["search"],
+                                                 query_dict["filter"], False))
+            return (tf.get_present_string(twitterverse_dict, filtered_results,
+                                          query_dict["present"]))
+
+        key = ("query", canonical_query(query_dict))
+        return (self._lookup(twitterverse_dict, key, compute))
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
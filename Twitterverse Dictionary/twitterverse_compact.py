@@ -0,0 +1,328 @@
+"""
+Compact, read-only storage for large Twitterverses.
+
+A CompactTwitterverse holds the same information as a Twitterverse
+dictionary, but in far fewer Python objects:
+    - every username is interned to an integer id, users first (in file
+      order) and then usernames that are followed but have no record
+    - name, location, web and bio are kept in columnar lists indexed by id
+    - following and follower edges are kept in CSR form: for user id i, the
+      ids it follows are targets[offsets[i]:offsets[i + 1]]
+
+A CompactTwitterverse is also a read-only mapping from username to a
+user dictionary view, so get_search_results, get_filter_results and
+get_present_string work on it unchanged. It is its own graph, in the sense of
+twitterverse_graph.get_graph.
+"""
+
+from array import array
+from collections.abc import Mapping
+
+import twitterverse_functions as tf
+
+# Type codes of the id and offset arrays.
+ID_TYPECODE = "i"
+OFFSET_TYPECODE = "q"
+
+USER_FIELDS = ("name", "location", "web", "bio", "following")
+
+
+class CompactUser(Mapping):
+    """ A read-only user dictionary view over one user of a
+    CompactTwitterverse.
+    """
+
+    __slots__ = ("_compact", "_user_id")
+
+    def __init__(self, compact, user_id):
+        """ (CompactUser, CompactTwitterverse, int) -> NoneType """
+
+        self._compact = compact
+        self._user_id = user_id
+
+    def __getitem__(self, key):
+        """ (CompactUser, str) -> object
+
+        Return the value of field key of this user, as it would be in a
+        Twitterverse dictionary.
+        """
+
+        compact = self._compact
+        if key == "following":
+            return ([compact.usernames[target]
+                     for target in compact.following_ids(self._user_id)])
+        if key in compact.columns:
+            return (compact.columns[key][self._user_id])
+        raise KeyError(key)
+
+    def __iter__(self):
+        """ (CompactUser) -> iterator of str """
+
+        return (iter(USER_FIELDS))
+
+    def __len__(self):
+        """ (CompactUser) -> int """
+
+        return (len(USER_FIELDS))
+
+    def __repr__(self):
+        """ (CompactUser) -> str """
+
+        return (repr(dict(self)))
+
+
+class CompactTwitterverse(Mapping):
+    """ A read-only Twitterverse with integer ids, columnar fields and CSR
+    adjacency.
+
+    >>> compact = CompactTwitterverse.from_users([\
+    ('a', {'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b', 'x']}), \
+    ('b', {'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':['a']})])
+    >>> list(compact)
+    ['a', 'b']
+    >>> compact['a']['following']
+    ['b', 'x']
+    >>> compact.followers('x')
+    ['a']
+    >>> 'x' in compact
+    False
+    """
+
+    def __init__(self, usernames, user_count, columns, following_offsets,
+                 following_targets, follower_offsets, follower_targets,
+                 user_id=None):
+        """ (CompactTwitterverse, sequence of str, int, \
+        dict of {str: sequence of str}, sequence of int, sequence of int, \
+        sequence of int, sequence of int, function) -> NoneType
+
+        Wrap already built columns and CSR arrays. usernames holds every
+        interned username by id, and the first user_count of them are users.
+        user_id is a function from username to id (or None if not interned);
+        by default a dict is built from usernames.
+        """
+
+        self.usernames = usernames
+        self.user_count = user_count
+        self.columns = columns
+        self.following_offsets = following_offsets
+        self.following_targets = following_targets
+        self.follower_offsets = follower_offsets
+        self.follower_targets = follower_targets
+        if user_id is None:
+            ids = {username: i for i, username in enumerate(usernames)}
+            user_id = ids.get
+        self.user_id = user_id
+        self.graph = self
+        # A CompactTwitterverse never changes, so it is always version 0.
+        self.version = 0
+
+    @classmethod
+    def from_users(cls, users):
+        """ (type, iterable of (str, dict of {str: object})) -> \
+        CompactTwitterverse
+
+        Build a CompactTwitterverse from (username, user dictionary) pairs,
+        such as those yielded by twitterverse_functions.iter_users or the
+        items of a Twitterverse dictionary. Later records for a username
+        replace earlier ones, as they do in process_data.
+        """
+
+        ids = {}
+        usernames = []
+        # Position of each user in file order, by first-seen id, and the
+        # record that currently holds each user's fields and edges.
+        positions = {}
+        columns = {field: [] for field in USER_FIELDS[:-1]}
+        record_targets = array(ID_TYPECODE)
+        record_ranges = []
+        for username, user in users:
+            user_id = _intern(ids, usernames, username)
+            start = len(record_targets)
+            for followed in user["following"]:
+                record_targets.append(_intern(ids, usernames, followed))
+            if user_id in positions:
+                position = positions[user_id]
+                record_ranges[position] = (start, len(record_targets))
+                for field in columns:
+                    columns[field][position] = user[field]
+            else:
+                positions[user_id] = len(record_ranges)
+                record_ranges.append((start, len(record_targets)))
+                for field in columns:
+                    columns[field].append(user[field])
+
+        # Renumber so users come first, in file order, then everyone else in
+        # the order they were first seen.
+        user_count = len(record_ranges)
+        new_ids = array(ID_TYPECODE, [0]) * len(usernames)
+        for old_id, position in positions.items():
+            new_ids[old_id] = position
+        next_id = user_count
+        for old_id in range(len(usernames)):
+            if old_id not in positions:
+                new_ids[old_id] = next_id
+                next_id = next_id + 1
+        ordered_usernames = [None] * len(usernames)
+        for old_id, username in enumerate(usernames):
+            ordered_usernames[new_ids[old_id]] = username
+
+        following_offsets = array(OFFSET_TYPECODE, [0])
+        following_targets = array(ID_TYPECODE)
+        for start, end in record_ranges:
+            for index in range(start, end):
+                following_targets.append(new_ids[record_targets[index]])
+            following_offsets.append(len(following_targets))
+        del record_targets
+
+        follower_offsets, follower_targets = reverse_csr(
+            following_offsets, following_targets, len(ordered_usernames))
+        return (cls(ordered_usernames, user_count, columns, following_offsets,
+                    following_targets, follower_offsets, follower_targets))
+
+    def __getitem__(self, username):
+        """ (CompactTwitterverse, str) -> CompactUser
+
+        Return a user dictionary view of username.
+        """
+
+        user_id = self.user_id(username)
+        if user_id is None or user_id >= self.user_count:
+            raise KeyError(username)
+        return (CompactUser(self, user_id))
+
+    def __contains__(self, username):
+        """ (CompactTwitterverse, object) -> bool """
+
+        if not isinstance(username, str):
+            return (False)
+        user_id = self.user_id(username)
+        return (user_id is not None and user_id < self.user_count)
+
+    def __iter__(self):
+        """ (CompactTwitterverse) -> iterator of str
+
+        Iterate over the usernames of all users in file order.
+        """
+
+        for user_id in range(self.user_count):
+            yield (self.usernames[user_id])
+
+    def __len__(self):
+        """ (CompactTwitterverse) -> int """
+
+        return (self.user_count)
+
+    def following_ids(self, user_id):
+        """ (CompactTwitterverse, int) -> sequence of int
+
+        Return the ids that user_id is following, in data file order.
+        """
+
+        if user_id >= self.user_count:
+            return (self.following_targets[0:0])
+        return (self.following_targets[self.following_offsets[user_id]:
+                                       self.following_offsets[user_id + 1]])
+
+    def follower_ids(self, user_id):
+        """ (CompactTwitterverse, int) -> sequence of int
+
+        Return the ids of the users following user_id, in file order.
+        """
+
+        return (self.follower_targets[self.follower_offsets[user_id]:
+                                      self.follower_offsets[user_id + 1]])
+
+    def following(self, username):
+        """ (CompactTwitterverse, str) -> list of str
+
+        Return the usernames that username is following.
+        """
+
+        return (self[username]["following"])
+
+    def followers(self, username):
+        """ (CompactTwitterverse, str) -> list of str
+
+        Return a new list of the usernames that are following username.
+        """
+
+        user_id = self.user_id(username)
+        if user_id is None:
+            return ([])
+        return ([self.usernames[follower]
+                 for follower in self.follower_ids(user_id)])
+
+    def follower_count(self, username):
+        """ (CompactTwitterverse, str) -> int
+
+        Return the number of users that are following username.
+        """
+
+        user_id = self.user_id(username)
+        if user_id is None:
+            return (0)
+        return (self.follower_offsets[user_id + 1] -
+                self.follower_offsets[user_id])
+
+
+def _intern(ids, usernames, username):
+    """ (dict of {str: int}, list of str, str) -> int
+
+    Return the id of username, giving it the next free id if it has none.
+    """
+
+    user_id = ids.get(username)
+    if user_id is None:
+        user_id = len(usernames)
+        ids[username] = user_id
+        usernames.append(username)
+    return (user_id)
+
+
+def reverse_csr(offsets, targets, id_count):
+    """ (sequence of int, sequence of int, int) -> (array, array)
+
+    Return the offsets and targets of the reverse of the CSR graph given by
+    offsets and targets, over id_count ids. Each source is listed once per
+    target, even if the edge appears more than once, and the sources of each
+    target are in increasing id order.
+
+    >>> offsets, targets = reverse_csr([0, 2, 3], [1, 1, 0], 3)
+    >>> list(offsets), list(targets)
+    ([0, 1, 2, 2], [1, 0])
+    """
+
+    counts = array(OFFSET_TYPECODE, [0]) * (id_count + 1)
+    for source in range(len(offsets) - 1):
+        for target in set(targets[offsets[source]:offsets[source + 1]]):
+            counts[target + 1] = counts[target + 1] + 1
+    for i in range(id_count):
+        counts[i + 1] = counts[i + 1] + counts[i]
+    reverse_offsets = array(OFFSET_TYPECODE, counts)
+    reverse_targets = array(ID_TYPECODE, [0]) * counts[id_count]
+    for source in range(len(offsets) - 1):
+        for target in set(targets[offsets[source]:offsets[source + 1]]):
+            reverse_targets[counts[target]] = source
+            counts[target] = counts[target] + 1
+    return (reverse_offsets, reverse_targets)
+
+
+def process_data_compact(data_file):
+    """ (file open for reading) -> CompactTwitterverse
+
+    Return a CompactTwitterverse of the users in data_file, which is in the
+    same format process_data reads.
+
+    >>> import io
+    >>> compact = process_data_compact(io.StringIO(\
+    "a\\nZed\\n\\n\\nENDBIO\\nb\\nEND\\nb\\nLee\\n\\n\\nENDBIO\\nEND\\n"))
+    >>> tf.all_followers(compact, 'b')
+    ['a']
+    """
+
+    return (CompactTwitterverse.from_users(tf.iter_users(data_file)))
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
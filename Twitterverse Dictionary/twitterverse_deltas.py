@@ -0,0 +1,159 @@
+"""
+Incremental updates to a loaded Twitterverse.
+
+A delta file lists changes to apply to a Twitterverse, one after the other.
+apply_deltas applies them in order, keeping the Twitterverse's graph (and so
+its follower lists and popularity counts) and its substring indexes up to
+date as it goes, so each change costs time proportional to the users and
+edges it touches rather than to the size of the Twitterverse.
+
+Delta file format (blank lines between deltas are ignored):
+
+ADD username            add a new user; the lines that follow are the
+name                    user's record in the data file format, from the
+location                name line to the END line
+web
+bio lines...
+ENDBIO
+following...
+END
+
+UPDATE username         change some of a user's profile fields; each line
+name <value>            is a field name and its new value (which may be
+location <value>        empty), except bio, whose new lines follow it up
+web <value>             to an ENDBIO line
+bio
+bio lines...
+ENDBIO
+END
+
+FOLLOW username followed      make username follow followed
+UNFOLLOW username followed    make username stop following followed
+DELETE username               delete a user and every follow to or from it
+"""
+
+import twitterverse_functions as tf
+from twitterverse_graph import Twitterverse
+
+PROFILE_FIELDS = ("name", "location", "web")
+
+
+def iter_deltas(delta_file):
+    """ (file open for reading) -> generator of (str, list of object)
+
+    Yield each delta in delta_file as (kind, arguments), where kind is one of
+    ADD, UPDATE, FOLLOW, UNFOLLOW and DELETE, and the arguments are:
+        - ADD: username and user dictionary
+        - UPDATE: username and dict of the changed fields
+        - FOLLOW and UNFOLLOW: username and followed username
+        - DELETE: username
+    Raise ValueError on a line that does not start a delta.
+
+    >>> import io
+    >>> list(iter_deltas(io.StringIO(\
+    "FOLLOW a b\\n\\nUPDATE a\\nname Zed\\nbio\\nhi\\nENDBIO\\nEND\\nDELETE c\\n")))
+    [('FOLLOW', ['a', 'b']), ('UPDATE', ['a', {'name': 'Zed', 'bio': 'hi'}]), \
+('DELETE', ['c'])]
+    """
+
+    lines = tf.iter_lines(delta_file)
+    for line in lines:
+        if line == "":
+            continue
+        words = line.split()
+        kind = words[0]
+        if kind in ("FOLLOW", "UNFOLLOW") and len(words) == 3:
+            yield (kind, words[1:])
+        elif kind == "DELETE" and len(words) == 2:
+            yield (kind, words[1:])
+        elif kind == "ADD" and len(words) == 2:
+            yield (kind, [words[1], tf.read_user(lines)])
+        elif kind == "UPDATE" and len(words) == 2:
+            yield (kind, [words[1], _read_fields(lines)])
+        else:
+            raise ValueError("not a delta: " + line)
+
+
+def _read_fields(lines):
+    """ (iterator of str) -> dict of {str: str}
+
+    Read the field lines of an UPDATE delta, up to and including its END
+    line, from lines and return the changed fields.
+    """
+
+    fields = {}
+    for line in lines:
+        if line == "END":
+            return (fields)
+        name = line.split(" ", 1)[0]
+        if name == "bio":
+            bio_lines = []
+            for bio_line in lines:
+                if bio_line == "ENDBIO":
+                    break
+                bio_lines.append(bio_line)
+            fields["bio"] = "\n".join(bio_lines)
+        elif name in PROFILE_FIELDS:
+            fields[name] = line[len(name):].strip()
+        else:
+            raise ValueError("not a profile field: " + line)
+    raise ValueError("UPDATE has no END line")
+
+
+def apply_delta(twitterverse, kind, arguments):
+    """ (Twitterverse, str, list of object) -> NoneType
+
+    Apply one delta, as yielded by iter_deltas, to twitterverse. Raise
+    ValueError if it refers to a user that does not exist, or adds one that
+    already does.
+    """
+
+    username = arguments[0]
+    if kind == "ADD":
+        if username in twitterverse:
+            raise ValueError("user already exists: " + username)
+        twitterverse[username] = arguments[1]
+        return
+    if username not in twitterverse:
+        raise ValueError("no such user: " + username)
+    if kind == "UPDATE":
+        twitterverse.update_user(username, arguments[1])
+    elif kind == "FOLLOW":
+        if arguments[1] not in twitterverse:
+            raise ValueError("no such user: " + arguments[1])
+        twitterverse.follow(username, arguments[1])
+    elif kind == "UNFOLLOW":
+        twitterverse.unfollow(username, arguments[1])
+    elif kind == "DELETE":
+        twitterverse.delete_user(username)
+
+
+def apply_deltas(twitterverse, delta_file):
+    """ (Twitterverse, file open for reading) -> int
+
+    Apply every delta in delta_file to twitterverse, in order, and return
+    how many were applied. twitterverse must be a Twitterverse, such as
+    process_data returns.
+
+    >>> import io
+    >>> twitterverse = tf.process_data(io.StringIO(\
+    "a\\nZed\\n\\n\\nENDBIO\\nEND\\n"))
+    >>> apply_deltas(twitterverse, io.StringIO(\
+    "ADD b\\nLee\\nOttawa\\n\\nENDBIO\\na\\nEND\\nFOLLOW a b\\n"))
+    2
+    >>> tf.all_followers(twitterverse, 'a'), tf.all_followers(twitterverse, 'b')
+    (['b'], ['a'])
+    """
+
+    if not isinstance(twitterverse, Twitterverse):
+        raise TypeError("deltas can only be applied to a Twitterverse")
+    count = 0
+    for kind, arguments in iter_deltas(delta_file):
+        apply_delta(twitterverse, kind, arguments)
+        count = count + 1
+    return (count)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
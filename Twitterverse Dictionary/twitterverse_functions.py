@@ -19,7 +19,11 @@ Query dictionary: dict of {str: dict of {str: object}}
 
 Search specification dictionary: dict of {str: object}
    - key "username", value represents the username to begin search at (a str)
-   - key "operations", value represents the operations to perform (a list of str)
+   - key "operations", value represents the operations to perform (a list of str):
+     "following" or "followers", or either of them repeated, as in
+     "following*3" (exactly three steps) or "following*<=3" (within three),
+     or "recommend*K" for the top K friends-of-friends recommendations,
+     or "most-followed*N" for the N most followed users of the Twitterverse
 
 Filter specification dictionary: dict of {str: str}
    - key "following" might exist, value represents a username (a str)
@@ -30,20 +34,41 @@ Filter specification dictionary: dict of {str: str}
 Presentation specification dictionary: dict of {str: str}
    - key "sort-by", value represents how to sort results (a str)
    - key "format", value represents how to format results (a str)
+   - key "limit" might exist, value represents the most results to present,
+     taken from the start of the sorted results (an int)
    
 """
 
 # Write your Twitterverse functions here
 
+import functools
+import heapq
+import io
+import sys
+
+from twitterverse_graph import Twitterverse, get_graph, paused_gc
+from twitterverse_hops import hop_search, parse_operation
+from twitterverse_index import current_substring_index, get_substring_index, \
+    substring_index_for
+from twitterverse_numpy import get_degree_arrays
+from twitterverse_popularity import current_popularity_index, \
+    get_popularity_index, parse_most_followed
+from twitterverse_recommend import parse_recommend, recommend
+from twitterverse_user import User
+import twitterverse_metrics as tm
+from twitterverse_metrics import instrument
+
 def process_username (data_file, username, twitterverse_dict):
     """ (file open for reading, str, dict of {str: dict of {str: object}}) -> \
     NoneType
     
     When given the username of the next person in the data_file, add the 
     username and additional information regarding that person to the 
-    twitterverse_dict.
+    twitterverse_dict. Usernames are interned, so each distinct username is
+    stored once however many users follow it.
     """
     
+    username = sys.intern (username)
     twitterverse_dict[username] = {}
     twitterverse_dict[username]["name"] = data_file.readline().strip()
     twitterverse_dict[username]["location"] = data_file.readline().strip()
@@ -57,29 +82,108 @@ def process_username (data_file, username, twitterverse_dict):
     twitterverse_dict[username]["following"] = []
     line = data_file.readline().strip()
     while (line != "END"):
-        twitterverse_dict[username]["following"].append(line) 
+        twitterverse_dict[username]["following"].append(sys.intern (line))
         line = data_file.readline().strip()
 
-def process_data (data_file):
-    """ (file open for reading) -> dict of {str: dict of {str: object}}
+def iter_lines (data_file):
+    """ (file open for reading) -> generator of str
+    
+    Yield every line of data_file with surrounding whitespace stripped, 
+    one line at a time as they are asked for.
+    
+    >>> import io
+    >>> list (iter_lines (io.StringIO ("a \\n b\\nc")))
+    ['a', 'b', 'c']
+    """
+    
+    for line in data_file:
+        yield (line.strip ())
+
+def iter_users (data_file):
+    """ (file open for reading) -> generator of \
+    (str, dict of {str: object})
+    
+    Yield a (username, user dictionary) pair for each person in data_file, 
+    in file order, without parsing the rest of the file until it is asked for.
+    The user dictionaries have the same items as in a Twitterverse dictionary.
+    
+    >>> import io
+    >>> users = iter_users (io.StringIO (\
+    "a\\nZed\\n\\n\\nhi\\nthere\\nENDBIO\\nb\\nEND\\nb\\nLee\\n\\n\\nENDBIO\\nEND\\n"))
+    >>> next (users)
+    ('a', {'name': 'Zed', 'location': '', 'web': '', 'bio': 'hi\\nthere', 'following': ['b']})
+    >>> next (users)[0]
+    'b'
+    """
+    
+    lines = iter_lines (data_file)
+    for username in lines:
+        if (username == ''):
+            return
+        yield (sys.intern (username), read_user (lines))
+
+def read_user (lines):
+    """ (iterator of str) -> dict of {str: object}
+    
+    Read the lines of one user's record, from the name line up to and 
+    including the END line, from lines and return the user dictionary. The
+    usernames in its following list are interned.
+    
+    >>> read_user (iter (["Zed", "", "", "ENDBIO", "b", "END", "c"]))
+    {'name': 'Zed', 'location': '', 'web': '', 'bio': '', 'following': ['b']}
+    """
+    
+    user = {}
+    user["name"] = next (lines, "")
+    user["location"] = next (lines, "")
+    user["web"] = next (lines, "")
+    bio_lines = []
+    for line in lines:
+        if (line == "ENDBIO"):
+            break
+        bio_lines.append (line)
+    user["bio"] = "\n".join (bio_lines)
+    following = []
+    for line in lines:
+        if (line == "END"):
+            break
+        following.append (sys.intern (line))
+    user["following"] = following
+    return (user)
+
+@instrument ("process_data", lambda arguments, result: \
+            {"users_loaded": len (result)})
+def process_data (data_file, records=False):
+    """ (file open for reading, bool) -> dict of {str: dict of {str: object}}
     
     Return the completed twitterverse dictionary by going through the entire
     data_file and adding all the information associated with each individual 
-    one at a time.
+    one at a time. The returned dictionary is a Twitterverse, so it also 
+    carries a graph of who follows whom. If records is True, each user is a
+    slotted User record instead of a dict (see twitterverse_user).
     """
     
-    twitterverse_dict_complete = {}
-    line = data_file.readline().strip()
-    while (line != ''):
-        process_username (data_file, line, twitterverse_dict_complete)
-        line = data_file.readline().strip()
-    return (twitterverse_dict_complete)
+    users = iter_users (data_file)
+    if (records):
+        users = ((username, User.from_dict (user)) for username, user in users)
+    with paused_gc ():
+        return (Twitterverse (users))
 
 def process_query (data_file):
     """ (file open for reading) -> dict of {str: dict of {str: object}}
     
     Go through the given query as represented in the data_file and return the
-    various specifications of it.
+    various specifications of it. The sort-by and format lines may be 
+    followed by a "limit" line, and the query ends at a blank line or the end
+    of data_file. An operation may repeat a step, as in "following*3" or
+    "followers*<=2", ask for recommendations, as in "recommend*5", or ask 
+    for the most followed users, as in "most-followed*5"; raise ValueError 
+    if such an operation is not well formed.
+    
+    >>> process_query (io.StringIO (\
+    "SEARCH\\na\\nFILTER\\nPRESENT\\nsort-by popularity\\nformat short\\nlimit 5"))
+    {'search': {'username': 'a', 'operations': []}, 'filter': {}, \
+'present': {'sort-by': 'popularity', 'format': 'short', 'limit': 5}}
     """
     data_file.readline()
     query_dict = {}
@@ -88,6 +192,9 @@ def process_query (data_file):
     query_dict["search"]["operations"] = []
     operations = data_file.readline().strip()
     while (operations != "FILTER"):
+        if (parse_recommend (operations) is None and \
+            parse_most_followed (operations) is None):
+            parse_operation (operations)
         query_dict["search"]["operations"].append(operations)
         operations = data_file.readline().strip()
     query_dict["filter"] = {}
@@ -102,8 +209,62 @@ def process_query (data_file):
     query_dict["present"][present_strings[0]] = present_strings[-1]
     present_strings = data_file.readline().strip().split()
     query_dict["present"][present_strings[0]] = present_strings[-1]
+    present_by = data_file.readline().strip()
+    while (present_by != ""):
+        present_strings = present_by.split()
+        if (present_strings[0] == "limit"):
+            query_dict["present"]["limit"] = get_limit (present_strings[-1])
+        else:
+            query_dict["present"][present_strings[0]] = present_strings[-1]
+        present_by = data_file.readline().strip()
     return (query_dict)
 
+def get_limit (limit_string):
+    """ (str) -> int
+    
+    Return the number of results a "limit" presentation line asks for. Raise
+    ValueError if limit_string is not a whole number.
+    
+    >>> get_limit ("50")
+    50
+    >>> get_limit ("-1")
+    Traceback (most recent call last):
+    ...
+    ValueError: limit must be a whole number: -1
+    """
+    
+    if (not limit_string.isdigit ()):
+        raise ValueError ("limit must be a whole number: " + limit_string)
+    return (int (limit_string))
+
+def iter_queries (query_file):
+    """ (file open for reading) -> generator of dict of {str: dict of {str: object}}
+    
+    Go through one or more queries, one after the other, in query_file and 
+    yield the query dictionary of each of them in order. Every query starts 
+    with a SEARCH line, and anything before the first SEARCH line is ignored.
+    
+    >>> queries = iter_queries (io.StringIO (\
+    "SEARCH\\na\\nFILTER\\nPRESENT\\nsort-by username\\nformat short\\n\\n" \
+    "SEARCH\\nb\\nfollowing\\nFILTER\\nPRESENT\\nsort-by name\\nformat long"))
+    >>> [query["search"]["username"] for query in queries]
+    ['a', 'b']
+    """
+    
+    query_lines = []
+    for line in query_file:
+        if (line.strip () == "SEARCH"):
+            if (query_lines != []):
+                yield (process_query (io.StringIO ("".join (query_lines))))
+            query_lines = [line]
+        elif (query_lines != []):
+            query_lines.append (line)
+    if (query_lines != []):
+        yield (process_query (io.StringIO ("".join (query_lines))))
+
+@instrument ("all_followers", lambda arguments, result: \
+            {"users_scanned": len (result) \
+             if get_graph (arguments[0]) is not None else len (arguments[0])})
 def all_followers (twitterverse_dict, given_username):
     """ (dict of {str: dict of {str: object}}, str) -> list of str
     
@@ -118,8 +279,13 @@ def all_followers (twitterverse_dict, given_username):
     ['a']
     >>> all_followers (twitter_data, "a")
     []
+    >>> all_followers (Twitterverse (twitter_data), "b")
+    ['a']
     """
     
+    graph = get_graph (twitterverse_dict)
+    if (graph is not None):
+        return (graph.followers (given_username))
     followers = []
     temp_followers = []
     for people in twitterverse_dict:
@@ -146,6 +312,8 @@ def all_following (twitterverse_dict, given_username):
     return (twitterverse_dict[given_username]["following"])
     
     
+@instrument ("search_usernames", lambda arguments, result: \
+            {"frontier_in": len (arguments[1]), "frontier_out": len (result)})
 def search_usernames (twitterverse_dict, usernames, operation):
     """ (dict of {str: dict of {str: object}}, list of str, str) \
     -> list of str
@@ -187,12 +355,10 @@ def remove_dups (given_list):
     ['a', 'b']
     """
     
-    removed_dups = []
-    for items in given_list:
-        if items not in removed_dups:
-            removed_dups.append (items)
-    return removed_dups
+    return (list (dict.fromkeys (given_list)))
     
+@instrument ("get_search_results", lambda arguments, result: \
+            {"results": len (result)})
 def get_search_results (twitterverse_dict, search_spec_dict):
     """ (dict of {str: dict of {str: object}}, dict of {str: object}) -> \
     list of str
@@ -213,15 +379,125 @@ def get_search_results (twitterverse_dict, search_spec_dict):
     ['a']
     """
     
-    searched_list = []
-    searched_list.append (search_spec_dict["username"])
+    # Each frontier is an insertion-ordered dict used as a set, so duplicates
+    # are dropped while expanding and the first occurrence keeps its place,
+    # as remove_dups would. A user that is reached again by a later operation
+    # of the same kind is only expanded once per search.
+    searched_list = [search_spec_dict["username"]]
+    expansions = {}
     operations = search_spec_dict["operations"]
     for ops in operations:
-        searched_list = search_usernames (twitterverse_dict, searched_list, ops)
-        searched_list = remove_dups (searched_list)
+        if (parse_recommend (ops) is not None):
+            searched_list = search_recommend (twitterverse_dict, \
+                                              searched_list, ops)
+            continue
+        if (parse_most_followed (ops) is not None):
+            searched_list = search_most_followed (twitterverse_dict, \
+                                                  searched_list, ops)
+            continue
+        if (parse_operation (ops) is not None):
+            searched_list = search_hops (twitterverse_dict, searched_list, ops)
+            continue
+        frontier = {}
+        for names in searched_list:
+            if ((ops, names) not in expansions):
+                expansions[(ops, names)] = search_usernames (twitterverse_dict,\
+                                                            [names], ops)
+            frontier.update (dict.fromkeys (expansions[(ops, names)]))
+        searched_list = list (frontier)
     return (searched_list)
+
+@instrument ("search_recommend", lambda arguments, result: \
+            {"frontier_in": len (arguments[1]), "frontier_out": len (result)})
+def search_recommend (twitterverse_dict, usernames, operation):
+    """ (dict of {str: dict of {str: object}}, list of str, str) -> \
+    list of str
+    
+    Perform the recommend operation, such as "recommend*5", on all of the 
+    usernames and return the top recommendations of each of them in turn, 
+    without duplicates.
+    
+    >>> twitter_data = {\
+    'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b']}, \
+    'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':['c', 'd']}, \
+    'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', 'following':['a', 'd']}}
+    >>> search_recommend (twitter_data, ['a', 'b'], "recommend*1")
+    ['c', 'a']
+    """
+    
+    k = parse_recommend (operation)
+    found = {}
+    for names in usernames:
+        found.update (dict.fromkeys (recommend (twitterverse_dict, names, k)))
+    return (list (found))
+
+@instrument ("search_most_followed", lambda arguments, result: \
+            {"frontier_in": len (arguments[1]), "frontier_out": len (result)})
+def search_most_followed (twitterverse_dict, usernames, operation):
+    """ (dict of {str: dict of {str: object}}, list of str, str) -> \
+    list of str
+    
+    Perform the most-followed operation, such as "most-followed*5", and 
+    return the most followed users of twitterverse_dict in popularity order,
+    whatever the usernames found so far.
+    
+    >>> twitter_data = {\
+    'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b']}, \
+    'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':['c']}, \
+    'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', 'following':['b']}}
+    >>> search_most_followed (twitter_data, ['a'], "most-followed*2")
+    ['b', 'c']
+    """
+    
+    return (most_followed (twitterverse_dict, \
+                           parse_most_followed (operation)))
+
+@instrument ("search_hops", lambda arguments, result: \
+            {"frontier_in": len (arguments[1]), "frontier_out": len (result)})
+def search_hops (twitterverse_dict, usernames, operation):
+    """ (dict of {str: dict of {str: object}}, list of str, str) -> \
+    list of str
+    
+    Perform the multi-hop operation, such as "following*3" (exactly three
+    steps) or "followers*<=2" (one or two steps), on all of the usernames and
+    return the usernames it reaches: users in the order of the
+    twitterverse_dict, then any usernames that are followed but are not users,
+    in the order they were first reached.
+    
+    >>> twitter_data = {\
+    'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b']}, \
+    'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':['c']}, \
+    'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', 'following':['a']}}
+    >>> search_hops (twitter_data, ['a'], "following*2")
+    ['c']
+    >>> search_hops (Twitterverse (twitter_data), ['a'], "followers*<=2")
+    ['b', 'c']
+    """
+    
+    found = hop_search (twitterverse_dict, usernames, operation)
+    if (found is not None):
+        return (found)
+    # A plain dict has no user ids to index frontiers by, so take one step
+    # at a time with insertion-ordered dicts used as sets.
+    step, hops, cumulative = parse_operation (operation)
+    frontier = list (dict.fromkeys (usernames))
+    reached = {}
+    for hop in range (hops):
+        frontier = list (dict.fromkeys (search_usernames (twitterverse_dict, \
+                                                          frontier, step)))
+        if (cumulative):
+            frontier = [names for names in frontier if names not in reached]
+            reached.update (dict.fromkeys (frontier))
+        else:
+            reached = dict.fromkeys (frontier)
+    found = [names for names in twitterverse_dict if names in reached]
+    found.extend ([names for names in reached \
+                   if names not in twitterverse_dict])
+    return (found)
             
 
+@instrument ("filter_usernames", lambda arguments, result: \
+            {"users_scanned": len (arguments[1]), "users_kept": len (result)})
 def filter_usernames (twitterverse_dict, given_usernames, operation, \
                       filter_spec_dict):
     """ (dict of {str: dict of {str: object}}, list of str, str, \
@@ -245,23 +521,116 @@ def filter_usernames (twitterverse_dict, given_usernames, operation, \
     
     value = filter_spec_dict[operation]
     changed_list = []
-    if (operation == "name-includes"):
+    if (operation == "name-includes" or operation == "location-includes"):
+        field = operation[:-len ("-includes")]
+        index = substring_index_for (twitterverse_dict, field, \
+                                     given_usernames)
+        if (index is not None):
+            return (index.filter (given_usernames, value))
+        value = value.lower()
         for names in given_usernames:
-            if (value.lower() in twitterverse_dict[names]["name"].lower()):
-                changed_list.append(names)
-    elif (operation == "location-includes"):
-        for names in given_usernames:
-            if (value.lower() in twitterverse_dict[names]["location"].lower()):
+            if (value in twitterverse_dict[names][field].lower()):
                 changed_list.append(names)
     elif (operation == "following"):
+        # With a graph, the users following value are looked up once and 
+        # intersected with given_usernames.
+        graph = get_graph (twitterverse_dict)
+        if (graph is not None):
+            matches = set (graph.followers (value))
+            return ([names for names in given_usernames if names in matches])
         for names in given_usernames:
             if (value in all_following (twitterverse_dict, names)):
                 changed_list.append(names)
     elif (operation == "follower"):
+        # A user has value as a follower exactly when value follows them.
+        matches = set (followed_by (twitterverse_dict, value))
         for names in given_usernames:
-            if (value in all_followers (twitterverse_dict, names)):
+            if (names in matches):
                 changed_list.append(names)
     return (changed_list)
+
+def followed_by (twitterverse_dict, username):
+    """ (dict of {str: dict of {str: object}}, str) -> list of str
+    
+    Return all the usernames that username is following, or an empty list if
+    username is not in the twitterverse_dict.
+    
+    >>> twitter_data = {\
+    'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b']}}
+    >>> followed_by (twitter_data, 'a')
+    ['b']
+    >>> followed_by (twitter_data, 'b')
+    []
+    """
+    
+    if (username in twitterverse_dict):
+        return (all_following (twitterverse_dict, username))
+    return ([])
+
+def estimate_filter_size (twitterverse_dict, usernames, operation, value):
+    """ (dict of {str: dict of {str: object}}, list of str, str, str) -> int
+    
+    Return a cheap upper estimate of how many of the usernames would pass 
+    the filter operation with the given value. Filters without cheap 
+    statistics are estimated to keep every username; substring filters 
+    only use an index that has already been built, and never build one.
+    
+    >>> twitter_data = Twitterverse ({\
+    'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b']}, \
+    'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':[]}, \
+    'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', 'following':[]}})
+    >>> estimate_filter_size (twitter_data, ['a', 'b', 'c'], "following", 'b')
+    1
+    >>> estimate_filter_size (twitter_data, ['a', 'b', 'c'], "name-includes", 'ann')
+    3
+    >>> index = get_substring_index (twitter_data, 'name')
+    >>> estimate_filter_size (twitter_data, ['a', 'b', 'c'], "name-includes", 'ann')
+    1
+    >>> estimate_filter_size (twitter_data, ['a', 'b', 'c'], "name-includes", 'e')
+    3
+    """
+    
+    estimate = len (usernames)
+    if (operation == "follower"):
+        estimate = len (followed_by (twitterverse_dict, value))
+    elif (operation == "following"):
+        graph = get_graph (twitterverse_dict)
+        if (graph is not None):
+            estimate = graph.follower_count (value)
+    elif (operation == "name-includes" or operation == "location-includes"):
+        field = operation[:-len ("-includes")]
+        index = current_substring_index (twitterverse_dict, field)
+        if (index is not None):
+            index_estimate = index.estimate (value)
+            if (index_estimate is not None):
+                estimate = index_estimate
+    return (min (estimate, len (usernames)))
+
+def plan_filters (twitterverse_dict, usernames, filter_spec_dict):
+    """ (dict of {str: dict of {str: object}}, list of str, \
+    dict of {str: str}) -> list of str
+    
+    Return the filter operations in filter_spec_dict in the order they 
+    should be applied to usernames: the one expected to keep the fewest 
+    usernames first. Filters with the same estimate keep their order, and 
+    a single filter is not estimated at all.
+    
+    >>> twitter_data = Twitterverse ({\
+    'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b']}, \
+    'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':[]}, \
+    'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', 'following':[]}})
+    >>> plan_filters (twitter_data, ['a', 'b', 'c'], \
+    {"name-includes":"e", "follower":"a"})
+    ['follower', 'name-includes']
+    """
+    
+    if (len (filter_spec_dict) < 2):
+        return (list (filter_spec_dict))
+    estimates = {}
+    for operation in filter_spec_dict:
+        estimates[operation] = estimate_filter_size (twitterverse_dict, \
+            usernames, operation, filter_spec_dict[operation])
+    return (sorted (filter_spec_dict, key=estimates.__getitem__))
     
     
     
@@ -270,7 +639,10 @@ def get_filter_results (twitterverse_dict, usernames, filter_spec_dict):
     dict of {str: str}) -> list of str
     
     To filter the usernames with respect to the values in the filter_spec_dict,\
-    based on the data in the twitterverse_dict.
+    based on the data in the twitterverse_dict. The filters are applied in the
+    order chosen by plan_filters, which does not change the result; when the
+    NumPy backend is enabled, the following and follower filters are applied
+    through its arrays, in the same order.
     
     >>> twitter_data = {\
     'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b']}, \
@@ -284,10 +656,18 @@ def get_filter_results (twitterverse_dict, usernames, filter_spec_dict):
     """
     
     all_usernames = usernames[:]
-    operation = list(filter_spec_dict.keys())
+    operation = plan_filters (twitterverse_dict, all_usernames, \
+                              filter_spec_dict)
+    arrays = get_degree_arrays (twitterverse_dict)
     for operations in operation:
-        all_usernames = filter_usernames (twitterverse_dict, all_usernames, \
-                                       operations, filter_spec_dict)
+        if (len (all_usernames) == 0):
+            break
+        if (arrays is not None and operations in ("following", "follower")):
+            all_usernames = arrays.filter (all_usernames, \
+                {operations: filter_spec_dict[operations]})
+        else:
+            all_usernames = filter_usernames (twitterverse_dict, \
+                all_usernames, operations, filter_spec_dict)
     return (all_usernames)
  
 def format_long (twitterverse_dict, username):
@@ -307,36 +687,45 @@ def format_long (twitterverse_dict, username):
     '----------\\na\\nname: Zed\\nlocation: Toronto, Ontario\\nwebsite: www.Zed.com\\nbio:\\nI love to meet new people!\\nfollowing: []\\n'
     """
     
-    single_user_info = "----------\n"
-    single_user_info = single_user_info + username + "\n"
-    single_user_info = single_user_info + "name: " + \
-        twitterverse_dict[username]["name"] + "\n"
-    single_user_info = single_user_info + "location: " + \
-        twitterverse_dict[username]["location"] + "\n"
-    single_user_info = single_user_info + "website: " + \
-        twitterverse_dict[username]["web"] + "\n"
-    single_user_info = single_user_info + "bio:\n"
-    single_user_info = single_user_info + twitterverse_dict[username]["bio"] \
-        + "\n"
-    single_user_info = single_user_info + "following: " + "[" 
-    people_following = twitterverse_dict[username]["following"]
+    return ("".join (iter_format_long (twitterverse_dict, username)))
+
+def iter_format_long (twitterverse_dict, username):
+    """ (dict of {str: dict of {str: object}}, str) -> generator of str
+    
+    Yield, piece by piece, the same text that format_long returns for the 
+    given username.
+    
+    >>> twitter_data = {\
+    'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b', 'c']}}
+    >>> list (iter_format_long (twitter_data, 'a'))[1:]
+    ['[', "'b', ", "'c']\\n"]
+    """
+    
+    user = twitterverse_dict[username]
+    yield ("----------\n" + username + "\nname: " + user["name"] + \
+           "\nlocation: " + user["location"] + "\nwebsite: " + user["web"] + \
+           "\nbio:\n" + user["bio"] + "\nfollowing: ")
+    people_following = user["following"]
     if (len (people_following) != 0):
+        yield ("[")
+        last_name = people_following[-1]
         for names in people_following:
-            if (names == people_following[-1]):
-                single_user_info = single_user_info + "\'" + names + "\'" + "]"\
-                    + "\n"
+            if (names == last_name):
+                yield ("\'" + names + "\'" + "]" + "\n")
             else:
-                single_user_info = single_user_info + "\'" + names + "\'" + ", "
+                yield ("\'" + names + "\'" + ", ")
     else:
-        single_user_info = single_user_info + "]" + "\n"
-    return (single_user_info)
+        yield ("[" + "]" + "\n")
 
 def sort_by (twitterverse_dict, usernames, present_spec_dict):
     """ (dict of {str: dict of {str: object}}, list of str, dict of {str: str})\
     -> NoneType
     
     Sort the usernames with respect to the factor represented in the 
-    present_spec_dict, based on the data in the twitterverse_dict.
+    present_spec_dict, based on the data in the twitterverse_dict. The 
+    "sort-by" value may also be a comparison function like username_first.
+    If present_spec_dict has a "limit", only that many usernames are kept:
+    the first ones in sorted order, found without sorting all of them.
     
     >>> twitter_data = {\
     'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':[]}, \
@@ -351,28 +740,64 @@ def sort_by (twitterverse_dict, usernames, present_spec_dict):
     {'sort-by':'name', 'format':'long'})
     >>> result_list
     ['b', 'a', 'c']
+    >>> sort_by (twitter_data, result_list, \
+    {'sort-by':'username', 'format':'long', 'limit':2})
+    >>> result_list
+    ['a', 'b']
     """
     
+    cmp = None
     if (present_spec_dict["sort-by"] == "username"):
-        tweet_sort (twitterverse_dict, usernames, username_first)
+        cmp = username_first
     elif (present_spec_dict["sort-by"] == "name"):
-        tweet_sort (twitterverse_dict, usernames, name_first)
+        cmp = name_first
     elif (present_spec_dict["sort-by"] == "popularity"):
-        tweet_sort (twitterverse_dict, usernames, more_popular)
+        cmp = more_popular
+    elif (callable (present_spec_dict["sort-by"])):
+        cmp = present_spec_dict["sort-by"]
+    limit = present_spec_dict.get ("limit")
+    if (limit is not None and limit < len (usernames)):
+        if (cmp is None):
+            del usernames[limit:]
+        else:
+            usernames[:] = tweet_top_k (twitterverse_dict, usernames, cmp, \
+                                        limit)
+    elif (cmp is not None):
+        tweet_sort (twitterverse_dict, usernames, cmp)
     
 
 def format_short (usernames):
-    formatted_result = '['
-    if (len != 0):
+    """ (list of str) -> str
+    
+    Return the usernames formatted as a list of quoted strings.
+    
+    >>> format_short (['a', 'b'])
+    "['a', 'b']"
+    """
+    
+    return ("".join (iter_format_short (usernames)))
+
+def iter_format_short (usernames):
+    """ (list of str) -> generator of str
+    
+    Yield, piece by piece, the same text that format_short returns for the 
+    usernames.
+    
+    >>> list (iter_format_short (['a', 'b']))
+    ['[', "'a', ", "'b']"]
+    """
+    
+    yield ('[')
+    if (len (usernames) != 0):
+        last_name = usernames[-1]
         for names in usernames:
-            if (names == usernames[-1]):
-                formatted_result = formatted_result + "\'" + names + "\'" + "]"
+            if (names == last_name):
+                yield ("\'" + names + "\'" + "]")
             else:
-                formatted_result = formatted_result + "\'" + names + "\'" + ", "            
-    else:
-        formatted_result = formatted_result + ']'
-    return (formatted_result)
+                yield ("\'" + names + "\'" + ", ")
         
+@instrument ("get_present_string", lambda arguments, result: \
+            {"users_presented": len (arguments[1]), "characters": len (result)})
 def get_present_string (twitterverse_dict, usernames, present_spec_dict):
     """ (dict of {str: dict of {str: object}}, list of str, dict of {str: str})\
     -> str
@@ -388,29 +813,65 @@ def get_present_string (twitterverse_dict, usernames, present_spec_dict):
     '----------\\n----------'
     >>> get_present_string (twitter_data, usernames, \
     {'sort-by':'username', 'format':'short'})
-    ['a']\n
+    "['a']"
+    """
+    
+    return ("".join (iter_present_chunks (twitterverse_dict, usernames, \
+                                          present_spec_dict)))
+
+def iter_present_chunks (twitterverse_dict, usernames, present_spec_dict):
+    """ (dict of {str: dict of {str: object}}, list of str, dict of {str: str})\
+    -> generator of str
+    
+    Yield, piece by piece, the same text that get_present_string returns, so
+    that it can be written out without being built up in memory.
+    
+    >>> twitter_data = {\
+    'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':[]}, \
+    'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':[]}}
+    >>> list (iter_present_chunks (twitter_data, ['b', 'a'], \
+    {'sort-by':'username', 'format':'short'}))
+    ['[', "'a', ", "'b']"]
     """
     
-    formatted_result = ""
     all_usernames = usernames[:]
+    sort_by (twitterverse_dict, all_usernames, present_spec_dict)
     if (len (all_usernames) == 0):
-        formatted_result = "----------\n----------"
-    else:
-        sort_by (twitterverse_dict, all_usernames, present_spec_dict)
-        
-        if (present_spec_dict["format"] == "short"):
-            for names in all_usernames:
-                formatted_result = format_short (all_usernames)
-        elif (present_spec_dict["format"] == "long"):
-            for names in all_usernames:
-                formatted_result = formatted_result + \
-                format_long (twitterverse_dict, names)
-                if (names == all_usernames[-1]):
-                    formatted_result = formatted_result + "----------" + "\n"
-    return (formatted_result)
+        yield ("----------\n----------")
+        return
+    
+    if (present_spec_dict["format"] == "short"):
+        for piece in iter_format_short (all_usernames):
+            yield (piece)
+    elif (present_spec_dict["format"] == "long"):
+        last_name = all_usernames[-1]
+        for names in all_usernames:
+            for piece in iter_format_long (twitterverse_dict, names):
+                yield (piece)
+            if (names == last_name):
+                yield ("----------" + "\n")
+
+def write_present_string (twitterverse_dict, usernames, present_spec_dict, \
+                          output_file):
+    """ (dict of {str: dict of {str: object}}, list of str, dict of {str: str},\
+    file open for writing) -> NoneType
+    
+    Write the text that get_present_string returns to output_file as it is 
+    produced.
+    
+    >>> write_present_string ({}, [], {'sort-by':'username', 'format':'long'},\
+    sys.stdout)
+    ----------
+    ----------
+    """
+    
+    output_file.writelines (iter_present_chunks (twitterverse_dict, usernames, \
+                                                 present_spec_dict))
     
     
 # --- Sorting Helper Functions ---
+@instrument("tweet_sort", lambda arguments, result: \
+            {"users_sorted": len(arguments[1])})
 def tweet_sort(twitter_data, results, cmp):
     """ (Twitterverse dictionary, list of str, function) -> NoneType
     
@@ -430,14 +891,176 @@ def tweet_sort(twitter_data, results, cmp):
     ['b', 'a', 'c']
     """
     
-    # Insertion sort
-    for i in range(1, len(results)):
-        current = results[i]
-        position = i
-        while position > 0 and cmp(twitter_data, results[position - 1], current) > 0:
-            results[position] = results[position - 1]
-            position = position - 1 
-        results[position] = current 
+    # The built-in comparison functions are turned into one sort key per user
+    # so that the sort does O(n log n) comparisons of precomputed keys. Any 
+    # other cmp is still honoured through cmp_to_key. Both sorts are stable, 
+    # like the insertion sort this replaced, and like it they look nothing up
+    # when there is nothing to compare, so a lone username need not be a 
+    # user.
+    if len(results) < 2:
+        return
+    if cmp is more_popular:
+        arrays = get_degree_arrays(twitter_data)
+        if arrays is not None:
+            ordered = arrays.sort_by_popularity(results)
+            if ordered is not None:
+                results[:] = ordered
+                return
+    sort_keys = get_sort_keys(twitter_data, results, cmp)
+    metrics = tm.active()
+    if metrics is not None:
+        # Count comparisons only while metrics are being collected.
+        comparisons = [0]
+        if sort_keys is not None:
+            results.sort(key=lambda username: tm.CountingKey(
+                sort_keys[username], comparisons))
+        else:
+            results.sort(key=functools.cmp_to_key(
+                lambda a, b: _counted_cmp(cmp, twitter_data, a, b,
+                                          comparisons)))
+        metrics.record("tweet_sort", calls=0, comparisons=comparisons[0])
+    elif sort_keys is not None:
+        results.sort(key=sort_keys.__getitem__)
+    else:
+        results.sort(key=functools.cmp_to_key(
+            lambda a, b: cmp(twitter_data, a, b)))
+
+def _counted_cmp(cmp, twitter_data, a, b, comparisons):
+    """ (function, Twitterverse dictionary, str, str, list of int) -> int
+    
+    Return cmp(twitter_data, a, b), adding one to the count in comparisons.
+    """
+    
+    comparisons[0] = comparisons[0] + 1
+    return cmp(twitter_data, a, b)
+
+@instrument("tweet_top_k", lambda arguments, result: \
+            {"users_scanned": len(arguments[1]), "users_kept": len(result)})
+def tweet_top_k(twitter_data, results, cmp, limit):
+    """ (Twitterverse dictionary, list of str, function, int) -> list of str
+    
+    Return the first limit usernames of results in the order tweet_sort would
+    put them in with cmp, using the data in twitter_data. results itself is
+    not changed.
+    
+    >>> twitter_data = {\
+    'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b']}, \
+    'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':[]}, \
+    'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', 'following':['b']}}
+    >>> tweet_top_k(twitter_data, ['c', 'a', 'b'], more_popular, 2)
+    ['b', 'a']
+    >>> tweet_top_k(twitter_data, ['c', 'a', 'b'], name_first, 1)
+    ['b']
+    """
+    
+    # heapq.nsmallest keeps a heap of at most limit users, so this costs 
+    # O(n log limit) comparisons, and it breaks ties by position in results
+    # just as the stable sort in tweet_sort does.
+    if len(results) < 2:
+        return results[:limit]
+    if cmp is more_popular:
+        arrays = get_degree_arrays(twitter_data)
+        if arrays is not None:
+            ordered = arrays.sort_by_popularity(results)
+            if ordered is not None:
+                return ordered[:limit]
+    sort_keys = get_sort_keys(twitter_data, results, cmp)
+    if sort_keys is not None:
+        return heapq.nsmallest(limit, results, key=sort_keys.__getitem__)
+    return heapq.nsmallest(limit, results, key=functools.cmp_to_key(
+        lambda a, b: cmp(twitter_data, a, b)))
+
+def most_followed(twitter_data, n):
+    """ (Twitterverse dictionary, int) -> list of str
+    
+    Return the usernames of the n users in twitter_data with the most 
+    followers, in the order more_popular sorts them. A Twitterverse reads 
+    them straight off its PopularityIndex; a plain dict is scanned.
+    
+    >>> twitter_data = {\
+    'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b', 'x']}, \
+    'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':['x']}, \
+    'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', 'following':['b']}}
+    >>> most_followed(twitter_data, 2)
+    ['b', 'a']
+    >>> most_followed(Twitterverse(twitter_data), 2)
+    ['b', 'a']
+    """
+    
+    index = get_popularity_index(twitter_data)
+    if index is None:
+        return tweet_top_k(twitter_data, list(twitter_data), more_popular, n)
+    # Usernames that are followed but are not users are skipped, so only 
+    # they can make this read more than n usernames.
+    users = []
+    for username in index.iter_popular():
+        if len(users) == n:
+            break
+        if username in twitter_data:
+            users.append(username)
+    return users
+
+def get_sort_keys(twitter_data, results, cmp):
+    """ (Twitterverse dictionary, list of str, function) -> \
+    dict of {str: object} or NoneType
+    
+    Return a dict mapping every username in results to a sort key that orders
+    users the same way as the comparison function cmp, or None if cmp is not
+    one of username_first, name_first or more_popular. For more_popular, a
+    Twitterverse whose PopularityIndex is already built hands out the keys
+    the index keeps up to date, which cover every username; otherwise only
+    the follower counts of the results are looked up.
+    
+    >>> twitter_data = {\
+    'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b']}, \
+    'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':[]}}
+    >>> get_sort_keys(twitter_data, ['a', 'b'], name_first)
+    {'a': ('Zed', 'a'), 'b': ('Lee', 'b')}
+    >>> get_sort_keys(twitter_data, ['a', 'b'], more_popular)
+    {'a': (0, 'a'), 'b': (-1, 'b')}
+    >>> get_sort_keys(twitter_data, ['a', 'b'], lambda data, a, b: 0) is None
+    True
+    """
+    
+    if cmp is username_first:
+        return {username: username for username in results}
+    if cmp is name_first:
+        return {username: (twitter_data[username]["name"], username)
+                for username in results}
+    if cmp is more_popular:
+        index = current_popularity_index(twitter_data)
+        if index is not None:
+            return index.sort_keys
+        counts = follower_counts(twitter_data, results)
+        return {username: (-counts[username], username)
+                for username in results}
+    return None
+
+def follower_counts(twitter_data, usernames):
+    """ (Twitterverse dictionary, list of str) -> dict of {str: int}
+    
+    Return the number of followers of each of the usernames, based on the 
+    data in twitter_data. A plain dict is scanned once for all of the
+    usernames instead of once per username.
+    
+    >>> twitter_data = {\
+    'a':{'name':'', 'location':'', 'web':'', 'bio':'', 'following':['b', 'b']}, \
+    'b':{'name':'', 'location':'', 'web':'', 'bio':'', 'following':[]}, \
+    'c':{'name':'', 'location':'', 'web':'', 'bio':'', 'following':['b']}}
+    >>> follower_counts(twitter_data, ['a', 'b'])
+    {'a': 0, 'b': 2}
+    """
+    
+    graph = get_graph(twitter_data)
+    if graph is not None:
+        return {username: graph.follower_count(username)
+                for username in usernames}
+    counts = dict.fromkeys(usernames, 0)
+    for people in twitter_data:
+        for followed in set(twitter_data[people]["following"]):
+            if followed in counts:
+                counts[followed] = counts[followed] + 1
+    return counts
             
 def more_popular(twitter_data, a, b):
     """ (Twitterverse dictionary, str, str) -> int
@@ -456,8 +1079,13 @@ def more_popular(twitter_data, a, b):
     -1
     """
     
-    a_popularity = len(all_followers(twitter_data, a)) 
-    b_popularity = len(all_followers(twitter_data, b))
+    graph = get_graph(twitter_data)
+    if graph is not None:
+        a_popularity = graph.follower_count(a)
+        b_popularity = graph.follower_count(b)
+    else:
+        a_popularity = len(all_followers(twitter_data, a)) 
+        b_popularity = len(all_followers(twitter_data, b))
     if a_popularity > b_popularity:
         return -1
     if a_popularity < b_popularity:
@@ -0,0 +1,149 @@
+"""
+Synthetic Twitterverse data files.
+
+write_synthetic_data writes a data file in the format process_data reads,
+with any number of users. How many users each user follows, and how likely
+each user is to be followed, both follow power laws, so that a few accounts
+have very many followers and most have a handful, as on the real Twitter.
+Users are written one at a time, so files far larger than memory can be
+generated.
+
+Usage:
+    python twitterverse_generate.py USER_COUNT DATA_FILE [SEED]
+"""
+
+import bisect
+import itertools
+import random
+import sys
+from array import array
+
+FIRST_NAMES = ("Anna", "Tom", "Katie", "Lee", "Zed", "Nicole", "Perez",
+               "Diane", "Steve", "Gerry", "Maria", "Omar", "Priya", "Chen",
+               "Fatima", "Jonas", "Aiko", "Carlos", "Ngozi", "Ivan")
+LAST_NAMES = ("Cruise", "Holmes", "Kidman", "Hilton", "Case", "Power",
+              "Horton", "Smith", "Nguyen", "Garcia", "Okafor", "Petrov",
+              "Tanaka", "Singh", "Haddad", "Muller", "Silva", "Kim")
+LOCATIONS = ("Toronto, Ontario", "Los Angeles, CA", "New York, NY",
+             "Washington DC", "London, UK", "Hollywood, California",
+             "Mumbai, India", "Lagos, Nigeria", "Tokyo, Japan",
+             "Sao Paulo, Brazil", "Berlin, Germany", "")
+BIO_WORDS = ("official", "tweets", "love", "music", "news", "coffee", "code",
+             "travel", "family", "founder", "chairman", "actor", "fan",
+             "photos", "science", "sports", "books", "film", "food", "art")
+
+# Exponents of the power laws for popularity and for following counts, and
+# the least and most users anyone follows.
+POPULARITY_EXPONENT = 1.0
+FOLLOWING_EXPONENT = 1.5
+MIN_FOLLOWING = 5
+MAX_FOLLOWING = 1000
+
+
+def username_of(user_number):
+    """ (int) -> str
+
+    Return the username of synthetic user number user_number.
+
+    >>> username_of(42)
+    'user42'
+    """
+
+    return ("user" + str(user_number))
+
+
+def following_count(generator, user_count):
+    """ (Random, int) -> int
+
+    Return a random number of users to follow, drawn from a Pareto
+    distribution with FOLLOWING_EXPONENT starting at MIN_FOLLOWING, and
+    capped so no user follows more than MAX_FOLLOWING users or everyone else.
+    """
+
+    count = int(MIN_FOLLOWING * generator.paretovariate(FOLLOWING_EXPONENT))
+    return (min(count, MAX_FOLLOWING, user_count - 1))
+
+
+def iter_synthetic_users(user_count, seed=0):
+    """ (int, int) -> generator of (str, dict of {str: object})
+
+    Yield user_count synthetic (username, user dictionary) pairs. The chance
+    of being followed falls off as a power law of a random popularity rank,
+    so follower counts have a heavy tail.
+
+    >>> users = list(iter_synthetic_users(50, 1))
+    >>> len(users), users[0][0]
+    (50, 'user0')
+    >>> all(username not in user['following'] for username, user in users)
+    True
+    """
+
+    generator = random.Random(seed)
+    ranks = list(range(1, user_count + 1))
+    generator.shuffle(ranks)
+    cumulative_weights = array("d", itertools.accumulate(
+        rank ** -POPULARITY_EXPONENT for rank in ranks))
+    del ranks
+    total_weight = cumulative_weights[-1] if user_count > 0 else 0
+    for user_number in range(user_count):
+        wanted = following_count(generator, user_count)
+        following = {}
+        attempts = 0
+        while len(following) < wanted and attempts < wanted * 10:
+            attempts = attempts + 1
+            followed = bisect.bisect(cumulative_weights,
+                                     generator.random() * total_weight)
+            followed = min(followed, user_count - 1)
+            if followed != user_number:
+                following[username_of(followed)] = None
+        name = generator.choice(FIRST_NAMES) + " " + \
+            generator.choice(LAST_NAMES)
+        bio_lines = []
+        for line_number in range(generator.randint(0, 3)):
+            bio_lines.append(" ".join(generator.choice(BIO_WORDS)
+                                      for word in range(
+                                          generator.randint(1, 12))))
+        web = ""
+        if generator.random() < 0.5:
+            web = "http://www." + name.replace(" ", "").lower() + ".com"
+        yield (username_of(user_number),
+               {"name": name, "location": generator.choice(LOCATIONS),
+                "web": web, "bio": "\n".join(bio_lines),
+                "following": list(following)})
+
+
+def write_user(data_file, username, user):
+    """ (file open for writing, str, dict of {str: object}) -> NoneType
+
+    Write the record of username to data_file in the data file format.
+    """
+
+    lines = [username, user["name"], user["location"], user["web"]]
+    if user["bio"] != "":
+        lines.append(user["bio"])
+    lines.append("ENDBIO")
+    lines.extend(user["following"])
+    lines.append("END")
+    data_file.write("\n".join(lines) + "\n")
+
+
+def write_synthetic_data(data_file, user_count, seed=0):
+    """ (file open for writing, int, int) -> NoneType
+
+    Write a synthetic Twitterverse of user_count users to data_file.
+    """
+
+    for username, user in iter_synthetic_users(user_count, seed):
+        write_user(data_file, username, user)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (3, 4) or not sys.argv[1].isdigit():
+        sys.exit("usage: python twitterverse_generate.py USER_COUNT "
+                 "DATA_FILE [SEED]")
+    seed = 0
+    if len(sys.argv) == 4:
+        seed = int(sys.argv[3])
+    output_file = open(sys.argv[2], "w")
+    write_synthetic_data(output_file, int(sys.argv[1]), seed)
+    output_file.close()
@@ -0,0 +1,547 @@
+"""
+Adjacency index for Twitterverse dictionaries.
+
+A plain Twitterverse dictionary only stores who each user is following, so
+finding the followers of a user means scanning every user in the dictionary.
+The TwitterverseGraph below keeps the forward ("following") adjacency that is
+already in the dictionary together with a reverse ("followers") adjacency that
+is built once, so that follower lookups cost O(degree) instead of O(users).
+
+process_data returns a Twitterverse, which is an ordinary Twitterverse
+dictionary that also carries its graph in the graph attribute. Functions in
+twitterverse_functions use the graph when it is there and fall back to
+scanning the dictionary when they are given a plain dict.
+
+A Twitterverse can also be changed one user or one follow at a time, which
+updates the graph, its popularity index and any substring indexes built on
+it, in time proportional to the users and edges involved rather than to the
+size of the Twitterverse.
+"""
+
+import collections
+import contextlib
+import gc
+import itertools
+
+from twitterverse_hops import update_hop_index
+from twitterverse_index import update_substring_indexes
+from twitterverse_popularity import PopularityIndex
+
+
+@contextlib.contextmanager
+def paused_gc():
+    """ () -> context manager
+
+    Turn the cyclic garbage collector off inside a with block, and back on
+    when the block ends if it was on before. Loading a Twitterverse makes
+    millions of lists and dicts but no reference cycles, so the collector's
+    passes over them would only cost time.
+    """
+
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if collecting:
+            gc.enable()
+
+
+class TwitterverseGraph:
+    """ Forward and reverse adjacency over a Twitterverse dictionary.
+
+    The followers of each user are kept in the same order as the users appear
+    in the Twitterverse dictionary, which is the order all_followers has
+    always returned them in. They are built as lists, which new followers
+    are appended to; the first time a follower is removed or comes before
+    the last one, the list becomes a dict of followers, so that each later
+    change costs O(1), and a dict with followers out of order is sorted by
+    position the next time it is read.
+    """
+
+    def __init__(self, twitterverse_dict):
+        """ (TwitterverseGraph, dict of {str: dict of {str: object}}) -> \
+        NoneType
+
+        Build the reverse adjacency of twitterverse_dict.
+        """
+
+        self._twitterverse_dict = twitterverse_dict
+        # The usernames whose followers are a dict that is out of order.
+        self._unsorted = set()
+        # The position of each user in the dictionary's order, which only
+        # ever grows, so that followers can be kept sorted by it.
+        self._positions = dict(zip(twitterverse_dict, itertools.count()))
+        self._next_position = len(self._positions)
+        # The PopularityIndex, once popularity_index has built it.
+        self._popularity = None
+        # Users are added in position order, so every follower goes at the
+        # end of its list and add_user's checks can be skipped. Following
+        # lists rarely name anyone twice, so only those that do are copied
+        # to drop the repeats.
+        followers = collections.defaultdict(list)
+        with paused_gc():
+            for username, user in twitterverse_dict.items():
+                following = user["following"]
+                if len(following) > 1 and \
+                        len(set(following)) != len(following):
+                    following = dict.fromkeys(following)
+                for followed in following:
+                    followers[followed].append(username)
+            self._followers = dict(followers)
+
+    def add_user(self, username):
+        """ (TwitterverseGraph, str) -> NoneType
+
+        Add the follow edges of username, which is in the Twitterverse
+        dictionary. A new user goes after every user already in the graph.
+        """
+
+        if username not in self._positions:
+            self._positions[username] = self._next_position
+            self._next_position = self._next_position + 1
+        if self._popularity is not None and \
+                username not in self._popularity:
+            self._popularity.set_count(username, 0)
+        # A user counts once as a follower even if the data file lists
+        # the same username twice in their following list.
+        for followed in dict.fromkeys(
+                self._twitterverse_dict[username]["following"]):
+            self.add_follow(username, followed)
+
+    def remove_user(self, username, forget=True):
+        """ (TwitterverseGraph, str, bool) -> NoneType
+
+        Remove the follow edges of username, which is still in the
+        Twitterverse dictionary. Unless forget is False, username also loses
+        its position, as it does when it is deleted from the dictionary.
+        """
+
+        for followed in set(self._twitterverse_dict[username]["following"]):
+            self.remove_follow(username, followed)
+        if forget:
+            del self._positions[username]
+            if self._popularity is not None and \
+                    username not in self._followers:
+                self._popularity.remove(username)
+
+    def _changing_followers(self, followed):
+        """ (TwitterverseGraph, str) -> dict of {str: NoneType}
+
+        Return the followers of followed as a dict that can be changed in
+        place, turning their list into one if need be.
+        """
+
+        followers = self._followers[followed]
+        if isinstance(followers, list):
+            followers = dict.fromkeys(followers)
+            self._followers[followed] = followers
+        return (followers)
+
+    def add_follow(self, username, followed):
+        """ (TwitterverseGraph, str, str) -> NoneType
+
+        Record that username is following followed. username must be in the
+        graph and must not already be recorded as following followed.
+        """
+
+        followers = self._followers.get(followed)
+        if followers is None:
+            followers = [username]
+            self._followers[followed] = followers
+        elif self._positions[next(reversed(followers))] < \
+                self._positions[username]:
+            if isinstance(followers, list):
+                followers.append(username)
+            else:
+                followers[username] = None
+        else:
+            followers = self._changing_followers(followed)
+            followers[username] = None
+            self._unsorted.add(followed)
+        if self._popularity is not None:
+            self._popularity.set_count(followed, len(followers))
+
+    def remove_follow(self, username, followed):
+        """ (TwitterverseGraph, str, str) -> NoneType
+
+        Record that username is no longer following followed.
+        """
+
+        followers = self._changing_followers(followed)
+        del followers[username]
+        if len(followers) == 0:
+            self._forget_followers(followed)
+        elif self._popularity is not None:
+            self._popularity.set_count(followed, len(followers))
+
+    def remove_followers(self, followed):
+        """ (TwitterverseGraph, str) -> NoneType
+
+        Record that nobody is following followed any more, all at once.
+        """
+
+        if followed in self._followers:
+            self._forget_followers(followed)
+
+    def _forget_followers(self, followed):
+        """ (TwitterverseGraph, str) -> NoneType
+
+        Drop the followers of followed, who has some.
+        """
+
+        del self._followers[followed]
+        self._unsorted.discard(followed)
+        if self._popularity is None:
+            return
+        if followed in self._positions:
+            self._popularity.set_count(followed, 0)
+        else:
+            self._popularity.remove(followed)
+
+    def following(self, username):
+        """ (TwitterverseGraph, str) -> list of str
+
+        Return the usernames that username is following.
+
+        >>> graph = TwitterverseGraph({\
+        'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b']}, \
+        'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':[]}})
+        >>> graph.following('a')
+        ['b']
+        """
+
+        return (self._twitterverse_dict[username]["following"])
+
+    def followers(self, username):
+        """ (TwitterverseGraph, str) -> list of str
+
+        Return a new list of the usernames that are following username.
+
+        >>> graph = TwitterverseGraph({\
+        'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b']}, \
+        'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':[]}, \
+        'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', 'following':['b', 'b']}})
+        >>> graph.followers('b')
+        ['a', 'c']
+        >>> graph.followers('a')
+        []
+        """
+
+        if username in self._unsorted:
+            self._unsorted.discard(username)
+            self._followers[username] = dict.fromkeys(sorted(
+                self._followers[username], key=self._positions.__getitem__))
+        return (list(self._followers.get(username, ())))
+
+    def popularity_index(self, build=True):
+        """ (TwitterverseGraph, bool) -> PopularityIndex or NoneType
+
+        Return the PopularityIndex of every user and every followed
+        username, building it the first time it is asked for, or None if it
+        has not been built yet and build is False.
+
+        >>> graph = TwitterverseGraph({\
+        'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b']}, \
+        'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':[]}})
+        >>> graph.popularity_index().top(2)
+        ['b', 'a']
+        """
+
+        if self._popularity is None and build:
+            counts = dict.fromkeys(self._positions, 0)
+            for followed, followers in self._followers.items():
+                counts[followed] = len(followers)
+            self._popularity = PopularityIndex(counts)
+        return (self._popularity)
+
+    def followed_usernames(self):
+        """ (TwitterverseGraph) -> list of str
+
+        Return the usernames that at least one user is following, including
+        usernames that are not users themselves.
+
+        >>> graph = TwitterverseGraph({\
+        'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b', 'x']}, \
+        'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':[]}})
+        >>> graph.followed_usernames()
+        ['b', 'x']
+        """
+
+        return (list(self._followers))
+
+    def follower_count(self, username):
+        """ (TwitterverseGraph, str) -> int
+
+        Return the number of users that are following username.
+
+        >>> graph = TwitterverseGraph({\
+        'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b']}, \
+        'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':[]}})
+        >>> graph.follower_count('b')
+        1
+        """
+
+        return (len(self._followers.get(username, ())))
+
+
+class Twitterverse(dict):
+    """ A Twitterverse dictionary that carries a TwitterverseGraph of itself.
+
+    The graph is built when the Twitterverse is created. Setting or deleting
+    a user, whether directly or through update, setdefault, pop, popitem,
+    clear or |=, and the follow, unfollow, delete_user and update_user
+    methods, keep the graph up to date as they go; after changing a user's
+    dictionary in place, call mark_changed to rebuild it. The version
+    attribute counts these changes, so caches of query results can tell
+    when they are stale.
+    """
+
+    def __init__(self, twitterverse_dict=()):
+        """ (Twitterverse, dict of {str: dict of {str: object}}) -> NoneType
+
+        Copy the users of twitterverse_dict and index their follow edges.
+        """
+
+        dict.__init__(self, twitterverse_dict)
+        self.version = 0
+        self.graph = TwitterverseGraph(self)
+
+    def __setitem__(self, username, user):
+        """ (Twitterverse, str, dict of {str: object}) -> NoneType
+
+        Add username, or replace its user dictionary if it is already here.
+        """
+
+        if username in self:
+            self.graph.remove_user(username, False)
+        dict.__setitem__(self, username, user)
+        self.graph.add_user(username)
+        self._changed([username])
+
+    def __delitem__(self, username):
+        """ (Twitterverse, str) -> NoneType
+
+        Delete username. Users following username keep it in their following
+        lists, as they would in a data file.
+        """
+
+        if username in self:
+            self.graph.remove_user(username)
+        dict.__delitem__(self, username)
+        self._changed([username])
+
+    def update(self, *users, **more_users):
+        """ (Twitterverse, dict of {str: dict of {str: object}}, \
+        **dict of {str: object}) -> NoneType
+
+        Add or replace every user in users and more_users, as dict.update
+        does, one at a time as setting them would.
+
+        >>> twitterverse = Twitterverse()
+        >>> twitterverse.update({\
+        'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b']}}, \
+        b={'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':[]})
+        >>> twitterverse.version, twitterverse.graph.followers('b')
+        (2, ['a'])
+        """
+
+        if len(users) > 1:
+            raise TypeError("update expected at most 1 argument, got " +
+                            str(len(users)))
+        if len(users) == 1:
+            pairs = users[0]
+            if hasattr(pairs, "keys"):
+                pairs = [(username, pairs[username])
+                         for username in pairs.keys()]
+            for username, user in pairs:
+                self[username] = user
+        for username in more_users:
+            self[username] = more_users[username]
+
+    def __ior__(self, users):
+        """ (Twitterverse, dict of {str: dict of {str: object}}) -> \
+        Twitterverse
+
+        Add or replace every user in users.
+        """
+
+        self.update(users)
+        return (self)
+
+    def setdefault(self, username, user=None):
+        """ (Twitterverse, str, dict of {str: object}) -> dict of {str: object}
+
+        Return the user dictionary of username, adding it as user first if
+        it is not here.
+        """
+
+        if username not in self:
+            self[username] = user
+        return (self[username])
+
+    def pop(self, username, *default):
+        """ (Twitterverse, str, object) -> dict of {str: object}
+
+        Delete username and return its user dictionary, or return default if
+        it is not here and a default is given.
+        """
+
+        if username not in self:
+            return (dict.pop(self, username, *default))
+        user = self[username]
+        del self[username]
+        return (user)
+
+    def popitem(self):
+        """ (Twitterverse) -> (str, dict of {str: object})
+
+        Delete the user added last and return its username and user
+        dictionary.
+        """
+
+        if len(self) == 0:
+            raise KeyError("popitem(): dictionary is empty")
+        username = next(reversed(self))
+        return ((username, self.pop(username)))
+
+    def clear(self):
+        """ (Twitterverse) -> NoneType
+
+        Delete every user.
+
+        >>> twitterverse = Twitterverse({\
+        'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['a']}})
+        >>> twitterverse.clear()
+        >>> twitterverse.version, twitterverse.graph.followers('a')
+        (1, [])
+        """
+
+        dict.clear(self)
+        self.mark_changed()
+
+    def __reduce__(self):
+        """ (Twitterverse) -> tuple
+
+        Pickle a Twitterverse as its users and version; the graph is rebuilt
+        when it is unpickled.
+        """
+
+        return (Twitterverse, (dict(self),), {"version": self.version})
+
+    def follow(self, username, followed):
+        """ (Twitterverse, str, str) -> NoneType
+
+        Make username follow followed, if it does not already.
+
+        >>> twitterverse = Twitterverse({\
+        'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':[]}, \
+        'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':[]}})
+        >>> twitterverse.follow('b', 'a')
+        >>> twitterverse['b']['following'], twitterverse.graph.followers('a')
+        (['a'], ['b'])
+        """
+
+        following = self[username]["following"]
+        if followed not in following:
+            following.append(followed)
+            self.graph.add_follow(username, followed)
+            self._changed([], [followed])
+
+    def unfollow(self, username, followed):
+        """ (Twitterverse, str, str) -> NoneType
+
+        Make username stop following followed, if it does.
+        """
+
+        following = self[username]["following"]
+        if followed in following:
+            following[:] = [names for names in following if names != followed]
+            self.graph.remove_follow(username, followed)
+            self._changed([])
+
+    def delete_user(self, username):
+        """ (Twitterverse, str) -> NoneType
+
+        Delete username and every follow to or from it, in time proportional
+        to its followers and following rather than to the size of the
+        Twitterverse.
+
+        >>> twitterverse = Twitterverse({\
+        'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b']}, \
+        'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':['a']}})
+        >>> twitterverse.delete_user('b')
+        >>> twitterverse['a']['following'], twitterverse.graph.followers('b')
+        ([], [])
+        """
+
+        for follower in self.graph.followers(username):
+            following = self[follower]["following"]
+            following[:] = [names for names in following if names != username]
+        self.graph.remove_followers(username)
+        del self[username]
+
+    def update_user(self, username, fields):
+        """ (Twitterverse, str, dict of {str: str}) -> NoneType
+
+        Change the name, location, web and bio of username to the values in
+        fields. The following list can only be changed with follow and
+        unfollow.
+        """
+
+        for field in fields:
+            if field not in ("name", "location", "web", "bio"):
+                raise KeyError(field)
+        self[username].update(fields)
+        self._changed([username])
+
+    def mark_changed(self):
+        """ (Twitterverse) -> NoneType
+
+        Rebuild the graph and move on to the next version, after the users
+        in this Twitterverse have been changed in place.
+
+        >>> twitterverse = Twitterverse({\
+        'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':[]}})
+        >>> twitterverse['a']['following'].append('b')
+        >>> twitterverse.mark_changed()
+        >>> twitterverse.version, twitterverse.graph.followers('b')
+        (1, ['a'])
+        """
+
+        self.version = self.version + 1
+        self.graph = TwitterverseGraph(self)
+
+    def _changed(self, usernames, followed=()):
+        """ (Twitterverse, list of str, list of str) -> NoneType
+
+        Move on to the next version after the users in usernames (and
+        possibly some follow edges, to the usernames in followed) have
+        changed, bringing the substring and hop indexes of the old version
+        along.
+        """
+
+        self.version = self.version + 1
+        update_substring_indexes(self, usernames)
+        update_hop_index(self, usernames, followed)
+
+
+def get_graph(twitterverse_dict):
+    """ (dict of {str: dict of {str: object}}) -> TwitterverseGraph or \
+    NoneType
+
+    Return the graph carried by twitterverse_dict, or None if it is a plain
+    dict without one.
+
+    >>> get_graph({}) is None
+    True
+    >>> get_graph(Twitterverse({})) is None
+    False
+    """
+
+    return (getattr(twitterverse_dict, "graph", None))
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
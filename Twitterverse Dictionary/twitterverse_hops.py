@@ -0,0 +1,300 @@
+"""
+Multi-hop search operations.
+
+Besides "following" and "followers", a search operation can repeat a step:
+    - "following*3" gives the usernames exactly three following steps away,
+      the same usernames as listing "following" three times, though not
+      in the same order
+    - "following*<=3" gives the usernames one, two or three following steps
+      away
+
+Frontiers are bytearrays indexed by user id, so each hop costs one pass over
+the edges of the users in the frontier and no list of usernames is built
+until the last hop. A compact or binary Twitterverse already numbers its
+users. A Twitterverse gets a HopIndex, which numbers its usernames once and
+looks edges up in the Twitterverse only as they are needed; each change to
+the Twitterverse patches the ids of the usernames it touched rather than
+numbering them all again. A plain dict has no ids, so
+twitterverse_functions.search_hops searches it one step at a time instead.
+
+Multi-hop results list users in Twitterverse order, followed by usernames
+that are followed but are not users, in the order the search first reached
+them. Every kind of Twitterverse, including a plain dict, gives the same
+order.
+"""
+
+import itertools
+
+STEPS = ("following", "followers")
+
+
+def parse_operation(operation):
+    """ (str) -> (str, int, bool) or NoneType
+
+    Return the step, number of hops and whether the hops are cumulative of
+    a multi-hop operation, or None for an operation without a "*". Raise
+    ValueError if a multi-hop operation is not well formed.
+
+    >>> parse_operation("followers*2")
+    ('followers', 2, False)
+    >>> parse_operation("following*<=3")
+    ('following', 3, True)
+    >>> parse_operation("following") is None
+    True
+    >>> parse_operation("following*0")
+    Traceback (most recent call last):
+    ...
+    ValueError: not a multi-hop operation: following*0
+    """
+
+    if "*" not in operation:
+        return (None)
+    step, hops = operation.split("*", 1)
+    cumulative = hops.startswith("<=")
+    if cumulative:
+        hops = hops[2:]
+    if step not in STEPS or not hops.isdigit() or int(hops) < 1:
+        raise ValueError("not a multi-hop operation: " + operation)
+    return ((step, int(hops), cumulative))
+
+
+class HopIndex:
+    """ User ids over a Twitterverse, for multi-hop searches.
+
+    Ids are handed out in the order usernames are first seen: users in
+    Twitterverse order and then the usernames they follow that are not
+    users. A HopIndex answers the same user_id, following_ids and
+    follower_ids questions as a CompactTwitterverse, looking the edges of an
+    id up in the Twitterverse and its graph when they are asked for, so it
+    only costs one pass over the usernames to build.
+
+    When the Twitterverse changes, update_user and add_followed patch the
+    ids of the usernames involved. A new user gets a new id at the end, as
+    it comes last in the Twitterverse, and any id it had before is dropped.
+    is_user tells which ids belong to users.
+    """
+
+    def __init__(self, twitterverse):
+        """ (HopIndex, Twitterverse) -> NoneType
+
+        Number the usernames of twitterverse.
+        """
+
+        self._twitterverse = twitterverse
+        self.usernames = list(twitterverse)
+        self.is_user = bytearray(b"\x01") * len(self.usernames)
+        self._ids = dict(zip(self.usernames, itertools.count()))
+        self.user_id = self._ids.get
+        for followed in twitterverse.graph.followed_usernames():
+            self.add_followed(followed)
+
+    def dropped_count(self):
+        """ (HopIndex) -> int
+
+        Return the number of ids no username has any more.
+        """
+
+        return (len(self.usernames) - len(self._ids))
+
+    def _new_id(self, username, is_user):
+        """ (HopIndex, str, bool) -> NoneType
+
+        Give username the next id.
+        """
+
+        self._ids[username] = len(self.usernames)
+        self.usernames.append(username)
+        self.is_user.append(is_user)
+
+    def add_followed(self, username):
+        """ (HopIndex, str) -> NoneType
+
+        Give username an id, if it does not have one, now that it is
+        followed.
+        """
+
+        if username not in self._ids:
+            self._new_id(username, False)
+
+    def update_user(self, username):
+        """ (HopIndex, str) -> NoneType
+
+        Bring the id of username and of the usernames it follows up to date
+        after username was added, changed or deleted.
+        """
+
+        user_id = self._ids.get(username)
+        if username not in self._twitterverse:
+            # A deleted user keeps its id for as long as it is followed.
+            if user_id is not None:
+                self.is_user[user_id] = False
+            return
+        if user_id is None or not self.is_user[user_id]:
+            self._new_id(username, True)
+        for followed in self._twitterverse[username]["following"]:
+            self.add_followed(followed)
+
+    def following_ids(self, user_id):
+        """ (HopIndex, int) -> iterable of int
+
+        Return the ids that user_id is following.
+        """
+
+        if not self.is_user[user_id]:
+            return (())
+        return (map(self._ids.__getitem__,
+                    self._twitterverse[self.usernames[user_id]]["following"]))
+
+    def follower_ids(self, user_id):
+        """ (HopIndex, int) -> iterable of int
+
+        Return the ids of the users following user_id.
+        """
+
+        return (map(self._ids.__getitem__,
+                    self._twitterverse.graph.followers(self.usernames[user_id])))
+
+
+def _is_user(compact, user_id):
+    """ (HopIndex or CompactTwitterverse, int) -> bool
+
+    Return whether user_id is the id of a user of compact.
+    """
+
+    if isinstance(compact, HopIndex):
+        return (compact.is_user[user_id])
+    return (user_id < compact.user_count)
+
+
+def get_hop_index(twitterverse_dict):
+    """ (dict of {str: dict of {str: object}}) -> HopIndex or \
+    CompactTwitterverse or NoneType
+
+    Return the ids and edges that hop_search uses for twitterverse_dict:
+    twitterverse_dict itself if it is compact, or its HopIndex, which is
+    built the first time and kept up to date by update_hop_index. Return
+    None for a plain dict.
+    """
+
+    if hasattr(twitterverse_dict, "following_ids"):
+        return (twitterverse_dict)
+    version = getattr(twitterverse_dict, "version", None)
+    if version is None:
+        return (None)
+    index = getattr(twitterverse_dict, "hop_index", None)
+    if index is None or index[0] != version:
+        index = (version, HopIndex(twitterverse_dict))
+        twitterverse_dict.hop_index = index
+    return (index[1])
+
+
+def update_hop_index(twitterverse_dict, usernames, followed):
+    """ (dict of {str: dict of {str: object}}, list of str, list of str) -> \
+    NoneType
+
+    Bring the HopIndex of twitterverse_dict up to its current version, after
+    only the users in usernames were added, changed or deleted and only the
+    usernames in followed gained followers since the version before it. An
+    older HopIndex, or one where more ids have been dropped than are in use,
+    is dropped instead.
+    """
+
+    index = getattr(twitterverse_dict, "hop_index", None)
+    if index is None:
+        return
+    version = twitterverse_dict.version
+    hop_index = index[1]
+    if index[0] != version - 1:
+        del twitterverse_dict.hop_index
+        return
+    for username in usernames:
+        hop_index.update_user(username)
+    for username in followed:
+        hop_index.add_followed(username)
+    if hop_index.dropped_count() > len(hop_index.usernames) // 2:
+        del twitterverse_dict.hop_index
+        return
+    twitterverse_dict.hop_index = (version, hop_index)
+
+
+def hop_search(twitterverse_dict, usernames, operation):
+    """ (dict of {str: dict of {str: object}}, list of str, str) -> \
+    list of str or NoneType
+
+    Return the usernames that the multi-hop operation reaches from
+    usernames, or None for a plain dict. Like all_following, raise KeyError
+    when following would have to step from a username that is not a user.
+
+    >>> from twitterverse_graph import Twitterverse
+    >>> twitter_data = Twitterverse({\
+    'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b']}, \
+    'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':['c']}, \
+    'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', 'following':['a']}})
+    >>> hop_search(twitter_data, ['a'], "following*2")
+    ['c']
+    >>> hop_search(twitter_data, ['a'], "following*<=2")
+    ['b', 'c']
+    >>> hop_search(twitter_data, ['a'], "followers*<=3")
+    ['a', 'b', 'c']
+    >>> hop_search(dict(twitter_data), ['a'], "followers*<=3") is None
+    True
+    """
+
+    step, hops, cumulative = parse_operation(operation)
+    compact = get_hop_index(twitterverse_dict)
+    if compact is None:
+        return (None)
+
+    id_count = len(compact.usernames)
+    frontier = []
+    for username in dict.fromkeys(usernames):
+        user_id = compact.user_id(username)
+        if user_id is not None:
+            frontier.append(user_id)
+        elif step == "following":
+            raise KeyError(username)
+    if step == "following":
+        neighbours = compact.following_ids
+    else:
+        neighbours = compact.follower_ids
+    reached = bytearray(id_count)
+    # The ids reached, in the order they were first reached.
+    discovered = []
+    for hop in range(hops):
+        seen = bytearray(id_count)
+        next_frontier = []
+        for user_id in frontier:
+            if step == "following" and not _is_user(compact, user_id):
+                raise KeyError(compact.usernames[user_id])
+            for neighbour in neighbours(user_id):
+                if not seen[neighbour]:
+                    seen[neighbour] = 1
+                    next_frontier.append(neighbour)
+        if cumulative:
+            # Only users reached for the first time need to be expanded.
+            frontier = [user_id for user_id in next_frontier
+                        if not reached[user_id]]
+            for user_id in frontier:
+                reached[user_id] = 1
+            discovered.extend(frontier)
+        else:
+            frontier = next_frontier
+            reached = seen
+            discovered = frontier
+        if len(frontier) == 0:
+            break
+    if not cumulative and len(frontier) == 0:
+        return ([])
+    # Users have ids in Twitterverse order; usernames that are only
+    # followed do not, so they come after them in the order reached.
+    found = [compact.usernames[user_id]
+             for user_id in itertools.compress(range(id_count), reached)
+             if _is_user(compact, user_id)]
+    found.extend([compact.usernames[user_id] for user_id in discovered
+                  if not _is_user(compact, user_id)])
+    return (found)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
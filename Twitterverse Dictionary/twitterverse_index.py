@@ -0,0 +1,259 @@
+"""
+Trigram substring indexes for the name-includes and location-includes
+filters.
+
+A SubstringIndex keeps the lowercased value of one field (such as "name")
+for every user, together with an inverted index from each three-character
+substring (trigram) to the users whose lowercased value contains it. A
+substring match of a needle of three or more characters can only happen for
+users that are in the posting list of every trigram of the needle, so the
+filter intersects those posting lists, smallest first, and only checks the
+substring on the users that are left.
+
+A filter only builds an index when the usernames it filters are at least
+INDEX_MIN_SHARE of the users, since scanning a small frontier is cheaper
+than indexing every user. Long-running modes, where the cost is paid back
+over many queries, build the indexes up front with build_substring_indexes.
+Indexes are kept on the Twitterverse and patched as it changes.
+"""
+
+# The indexed fields.
+INDEXED_FIELDS = ("name", "location")
+# The least share of the users a filter must scan to build an index.
+INDEX_MIN_SHARE = 0.5
+
+
+def trigrams(text):
+    """ (str) -> set of str
+
+    Return the set of three-character substrings of text.
+
+    >>> sorted(trigrams("anna"))
+    ['ann', 'nna']
+    >>> trigrams("ab")
+    set()
+    """
+
+    return ({text[i:i + 3] for i in range(len(text) - 2)})
+
+
+class SubstringIndex:
+    """ A trigram index over the lowercased values of one field of every
+    user in a Twitterverse.
+
+    >>> index = SubstringIndex({\
+    'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':[]}, \
+    'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':[]}, \
+    'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', 'following':[]}}, \
+    'name')
+    >>> index.filter(['a', 'b', 'c'], 'E')
+    ['a', 'b']
+    >>> index.filter(['c', 'b'], 'NNA')
+    ['c']
+    """
+
+    def __init__(self, twitterverse_dict, field):
+        """ (SubstringIndex, dict of {str: dict of {str: object}}, str) -> \
+        NoneType
+
+        Index field of every user in twitterverse_dict.
+        """
+
+        self.field = field
+        self.lowered = {}
+        self.postings = {}
+        for username in twitterverse_dict:
+            value = twitterverse_dict[username][field].lower()
+            self.lowered[username] = value
+            for trigram in trigrams(value):
+                if trigram in self.postings:
+                    self.postings[trigram].add(username)
+                else:
+                    self.postings[trigram] = {username}
+
+    def estimate(self, needle):
+        """ (SubstringIndex, str) -> int or NoneType
+
+        Return an upper bound on the number of users whose value contains
+        needle, from the size of the smallest posting list of its trigrams,
+        or None if needle is too short to have any trigrams.
+
+        >>> SubstringIndex({\
+        'a':{'name':'anna', 'location':'', 'web':'', 'bio':'', 'following':[]}}, \
+        'name').estimate('Ann')
+        1
+        """
+
+        needle_trigrams = trigrams(needle.lower())
+        if len(needle_trigrams) == 0:
+            return (None)
+        return (min(len(self.postings.get(trigram, ()))
+                    for trigram in needle_trigrams))
+
+    def update_user(self, username, value):
+        """ (SubstringIndex, str, str) -> NoneType
+
+        Reindex username, whose value of the field is now value, or who has
+        been deleted if value is None.
+
+        >>> index = SubstringIndex({\
+        'a':{'name':'anna', 'location':'', 'web':'', 'bio':'', 'following':[]}}, \
+        'name')
+        >>> index.update_user('a', 'Bob')
+        >>> index.filter(['a'], 'ann'), index.filter(['a'], 'bob')
+        ([], ['a'])
+        """
+
+        old_value = self.lowered.pop(username, None)
+        if old_value is not None:
+            for trigram in trigrams(old_value):
+                self.postings[trigram].discard(username)
+                if len(self.postings[trigram]) == 0:
+                    del self.postings[trigram]
+        if value is not None:
+            value = value.lower()
+            self.lowered[username] = value
+            for trigram in trigrams(value):
+                if trigram in self.postings:
+                    self.postings[trigram].add(username)
+                else:
+                    self.postings[trigram] = {username}
+
+    def candidates(self, needle):
+        """ (SubstringIndex, str) -> set of str or NoneType
+
+        Return the users whose value contains every trigram of the lowercased
+        needle, or None if needle is too short to have any trigrams.
+        """
+
+        needle_trigrams = trigrams(needle.lower())
+        if len(needle_trigrams) == 0:
+            return (None)
+        posting_lists = []
+        for trigram in needle_trigrams:
+            if trigram not in self.postings:
+                return (set())
+            posting_lists.append(self.postings[trigram])
+        posting_lists.sort(key=len)
+        found = set(posting_lists[0])
+        for posting_list in posting_lists[1:]:
+            found.intersection_update(posting_list)
+            if len(found) == 0:
+                break
+        return (found)
+
+    def filter(self, usernames, needle):
+        """ (SubstringIndex, list of str, str) -> list of str
+
+        Return the usernames, in order, whose value contains needle, ignoring
+        case. Usernames that are not indexed users never match.
+        """
+
+        needle = needle.lower()
+        lowered = self.lowered
+        found = self.candidates(needle)
+        if found is None or len(found) >= len(usernames):
+            return ([names for names in usernames
+                     if names in lowered and needle in lowered[names]])
+        matches = {names for names in found if needle in lowered[names]}
+        return ([names for names in usernames if names in matches])
+
+
+def get_substring_index(twitterverse_dict, field):
+    """ (dict of {str: dict of {str: object}}, str) -> SubstringIndex or \
+    NoneType
+
+    Return the SubstringIndex of field for twitterverse_dict, building it if
+    it is missing or out of date. Return None for a Twitterverse without a
+    version attribute, such as a plain dict, because it could change without
+    the index being told.
+    """
+
+    version = getattr(twitterverse_dict, "version", None)
+    if version is None:
+        return (None)
+    indexes = getattr(twitterverse_dict, "substring_indexes", None)
+    if indexes is None or indexes[0] != version:
+        indexes = (version, {})
+        twitterverse_dict.substring_indexes = indexes
+    if field not in indexes[1]:
+        indexes[1][field] = SubstringIndex(twitterverse_dict, field)
+    return (indexes[1][field])
+
+
+def current_substring_index(twitterverse_dict, field):
+    """ (dict of {str: dict of {str: object}}, str) -> SubstringIndex or \
+    NoneType
+
+    Return the SubstringIndex of field for twitterverse_dict if it has
+    already been built and is up to date, without building it.
+
+    >>> twitter_data = {\
+    'a':{'name':'anna', 'location':'', 'web':'', 'bio':'', 'following':[]}}
+    >>> current_substring_index(twitter_data, 'name') is None
+    True
+    """
+
+    indexes = getattr(twitterverse_dict, "substring_indexes", None)
+    if indexes is None or indexes[0] != twitterverse_dict.version:
+        return (None)
+    return (indexes[1].get(field))
+
+
+def substring_index_for(twitterverse_dict, field, usernames):
+    """ (dict of {str: dict of {str: object}}, str, list of str) -> \
+    SubstringIndex or NoneType
+
+    Return the SubstringIndex of field to filter usernames with: the one
+    twitterverse_dict already has, or a new one if usernames are at least
+    INDEX_MIN_SHARE of its users. Return None if scanning usernames is
+    cheaper than building an index.
+    """
+
+    index = current_substring_index(twitterverse_dict, field)
+    if index is None and \
+            len(usernames) >= INDEX_MIN_SHARE * len(twitterverse_dict):
+        index = get_substring_index(twitterverse_dict, field)
+    return (index)
+
+
+def build_substring_indexes(twitterverse_dict):
+    """ (dict of {str: dict of {str: object}}) -> NoneType
+
+    Build the SubstringIndex of every indexed field of twitterverse_dict
+    now, for a Twitterverse that will answer many queries.
+    """
+
+    for field in INDEXED_FIELDS:
+        get_substring_index(twitterverse_dict, field)
+
+
+def update_substring_indexes(twitterverse_dict, usernames):
+    """ (dict of {str: dict of {str: object}}, list of str) -> NoneType
+
+    Bring the substring indexes of twitterverse_dict up to its current
+    version, after only the users in usernames were added, changed or
+    deleted since the version before it. Indexes older than that are
+    dropped instead.
+    """
+
+    indexes = getattr(twitterverse_dict, "substring_indexes", None)
+    if indexes is None:
+        return
+    version = twitterverse_dict.version
+    if indexes[0] != version - 1:
+        del twitterverse_dict.substring_indexes
+        return
+    for index in indexes[1].values():
+        for username in usernames:
+            if username in twitterverse_dict:
+                index.update_user(username,
+                                  twitterverse_dict[username][index.field])
+            else:
+                index.update_user(username, None)
+    twitterverse_dict.substring_indexes = (version, indexes[1])
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
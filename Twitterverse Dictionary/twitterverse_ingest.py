@@ -0,0 +1,176 @@
+"""
+Parallel loading of large Twitterverse data files.
+
+process_data reads a data file one line at a time on one core. For large
+files, process_data_parallel splits the file into byte ranges that each end
+just after an END line, parses the ranges in a process pool, and merges the
+users in file order, so the result is the same Twitterverse (with the same
+insertion order) that process_data returns.
+
+An END line is usually the end of a record, but it can also be a line of a
+bio. Every worker therefore reports whether its range ended exactly at the
+end of a record. If a range did not, the range after it began in the middle
+of a record; those two ranges are parsed again as one, so a badly placed
+split only costs time.
+"""
+
+import gc
+import io
+import multiprocessing
+import os
+
+import twitterverse_functions as tf
+from twitterverse_metrics import instrument
+from twitterverse_user import User
+
+# The least number of bytes worth handing to a worker as one range.
+MIN_RANGE_SIZE = 1 << 20
+# Ranges per worker, so that workers that finish early can take more.
+RANGES_PER_PROCESS = 4
+
+
+def find_ranges(data_filename, range_count):
+    """ (str, int) -> list of (int, int)
+
+    Return up to range_count (start, end) byte ranges that cover the file
+    data_filename in order, where each range but the last ends just after a
+    line that is END once stripped.
+    """
+
+    size = os.path.getsize(data_filename)
+    ranges = []
+    data_file = open(data_filename, "rb")
+    start = 0
+    for range_number in range(1, range_count):
+        # Skip the rest of the line the seek lands in.
+        data_file.seek(max(start, size * range_number // range_count))
+        data_file.readline()
+        line = data_file.readline()
+        while line != b"" and line.strip() != b"END":
+            line = data_file.readline()
+        end = data_file.tell()
+        if line == b"" or end >= size:
+            break
+        ranges.append((start, end))
+        start = end
+    data_file.close()
+    ranges.append((start, size))
+    return (ranges)
+
+
+def _tracked(lines, state):
+    """ (iterator of str, dict of {str: bool}) -> generator of str
+
+    Yield the lines, and set state["exhausted"] once a line past the last is
+    asked for.
+    """
+
+    yield from lines
+    state["exhausted"] = True
+
+
+def parse_range(data_filename, start, end, encoding=None):
+    """ (str, int, int, str) -> (list of (str, dict of {str: object}), bool, \
+bool)
+
+    Parse the users in bytes start to end of data_filename, read as text in
+    encoding (the default of open when None). Return the (username, user
+    dictionary) pairs in file order, whether the last record ended with its
+    END line, and whether a blank username line stopped the parse, as it
+    stops process_data.
+    """
+
+    data_file = open(data_filename, "rb")
+    data_file.seek(start)
+    text = data_file.read(end - start)
+    data_file.close()
+    state = {"exhausted": False}
+    lines = _tracked(tf.iter_lines(io.TextIOWrapper(io.BytesIO(text),
+                                                    encoding)), state)
+    users = []
+    for username in lines:
+        if username == "":
+            return (users, True, True)
+        user = tf.read_user(lines)
+        users.append((username, user))
+        if state["exhausted"]:
+            # The record ran out of lines before its END line.
+            return (users, False, False)
+    return (users, True, False)
+
+
+def _parse_range(arguments):
+    """ (tuple) -> (list of (str, dict of {str: object}), bool, bool)
+
+    Call parse_range with arguments, for Pool.imap.
+    """
+
+    return (parse_range(*arguments))
+
+
+@instrument("process_data_parallel", lambda arguments, result:
+            {"users_loaded": len(result)})
+def process_data_parallel(data_filename, processes=None, encoding=None,
+                          records=False):
+    """ (str, int, str, bool) -> Twitterverse
+
+    Return the same Twitterverse that process_data returns for the file
+    data_filename and records, parsing it on processes worker processes (by
+    default one per CPU).
+    """
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    size = os.path.getsize(data_filename)
+    range_count = min(processes * RANGES_PER_PROCESS,
+                      max(1, size // MIN_RANGE_SIZE))
+    ranges = find_ranges(data_filename, range_count)
+    if len(ranges) == 1 or processes == 1:
+        data_file = open(data_filename, "r", encoding=encoding)
+        data = tf.process_data(data_file, records)
+        data_file.close()
+        return (data)
+
+    users = []
+    pool = multiprocessing.Pool(processes)
+    # Unpickling the users and building the graph make millions of objects
+    # but no reference cycles, so the cyclic collector's passes over them
+    # would only cost time.
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        parsed_ranges = pool.imap(_parse_range,
+                                  [(data_filename, start, end, encoding)
+                                   for start, end in ranges])
+        redo_start = None
+        for (start, end), (range_users, complete, stopped) in \
+                zip(ranges, parsed_ranges):
+            if redo_start is not None:
+                # This range began inside a record: parse it again together
+                # with the range before it.
+                range_users, complete, stopped = parse_range(
+                    data_filename, redo_start, end, encoding)
+                start = redo_start
+                redo_start = None
+            if stopped:
+                users.extend(range_users)
+                break
+            if not complete and end != size:
+                redo_start = start
+                continue
+            users.extend(range_users)
+        if records:
+            users = [(username, User.from_dict(user))
+                     for username, user in users]
+        data = tf.Twitterverse(users)
+    finally:
+        if collecting:
+            gc.enable()
+        pool.terminate()
+        pool.join()
+    return (data)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
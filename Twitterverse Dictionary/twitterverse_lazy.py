@@ -0,0 +1,211 @@
+"""
+Lazy loading of the web and bio fields of a Twitterverse.
+
+Only format_long ever reads a user's web and bio, yet bios make up most of
+the bytes of a data file. process_data_lazy keeps each user's name, location
+and following list in memory like process_data does, but only records where
+the user's web line starts in the data file. The web and bio are read back
+from the file when they are asked for, so short-format, filtering and
+popularity queries never hold bio text in memory.
+
+The data file must not change while a lazily loaded Twitterverse is in use.
+Its lines must end with a newline or a carriage return and newline, and its
+encoding must write newlines as the byte 10, as UTF-8 and Latin-1 do.
+"""
+
+import locale
+import os
+import sys
+import threading
+
+import twitterverse_functions as tf
+from twitterverse_metrics import instrument
+from twitterverse_user import User
+
+# Bytes read at a time when reading a user's web and bio back.
+FIELD_READ_SIZE = 4096
+
+
+class LazySource:
+    """ A data file that user records read their web and bio back from. """
+
+    def __init__(self, data_filename, encoding=None):
+        """ (LazySource, str, str) -> NoneType
+
+        Open data_filename, which is in encoding (the default of open when
+        None), for reading fields back.
+        """
+
+        self.data_filename = data_filename
+        self.encoding = encoding or locale.getpreferredencoding(False)
+        self._file = open(data_filename, "rb")
+        self._lock = threading.Lock()
+        # The last (offset, web, bio) read, since format_long asks for web
+        # and then straight away for bio.
+        self._last = (None, None, None)
+
+    def read_bytes(self, offset, size):
+        """ (LazySource, int, int) -> bytes
+
+        Return up to size bytes of the data file, starting at offset.
+        """
+
+        if hasattr(os, "pread"):
+            # pread does not move a file position shared with other threads,
+            # or with forked worker processes.
+            return (os.pread(self._file.fileno(), size, offset))
+        with self._lock:
+            self._file.seek(offset)
+            return (self._file.read(size))
+
+    def read_fields(self, offset):
+        """ (LazySource, int) -> (str, str)
+
+        Return the web and bio of the user whose web line starts at offset,
+        as read_user would read them.
+        """
+
+        last_offset, web, bio = self._last
+        if last_offset == offset:
+            return (web, bio)
+        size = FIELD_READ_SIZE
+        while True:
+            data = self.read_bytes(offset, size)
+            at_end = len(data) < size
+            lines = data.split(b"\n")
+            if not at_end or lines[-1] == b"":
+                # The last piece is cut short by the read, or is empty
+                # because the file ends with a newline.
+                lines.pop()
+            fields = []
+            for line in lines:
+                line = line.decode(self.encoding).strip()
+                if line == "ENDBIO" and len(fields) > 0:
+                    break
+                fields.append(line)
+            else:
+                if not at_end:
+                    size = size * 2
+                    continue
+            break
+        web = ""
+        if fields != []:
+            web = fields.pop(0)
+        bio = "\n".join(fields)
+        self._last = (offset, web, bio)
+        return (web, bio)
+
+    def __reduce__(self):
+        """ (LazySource) -> tuple
+
+        Pickle a LazySource as its file name, reopening it when unpickled.
+        """
+
+        return (LazySource, (self.data_filename, self.encoding))
+
+
+class LazyUser(User):
+    """ A user record that keeps its web and bio in the data file until
+    they are asked for.
+
+    The web and bio attributes are None while the fields are on disk, so
+    read them as user["web"] and user["bio"]. Setting web or bio (as
+    update_user does) keeps the new value in memory from then on.
+    """
+
+    __slots__ = ("_source", "_offset")
+
+    def __init__(self, name, location, following, source, offset):
+        """ (LazyUser, str, str, list of str, LazySource, int) -> NoneType
+
+        Make a user whose web line starts at offset in source.
+        """
+
+        User.__init__(self, name, location, None, None, following)
+        self._source = source
+        self._offset = offset
+
+    def __getitem__(self, key):
+        """ (LazyUser, str) -> object
+
+        Return the value of field key of this user, as it would be in a
+        Twitterverse dictionary.
+        """
+
+        value = User.__getitem__(self, key)
+        if value is None:
+            if key == "web":
+                return (self._source.read_fields(self._offset)[0])
+            if key == "bio":
+                return (self._source.read_fields(self._offset)[1])
+        return (value)
+
+
+def is_line(line, word, encoding):
+    """ (bytes, str, str) -> bool
+
+    Return whether line, once decoded from encoding and stripped, is word.
+
+    >>> is_line(b" ENDBIO\\r", "ENDBIO", "utf-8")
+    True
+    >>> is_line(b"END", "ENDBIO", "utf-8")
+    False
+    """
+
+    return (line.decode(encoding).strip() == word)
+
+
+def iter_lazy_users(data_file, source):
+    """ (file open for reading in binary mode, LazySource) -> \
+generator of (str, LazyUser)
+
+    Yield a (username, LazyUser) pair for each person in data_file, in file
+    order, as iter_users does, without decoding any bio.
+    """
+
+    encoding = source.encoding
+    endbio = "ENDBIO".encode(encoding)
+    end = "END".encode(encoding)
+    for line in data_file:
+        username = sys.intern(line.decode(encoding).strip())
+        if username == "":
+            return
+        name = data_file.readline().decode(encoding).strip()
+        location = data_file.readline().decode(encoding).strip()
+        web_offset = data_file.tell()
+        data_file.readline()
+        for line in data_file:
+            if line.strip() == endbio or \
+                    (endbio in line and is_line(line, "ENDBIO", encoding)):
+                break
+        following = []
+        for line in data_file:
+            stripped = line.strip()
+            if stripped == end or \
+                    (end in line and is_line(line, "END", encoding)):
+                break
+            following.append(sys.intern(stripped.decode(encoding).strip()))
+        yield (username, LazyUser(name, location, following, source,
+                                  web_offset))
+
+
+@instrument("process_data_lazy", lambda arguments, result:
+            {"users_loaded": len(result)})
+def process_data_lazy(data_filename, encoding=None):
+    """ (str, str) -> Twitterverse
+
+    Return the Twitterverse that process_data returns for the file
+    data_filename, except that each user's web and bio stay in the file
+    until they are asked for.
+    """
+
+    source = LazySource(data_filename, encoding)
+    data_file = open(data_filename, "rb")
+    data = tf.Twitterverse(iter_lazy_users(data_file, source))
+    data_file.close()
+    return (data)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
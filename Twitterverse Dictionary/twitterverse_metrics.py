@@ -0,0 +1,190 @@
+"""
+Optional instrumentation of the Twitterverse functions.
+
+The hot functions in twitterverse_functions are wrapped with instrument.
+While no Metrics object is collecting, the wrappers only check one global
+and call straight through. Inside a collecting block they record, per stage,
+the number of calls, the wall time spent, and counters such as how many
+users were scanned or kept and how many comparisons a sort made.
+
+    with collecting() as metrics:
+        ...
+    print(metrics.to_json())
+
+Worker processes collect into Metrics objects of their own, which the
+parent adds to its totals with merge.
+"""
+
+import contextlib
+import functools
+import json
+import time
+
+# The Metrics object currently collecting, or None.
+_active = None
+
+
+class Metrics:
+    """ Calls, wall time and counters recorded for each stage. """
+
+    def __init__(self):
+        """ (Metrics) -> NoneType """
+
+        self.stages = {}
+
+    def record(self, stage, seconds=None, calls=1, **counts):
+        """ (Metrics, str, float, int, **int) -> NoneType
+
+        Add calls, seconds and each of counts to the totals of stage.
+
+        >>> metrics = Metrics()
+        >>> metrics.record("sort", 0.5, users_sorted=3)
+        >>> metrics.record("sort", 0.25, users_sorted=2)
+        >>> metrics.stages["sort"]
+        {'calls': 2, 'seconds': 0.75, 'users_sorted': 5}
+        """
+
+        totals = self.stages.get(stage)
+        if totals is None:
+            totals = {"calls": 0, "seconds": 0.0}
+            self.stages[stage] = totals
+        totals["calls"] = totals["calls"] + calls
+        if seconds is not None:
+            totals["seconds"] = totals["seconds"] + seconds
+        for name in counts:
+            totals[name] = totals.get(name, 0) + counts[name]
+
+    def merge(self, stages):
+        """ (Metrics, dict of {str: dict of {str: object}}) -> NoneType
+
+        Add the totals of every stage in stages, such as those another
+        process returned from to_dict, to the totals of this Metrics.
+
+        >>> metrics = Metrics()
+        >>> metrics.record("sort", 0.5, users_sorted=3)
+        >>> metrics.merge({"sort": {"calls": 2, "seconds": 0.25, \
+"users_sorted": 1}})
+        >>> metrics.stages["sort"]
+        {'calls': 3, 'seconds': 0.75, 'users_sorted': 4}
+        """
+
+        for stage, totals in stages.items():
+            counts = dict(totals)
+            calls = counts.pop("calls")
+            seconds = counts.pop("seconds")
+            self.record(stage, seconds, calls, **counts)
+
+    def to_dict(self):
+        """ (Metrics) -> dict of {str: dict of {str: object}}
+
+        Return a copy of the totals of every stage.
+        """
+
+        return ({stage: dict(totals) for stage, totals in self.stages.items()})
+
+    def to_json(self):
+        """ (Metrics) -> str
+
+        Return the totals of every stage as JSON.
+        """
+
+        return (json.dumps(self.to_dict(), indent=1, sort_keys=True))
+
+
+def active():
+    """ () -> Metrics or NoneType
+
+    Return the Metrics object currently collecting, or None.
+    """
+
+    return (_active)
+
+
+def start(metrics=None):
+    """ (Metrics) -> Metrics
+
+    Start collecting into metrics (a new Metrics object by default) and
+    return it.
+    """
+
+    global _active
+    if metrics is None:
+        metrics = Metrics()
+    _active = metrics
+    return (metrics)
+
+
+def stop():
+    """ () -> NoneType
+
+    Stop collecting.
+    """
+
+    global _active
+    _active = None
+
+
+@contextlib.contextmanager
+def collecting(metrics=None):
+    """ (Metrics) -> context manager of Metrics
+
+    Collect into metrics (a new Metrics object by default) inside a with
+    block, and stop collecting when the block ends.
+    """
+
+    previous = _active
+    metrics = start(metrics)
+    try:
+        yield metrics
+    finally:
+        if previous is not None:
+            start(previous)
+        else:
+            stop()
+
+
+def instrument(stage, count=None):
+    """ (str, function) -> function
+
+    Return a decorator that records calls to a function under stage while
+    collecting. count, if given, is called with the function's arguments
+    and result and returns a dict of counters to record.
+    """
+
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*arguments, **keywords):
+            metrics = _active
+            if metrics is None:
+                return (function(*arguments, **keywords))
+            start_time = time.perf_counter()
+            result = function(*arguments, **keywords)
+            seconds = time.perf_counter() - start_time
+            if count is None:
+                metrics.record(stage, seconds)
+            else:
+                metrics.record(stage, seconds, **count(arguments, result))
+            return (result)
+        return (wrapper)
+    return (decorate)
+
+
+class CountingKey:
+    """ A sort key wrapper that counts the comparisons a sort makes. """
+
+    __slots__ = ("key", "counter")
+
+    def __init__(self, key, counter):
+        """ (CountingKey, object, list of int) -> NoneType
+
+        Wrap key; counter is a one-element list holding the running count.
+        """
+
+        self.key = key
+        self.counter = counter
+
+    def __lt__(self, other):
+        """ (CountingKey, CountingKey) -> bool """
+
+        self.counter[0] = self.counter[0] + 1
+        return (self.key < other.key)
@@ -0,0 +1,249 @@
+"""
+An optional NumPy backend for popularity sorting and filtering.
+
+Sorting by popularity and the following and follower filters otherwise loop
+over users one at a time in Python. When NumPy is installed and the backend
+is enabled, DegreeArrays holds the follow edges of a Twitterverse as int32
+source and target arrays, counts the followers and following of every user
+at once with bincount, and applies filters to the ids of the usernames being
+filtered with numpy.isin over the followers or following of the filter's
+username, so a popularity sort of millions of users takes seconds and a
+filter costs time in the number of usernames being filtered. Substring
+filters still go through the trigram indexes of twitterverse_index.
+
+The backend is off until enable is called, because its arrays are rebuilt
+from scratch for every new version of a Twitterverse, which would be wasted
+work while deltas are being applied one at a time. Without NumPy, enable
+returns False and every function in twitterverse_functions keeps using its
+pure Python path.
+
+    import twitterverse_numpy
+    twitterverse_numpy.enable()
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Whether get_degree_arrays hands out DegreeArrays.
+_enabled = False
+
+
+def enable():
+    """ () -> bool
+
+    Use the NumPy backend from now on, if NumPy is installed, and return
+    whether it is.
+    """
+
+    global _enabled
+    _enabled = numpy is not None
+    return (_enabled)
+
+
+def disable():
+    """ () -> NoneType
+
+    Stop using the NumPy backend.
+    """
+
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    """ () -> bool
+
+    Return whether the NumPy backend is in use.
+    """
+
+    return (_enabled)
+
+
+class DegreeArrays:
+    """ The follow edges of a Twitterverse as NumPy arrays.
+
+    Every username in the Twitterverse, including usernames that are only
+    followed, has an id; users come first, in dictionary order. Each user
+    counts once as a follower of a username even if their following list
+    names it twice, as in TwitterverseGraph.
+    """
+
+    def __init__(self, twitterverse_dict):
+        """ (DegreeArrays, dict of {str: dict of {str: object}}) -> NoneType
+
+        Build the arrays of twitterverse_dict, which must not change while
+        they are in use.
+        """
+
+        self._twitterverse_dict = twitterverse_dict
+        if hasattr(twitterverse_dict, "following_targets"):
+            self._load_compact(twitterverse_dict)
+        else:
+            self._load_users(twitterverse_dict)
+        user_total = len(self.usernames)
+        self.follower_counts = numpy.bincount(self.targets,
+                                              minlength=user_total)
+        self.following_counts = numpy.bincount(self.sources,
+                                               minlength=user_total)
+        # The sources are grouped by source already; grouping the edges by
+        # target as well gives the followers of each id as one slice.
+        self._by_target = self.sources[numpy.argsort(self.targets,
+                                                     kind="stable")]
+        self._target_offsets = numpy.concatenate(
+            ([0], numpy.cumsum(self.follower_counts)))
+        self._source_offsets = numpy.concatenate(
+            ([0], numpy.cumsum(self.following_counts)))
+        # Each id's position in username order, to break popularity ties.
+        self.ranks = numpy.empty(user_total, numpy.int32)
+        self.ranks[sorted(range(user_total),
+                          key=self.usernames.__getitem__)] = \
+            numpy.arange(user_total, dtype=numpy.int32)
+
+    def _load_users(self, twitterverse_dict):
+        """ (DegreeArrays, dict of {str: dict of {str: object}}) -> NoneType
+
+        Number the usernames of twitterverse_dict and collect its edges.
+        """
+
+        usernames = list(twitterverse_dict)
+        ids = {username: i for i, username in enumerate(usernames)}
+        sources = []
+        targets = []
+        for source, username in enumerate(twitterverse_dict):
+            for followed in dict.fromkeys(
+                    twitterverse_dict[username]["following"]):
+                target = ids.get(followed)
+                if target is None:
+                    target = len(usernames)
+                    ids[followed] = target
+                    usernames.append(followed)
+                sources.append(source)
+                targets.append(target)
+        self.usernames = usernames
+        self.user_count = len(twitterverse_dict)
+        self.ids = ids
+        self.sources = numpy.array(sources, dtype=numpy.int32)
+        self.targets = numpy.array(targets, dtype=numpy.int32)
+
+    def _load_compact(self, compact):
+        """ (DegreeArrays, CompactTwitterverse) -> NoneType
+
+        Take the ids and edges of compact, dropping repeated edges.
+        """
+
+        self.usernames = list(compact.usernames)
+        self.user_count = compact.user_count
+        self.ids = {username: i for i, username in enumerate(self.usernames)}
+        offsets = numpy.asarray(compact.following_offsets, dtype=numpy.int64)
+        targets = numpy.asarray(compact.following_targets,
+                                dtype=numpy.int64)
+        sources = numpy.repeat(numpy.arange(compact.user_count,
+                                            dtype=numpy.int64),
+                               numpy.diff(offsets))
+        edges = numpy.unique(sources * len(self.usernames) + targets)
+        self.sources = (edges // len(self.usernames)).astype(numpy.int32)
+        self.targets = (edges % len(self.usernames)).astype(numpy.int32)
+
+    def candidate_ids(self, usernames):
+        """ (DegreeArrays, list of str) -> numpy array of int
+
+        Return the ids of usernames, with len(self.usernames) standing for
+        usernames that do not appear in the Twitterverse at all.
+        """
+
+        unknown = len(self.usernames)
+        ids = self.ids
+        return (numpy.fromiter((ids.get(username, unknown)
+                                for username in usernames),
+                               numpy.int64, len(usernames)))
+
+    def sort_by_popularity(self, usernames):
+        """ (DegreeArrays, list of str) -> list of str or NoneType
+
+        Return usernames sorted as more_popular sorts them: most followers
+        first, then by username. Return None if a username does not appear
+        in the Twitterverse, since it has no precomputed rank.
+        """
+
+        candidates = self.candidate_ids(usernames)
+        if len(candidates) > 0 and candidates.max() >= len(self.usernames):
+            return (None)
+        order = numpy.lexsort((self.ranks[candidates],
+                               -self.follower_counts[candidates]))
+        return ([usernames[i] for i in order.tolist()])
+
+    def _includes(self, candidates, keep, field, value):
+        """ (DegreeArrays, numpy array of int, numpy array of bool, str, \
+        str) -> numpy array of bool
+
+        Return which of the candidates that keep still holds are users whose
+        field contains value, ignoring case. Only those users' fields are
+        lowered and searched.
+        """
+
+        checked = numpy.flatnonzero(keep & (candidates < self.user_count))
+        matches = numpy.zeros(len(candidates), bool)
+        if len(checked) == 0:
+            return (matches)
+        users = self._twitterverse_dict
+        usernames = self.usernames
+        lowered = numpy.array([users[usernames[user_id]][field].lower()
+                               for user_id in candidates[checked].tolist()],
+                              dtype=str)
+        matches[checked] = numpy.char.find(lowered, value.lower()) >= 0
+        return (matches)
+
+    def filter(self, usernames, filter_spec_dict):
+        """ (DegreeArrays, list of str, dict of {str: str}) -> list of str
+
+        Return the usernames that pass every filter in filter_spec_dict, in
+        their order in usernames. Each filter costs time in the number of
+        usernames and the degree of the username it names, not in the size
+        of the Twitterverse.
+        """
+
+        candidates = self.candidate_ids(usernames)
+        keep = numpy.ones(len(candidates), bool)
+        for operation in filter_spec_dict:
+            value = filter_spec_dict[operation]
+            value_id = self.ids.get(value)
+            if operation in ("name-includes", "location-includes"):
+                keep &= self._includes(candidates, keep,
+                                       operation[:-len("-includes")], value)
+            elif value_id is None or \
+                    operation not in ("following", "follower"):
+                keep[:] = False
+            elif operation == "following":
+                # The candidates following value are among its followers.
+                keep &= numpy.isin(candidates, self._by_target[
+                    self._target_offsets[value_id]:
+                    self._target_offsets[value_id + 1]])
+            else:
+                # The candidates with value as a follower are among the
+                # usernames value follows.
+                keep &= numpy.isin(candidates, self.targets[
+                    self._source_offsets[value_id]:
+                    self._source_offsets[value_id + 1]])
+        return ([usernames[i] for i in numpy.flatnonzero(keep).tolist()])
+
+
+def get_degree_arrays(twitterverse_dict):
+    """ (dict of {str: dict of {str: object}}) -> DegreeArrays or NoneType
+
+    Return the DegreeArrays of twitterverse_dict, building them if they are
+    missing or out of date. Return None if the backend is not enabled, or
+    for a Twitterverse without a version attribute, such as a plain dict.
+    """
+
+    if not _enabled:
+        return (None)
+    version = getattr(twitterverse_dict, "version", None)
+    if version is None:
+        return (None)
+    arrays = getattr(twitterverse_dict, "degree_arrays", None)
+    if arrays is None or arrays[0] != version:
+        arrays = (version, DegreeArrays(twitterverse_dict))
+        twitterverse_dict.degree_arrays = arrays
+    return (arrays[1])
@@ -0,0 +1,199 @@
+"""
+Parallel execution of Twitterverse queries over a process pool.
+
+Every worker needs the Twitterverse, but pickling it to each worker would
+cost as much as loading it again. A ParallelQueryExecutor therefore never
+sends the Twitterverse to its workers:
+    - where the fork start method is available, the Twitterverse is put in a
+      module global just before the pool is created, and the forked workers
+      read it through copy-on-write memory;
+    - otherwise each worker loads data_filename itself; for a binary
+      Twitterverse file (see twitterverse_binary) the workers all map the
+      same file, so they share its pages through the operating system.
+
+Only queries and presented results travel between processes, and results
+come back in the order the queries were submitted. While metrics are being
+collected (see twitterverse_metrics), each worker also sends back the
+metrics of its queries, which are merged into the collecting Metrics.
+
+shared_process_executor makes a concurrent.futures executor whose workers
+share a Twitterverse in the same way, for callers such as
+twitterverse_server that submit queries one at a time.
+"""
+
+import concurrent.futures
+import multiprocessing
+
+import twitterverse_functions as tf
+import twitterverse_binary as tb
+import twitterverse_index as ti
+import twitterverse_metrics as tm
+
+# Number of queries sent to a worker at a time.
+DEFAULT_CHUNK_SIZE = 16
+
+# The Twitterverse that workers answer queries against.
+_shared_data = None
+
+
+def load_shared_data(data_filename):
+    """ (str) -> NoneType
+
+    Load data_filename as the Twitterverse of this worker process.
+    """
+
+    global _shared_data
+    _shared_data = tb.load_twitterverse(data_filename)
+    ti.build_substring_indexes(_shared_data)
+
+
+def answer_query(data, query):
+    """ (Twitterverse dictionary, Query dictionary) -> str
+
+    Return the presented results of query against data.
+    """
+
+    search_results = tf.get_search_results(data, query["search"])
+    filtered_results = tf.get_filter_results(data, search_results,
+                                             query["filter"])
+    return (tf.get_present_string(data, filtered_results, query["present"]))
+
+
+def answer_shared_query(query):
+    """ (Query dictionary) -> str
+
+    Return the presented results of query against this worker's Twitterverse.
+    """
+
+    return (answer_query(_shared_data, query))
+
+
+def answer_metered_query(query):
+    """ (Query dictionary) -> (str, dict of {str: dict of {str: object}})
+
+    Return the presented results of query against this worker's
+    Twitterverse, and the metrics recorded while answering it.
+    """
+
+    with tm.collecting() as metrics:
+        result = answer_shared_query(query)
+    return ((result, metrics.to_dict()))
+
+
+def _merged(metrics, metered_results):
+    """ (Metrics, iterable of (str, dict of {str: dict of {str: object}})) \
+    -> generator of str
+
+    Yield each presented result of metered_results, merging its metrics
+    into metrics.
+    """
+
+    for result, stages in metered_results:
+        metrics.merge(stages)
+        yield (result)
+
+
+def shared_process_executor(data, data_filename, processes=None):
+    """ (Twitterverse dictionary, str, int) -> ProcessPoolExecutor
+
+    Return a ProcessPoolExecutor with processes workers (by default one per
+    CPU) that run answer_shared_query against data. Where fork is available
+    the workers inherit data through fork; since the executor only forks
+    them once it is first used, data stays in the module global of this
+    process. Otherwise each worker loads data_filename.
+    """
+
+    global _shared_data
+    if "fork" in multiprocessing.get_all_start_methods():
+        _shared_data = data
+        return (concurrent.futures.ProcessPoolExecutor(
+            processes, mp_context=multiprocessing.get_context("fork")))
+    return (concurrent.futures.ProcessPoolExecutor(
+        processes, initializer=load_shared_data, initargs=(data_filename,)))
+
+
+class ParallelQueryExecutor:
+    """ A pool of worker processes that answer queries against one shared,
+    read-only Twitterverse.
+
+    Use it as a context manager, or call close when done:
+
+        with ParallelQueryExecutor(data) as executor:
+            results = executor.map(queries)
+    """
+
+    def __init__(self, data=None, data_filename=None, processes=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE):
+        """ (ParallelQueryExecutor, Twitterverse dictionary, str, int, int) \
+        -> NoneType
+
+        Start processes workers (by default one per CPU). The workers share
+        data through fork where possible; data_filename is loaded by each
+        worker instead when fork is unavailable or data is not given.
+        """
+
+        global _shared_data
+        if data is None and data_filename is None:
+            raise ValueError("either data or data_filename must be given")
+        self.chunk_size = chunk_size
+        if data is not None and \
+                "fork" in multiprocessing.get_all_start_methods():
+            _shared_data = data
+            try:
+                self._pool = multiprocessing.get_context("fork").Pool(
+                    processes)
+            finally:
+                # The workers already have their copy of the global.
+                _shared_data = None
+        elif data_filename is not None:
+            self._pool = multiprocessing.Pool(
+                processes, initializer=load_shared_data,
+                initargs=(data_filename,))
+        else:
+            raise ValueError("data_filename is needed where processes "
+                             "cannot be forked")
+
+    def map(self, queries):
+        """ (ParallelQueryExecutor, iterable of Query dictionary) -> \
+        list of str
+
+        Return the presented results of all queries, in order.
+        """
+
+        return (list(self.imap(queries)))
+
+    def imap(self, queries):
+        """ (ParallelQueryExecutor, iterable of Query dictionary) -> \
+        iterator of str
+
+        Return an iterator over the presented results of queries, in order,
+        that yields each result as soon as it and all earlier ones are done.
+        While metrics are being collected, the metrics of the workers are
+        merged into them.
+        """
+
+        metrics = tm.active()
+        if metrics is None:
+            return (self._pool.imap(answer_shared_query, queries,
+                                    self.chunk_size))
+        return (_merged(metrics, self._pool.imap(answer_metered_query,
+                                                 queries, self.chunk_size)))
+
+    def close(self):
+        """ (ParallelQueryExecutor) -> NoneType
+
+        Stop the workers once they have finished their queries.
+        """
+
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self):
+        """ (ParallelQueryExecutor) -> ParallelQueryExecutor """
+
+        return (self)
+
+    def __exit__(self, exception_type, exception, traceback):
+        """ (ParallelQueryExecutor, type, Exception, traceback) -> NoneType """
+
+        self.close()
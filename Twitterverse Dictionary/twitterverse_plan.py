@@ -0,0 +1,363 @@
+"""
+Compiled query plans.
+
+A query dictionary names its operations as strings, which the search, filter
+and present functions look up again on every call, and a mistake such as an
+unknown filter only shows up as an empty or missing result. compile_query
+checks a query dictionary once and turns it into a QueryPlan whose stages
+are bound to the functions that carry them out. A plan can be executed any
+number of times, against any Twitterverse, and gives the same results as
+get_search_results, get_filter_results and get_present_string would.
+
+QueryPlan.explain describes the stages of a plan, with the number of users
+each stage is expected to produce when a Twitterverse is given. The
+estimates come from follower and following counts, average degrees and any
+substring indexes already built, without running the search.
+
+    plan = compile_query(query, twitterverse)
+    print(plan.explain(twitterverse))
+    print(plan.present(twitterverse))
+"""
+
+import functools
+
+import twitterverse_functions as tf
+from twitterverse_hops import parse_operation
+from twitterverse_recommend import parse_recommend
+from twitterverse_popularity import parse_most_followed
+
+# The comparison function each named sort order stands for.
+SORT_FUNCTIONS = {"username": tf.username_first, "name": tf.name_first,
+                  "popularity": tf.more_popular}
+FILTER_OPERATIONS = ("following", "follower", "name-includes",
+                     "location-includes")
+FORMATS = ("short", "long")
+
+
+def _search_step(twitterverse_dict, usernames, operation):
+    """ (dict of {str: dict of {str: object}}, list of str, str) -> \
+    list of str
+
+    Return the usernames that one following or followers step reaches from
+    usernames, without duplicates, as get_search_results does.
+    """
+
+    return (list(dict.fromkeys(tf.search_usernames(twitterverse_dict,
+                                                   usernames, operation))))
+
+
+def _average_degree(twitterverse_dict):
+    """ (dict of {str: dict of {str: object}}) -> float
+
+    Return the average number of usernames each user is following.
+    """
+
+    if len(twitterverse_dict) == 0:
+        return (0.0)
+    if hasattr(twitterverse_dict, "following_targets"):
+        edge_count = len(twitterverse_dict.following_targets)
+    else:
+        edge_count = 0
+        for user in twitterverse_dict.values():
+            edge_count = edge_count + len(user["following"])
+    return (edge_count / len(twitterverse_dict))
+
+
+class QueryPlan:
+    """ A checked query, ready to be executed.
+
+    The search stages are (description, function) pairs applied in order,
+    and each filter operation is bound to a function; both kinds of function
+    take a Twitterverse dictionary and a list of usernames and return a new
+    list. Filters run in the order plan_filters chooses for the users they
+    are given, which does not change the result.
+
+    >>> twitter_data = tf.Twitterverse({\
+    'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b', 'c']}, \
+    'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':[]}, \
+    'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', 'following':['b']}})
+    >>> plan = compile_query({'search': {'username': 'a', \
+'operations': ['following']}, 'filter': {'name-includes': 'e'}, \
+'present': {'sort-by': 'name', 'format': 'short'}})
+    >>> plan.execute(twitter_data)
+    ['b']
+    >>> plan.present(twitter_data)
+    "['b']"
+    """
+
+    def __init__(self, username, search_stages, filter_spec_dict, filters,
+                 present_spec_dict, sort_name):
+        """ (QueryPlan, str, list of (str, function), dict of {str: str}, \
+        dict of {str: function}, dict of {str: object}, str) -> NoneType
+
+        Make a plan that starts at username. present_spec_dict has the
+        comparison function to sort with under "sort-by", and sort_name is
+        how the query named it.
+        """
+
+        self.username = username
+        self.search_stages = search_stages
+        self.filter_spec_dict = filter_spec_dict
+        self.filters = filters
+        self.present_spec_dict = present_spec_dict
+        self.sort_name = sort_name
+
+    def search(self, twitterverse_dict):
+        """ (QueryPlan, dict of {str: dict of {str: object}}) -> list of str
+
+        Return the results of the search stages of this plan.
+        """
+
+        usernames = [self.username]
+        for description, stage in self.search_stages:
+            usernames = stage(twitterverse_dict, usernames)
+        return (usernames)
+
+    def filter(self, twitterverse_dict, usernames):
+        """ (QueryPlan, dict of {str: dict of {str: object}}, list of str) \
+        -> list of str
+
+        Return the usernames that pass every filter of this plan.
+        """
+
+        if tf.get_degree_arrays(twitterverse_dict) is not None:
+            return (tf.get_filter_results(twitterverse_dict, usernames,
+                                          self.filter_spec_dict))
+        for operation in tf.plan_filters(twitterverse_dict, usernames,
+                                         self.filter_spec_dict):
+            if len(usernames) == 0:
+                break
+            usernames = self.filters[operation](twitterverse_dict, usernames)
+        return (usernames)
+
+    def execute(self, twitterverse_dict):
+        """ (QueryPlan, dict of {str: dict of {str: object}}) -> list of str
+
+        Return the usernames this plan presents from twitterverse_dict, in
+        presentation order.
+        """
+
+        usernames = self.filter(twitterverse_dict,
+                                self.search(twitterverse_dict))
+        tf.sort_by(twitterverse_dict, usernames, self.present_spec_dict)
+        return (usernames)
+
+    def present(self, twitterverse_dict):
+        """ (QueryPlan, dict of {str: dict of {str: object}}) -> str
+
+        Return the presented results of this plan against twitterverse_dict,
+        as get_present_string returns them.
+        """
+
+        return ("".join(self.iter_present_chunks(twitterverse_dict)))
+
+    def iter_present_chunks(self, twitterverse_dict):
+        """ (QueryPlan, dict of {str: dict of {str: object}}) -> \
+        generator of str
+
+        Yield, piece by piece, the text that present returns.
+        """
+
+        usernames = self.filter(twitterverse_dict,
+                                self.search(twitterverse_dict))
+        return (tf.iter_present_chunks(twitterverse_dict, usernames,
+                                       self.present_spec_dict))
+
+    def explain(self, twitterverse_dict=None):
+        """ (QueryPlan, dict of {str: dict of {str: object}}) -> str
+
+        Return one line for each stage of this plan, in the order they run,
+        with the number of users each stage is expected to produce if
+        twitterverse_dict is given.
+
+        >>> twitter_data = tf.Twitterverse({\
+        'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b', 'c']}, \
+        'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':[]}, \
+        'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', 'following':['b']}})
+        >>> plan = compile_query({'search': {'username': 'a', \
+'operations': ['following']}, 'filter': {'name-includes': 'e', \
+'follower': 'c'}, 'present': {'sort-by': 'name', 'format': 'short', \
+'limit': 5}})
+        >>> print(plan.explain(twitter_data))
+        search from a                            ~1 users
+        search following                         ~2 users
+        filter follower c                        ~1 users
+        filter name-includes e                   ~1 users
+        present sort-by name, format short, limit 5 ~1 users
+        """
+
+        descriptions = ["search from " + self.username]
+        descriptions.extend(["search " + description
+                             for description, stage in self.search_stages])
+        filter_order = list(self.filter_spec_dict)
+        if twitterverse_dict is not None:
+            estimates = self._estimate_search(twitterverse_dict)
+            # estimate_filter_size and plan_filters only look at how many
+            # usernames there are, so a range stands in for the results.
+            filter_order = tf.plan_filters(twitterverse_dict,
+                                           range(estimates[-1]),
+                                           self.filter_spec_dict)
+            for operation in filter_order:
+                estimates.append(tf.estimate_filter_size(
+                    twitterverse_dict, range(estimates[-1]), operation,
+                    self.filter_spec_dict[operation]))
+        descriptions.extend(["filter " + operation + " " +
+                             self.filter_spec_dict[operation]
+                             for operation in filter_order])
+        present = ("present sort-by " + self.sort_name + ", format " +
+                   self.present_spec_dict["format"])
+        limit = self.present_spec_dict.get("limit")
+        if limit is not None:
+            present = present + ", limit " + str(limit)
+        descriptions.append(present)
+        if twitterverse_dict is None:
+            return ("\n".join(descriptions))
+        if limit is not None:
+            estimates.append(min(limit, estimates[-1]))
+        else:
+            estimates.append(estimates[-1])
+        return ("\n".join(["{:<40} ~{} users".format(description, estimate)
+                           for description, estimate in
+                           zip(descriptions, estimates)]))
+
+    def _estimate_search(self, twitterverse_dict):
+        """ (QueryPlan, dict of {str: dict of {str: object}}) -> list of int
+
+        Return the expected number of users after the start and after each
+        search stage: the exact count for a step from the starting user, and
+        the average number of follows per user for every step after that.
+        """
+
+        user_count = len(twitterverse_dict)
+        degree = _average_degree(twitterverse_dict)
+        estimates = [1]
+        frontier = 1.0
+        exact = True
+        for description, stage in self.search_stages:
+            k = parse_recommend(description)
+            if k is not None:
+                # Each username brings at most k recommendations.
+                frontier = min(frontier * k, user_count)
+                exact = False
+                estimates.append(int(round(frontier)))
+                continue
+            n = parse_most_followed(description)
+            if n is not None:
+                frontier = min(n, user_count)
+                exact = False
+                estimates.append(int(round(frontier)))
+                continue
+            step, hops, cumulative = parse_operation(description) or \
+                (description, 1, False)
+            total = 0.0
+            for hop in range(hops):
+                if exact:
+                    frontier = float(self._first_step_size(twitterverse_dict,
+                                                           step))
+                    exact = False
+                else:
+                    frontier = frontier * degree
+                total = total + frontier
+            if cumulative:
+                frontier = total
+            frontier = min(frontier, user_count)
+            estimates.append(int(round(frontier)))
+        return (estimates)
+
+    def _first_step_size(self, twitterverse_dict, step):
+        """ (QueryPlan, dict of {str: dict of {str: object}}, str) -> int
+
+        Return how many usernames one step of kind step reaches from the
+        starting user.
+        """
+
+        if step == "following":
+            return (len(set(tf.followed_by(twitterverse_dict,
+                                           self.username))))
+        graph = tf.get_graph(twitterverse_dict)
+        if graph is not None:
+            return (graph.follower_count(self.username))
+        return (len(tf.all_followers(twitterverse_dict, self.username)))
+
+
+def compile_query(query_dict, twitterverse_dict=None):
+    """ (dict of {str: dict of {str: object}}, \
+    dict of {str: dict of {str: object}}) -> QueryPlan
+
+    Check query_dict and return its QueryPlan. Raise ValueError if the query
+    has no username, or names an unknown search operation, filter, sort order
+    or format, or a limit that is not a whole number, or, if
+    twitterverse_dict is given, starts at a username that is neither a user
+    in it nor followed by one.
+
+    >>> compile_query({'search': {'username': 'a', 'operations': []}, \
+'filter': {'bio-includes': 'x'}, \
+'present': {'sort-by': 'name', 'format': 'short'}})
+    Traceback (most recent call last):
+    ...
+    ValueError: unknown filter: bio-includes
+    >>> compile_query({'search': {'username': 'a', 'operations': []}, \
+'filter': {}, 'present': {'sort-by': 'name', 'format': 'short'}}, {})
+    Traceback (most recent call last):
+    ...
+    ValueError: unknown username: a
+    """
+
+    username = query_dict["search"]["username"]
+    if username == "":
+        raise ValueError("query has no username")
+    if twitterverse_dict is not None and username not in twitterverse_dict \
+            and len(tf.all_followers(twitterverse_dict, username)) == 0:
+        raise ValueError("unknown username: " + username)
+
+    search_stages = []
+    for operation in query_dict["search"]["operations"]:
+        if parse_recommend(operation) is not None:
+            search_stages.append((operation, functools.partial(
+                tf.search_recommend, operation=operation)))
+        elif parse_most_followed(operation) is not None:
+            search_stages.append((operation, functools.partial(
+                tf.search_most_followed, operation=operation)))
+        elif parse_operation(operation) is not None:
+            search_stages.append((operation, functools.partial(
+                tf.search_hops, operation=operation)))
+        elif operation in ("following", "followers"):
+            search_stages.append((operation, functools.partial(
+                _search_step, operation=operation)))
+        else:
+            raise ValueError("unknown search operation: " + operation)
+
+    filter_spec_dict = dict(query_dict["filter"])
+    filters = {}
+    for operation in filter_spec_dict:
+        if operation not in FILTER_OPERATIONS:
+            raise ValueError("unknown filter: " + operation)
+        filters[operation] = functools.partial(
+            tf.filter_usernames, operation=operation,
+            filter_spec_dict=filter_spec_dict)
+
+    present = query_dict["present"]
+    for name in present:
+        if name not in ("sort-by", "format", "limit"):
+            raise ValueError("unknown presentation line: " + name)
+    if "sort-by" not in present or "format" not in present:
+        raise ValueError("query needs sort-by and format lines")
+    sort_name = present["sort-by"]
+    if sort_name not in SORT_FUNCTIONS:
+        raise ValueError("unknown sort order: " + str(sort_name))
+    if present["format"] not in FORMATS:
+        raise ValueError("unknown format: " + present["format"])
+    present_spec_dict = {"sort-by": SORT_FUNCTIONS[sort_name],
+                         "format": present["format"]}
+    if "limit" in present:
+        limit = present["limit"]
+        if not isinstance(limit, int) or limit < 0:
+            raise ValueError("limit must be a whole number: " + str(limit))
+        present_spec_dict["limit"] = limit
+    return (QueryPlan(username, search_stages, filter_spec_dict, filters,
+                      present_spec_dict, sort_name))
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,326 @@
+"""
+Popularity index for Twitterverse graphs.
+
+Sorting by popularity orders users by follower count, most first, and then
+by username. A PopularityIndex keeps the sort key (-followers, username) of
+every username in a Twitterverse, and the usernames themselves in a group
+per follower count, with the counts that have a group in a sorted list.
+When a follow is added or removed only the followed username moves, from
+one group to the next.
+
+Each group is a SortedUsernames, which keeps its usernames in order in runs
+of at most a few thousand, so moving a username costs O(log G + RUN_SIZE)
+for a group of G usernames, and the first k usernames of a group are read
+off in O(k). The sort keys make a popularity sort one dictionary lookup per
+user, and the groups give the N most followed users in popularity order by
+reading them off from the highest count down, without looking at anyone
+else.
+
+A TwitterverseGraph builds its PopularityIndex the first time it is asked
+for one, and keeps it up to date from then on. Sorting a few results by
+popularity does not need the index, so it only uses one that is already
+built (see current_popularity_index).
+
+In a query, the search operation "most-followed*N" replaces the usernames
+found so far with the N most followed users of the whole Twitterverse, and
+"most-followed" with the DEFAULT_MOST_FOLLOWED most followed.
+"""
+
+import bisect
+import itertools
+
+DEFAULT_MOST_FOLLOWED = 10
+# The number of usernames a SortedUsernames run is split back down to.
+RUN_SIZE = 1024
+
+
+def parse_most_followed(operation):
+    """ (str) -> int or NoneType
+
+    Return how many users the search operation asks for, or None if it is
+    not a most-followed operation. Raise ValueError if it is not well formed.
+
+    >>> parse_most_followed("most-followed*5")
+    5
+    >>> parse_most_followed("most-followed")
+    10
+    >>> parse_most_followed("followers") is None
+    True
+    >>> parse_most_followed("most-followed*x")
+    Traceback (most recent call last):
+    ...
+    ValueError: not a most-followed operation: most-followed*x
+    """
+
+    if operation == "most-followed":
+        return (DEFAULT_MOST_FOLLOWED)
+    if not operation.startswith("most-followed*"):
+        return (None)
+    count = operation[len("most-followed*"):]
+    if not count.isdigit() or int(count) < 1:
+        raise ValueError("not a most-followed operation: " + operation)
+    return (int(count))
+
+
+class SortKeys(dict):
+    """ The popularity sort key of every username in a PopularityIndex.
+
+    A username that is not in the index has no followers, so its key is
+    (0, username).
+
+    >>> SortKeys()['a']
+    (0, 'a')
+    """
+
+    def __missing__(self, username):
+        """ (SortKeys, str) -> (int, str) """
+
+        return ((0, username))
+
+
+class SortedUsernames:
+    """ A set of usernames kept in sorted order, in runs of between one and
+    2 * RUN_SIZE usernames.
+
+    >>> group = SortedUsernames(['c', 'a'])
+    >>> group.add('b')
+    >>> group.remove('c')
+    >>> list(group), group.first(1), len(group)
+    (['a', 'b'], ['a'], 2)
+    """
+
+    def __init__(self, usernames=()):
+        """ (SortedUsernames, iterable of str) -> NoneType
+
+        Hold the usernames, which must all be different.
+        """
+
+        ordered = sorted(usernames)
+        self._runs = [ordered[start:start + RUN_SIZE]
+                      for start in range(0, len(ordered), RUN_SIZE)]
+        # The last username of each run, to find the run a username goes in.
+        self._lasts = [run[-1] for run in self._runs]
+        self._length = len(ordered)
+
+    def __len__(self):
+        """ (SortedUsernames) -> int """
+
+        return (self._length)
+
+    def __iter__(self):
+        """ (SortedUsernames) -> iterator of str """
+
+        return (itertools.chain.from_iterable(self._runs))
+
+    def add(self, username):
+        """ (SortedUsernames, str) -> NoneType
+
+        Add username, which must not already be here.
+        """
+
+        if len(self._runs) == 0:
+            self._runs.append([username])
+            self._lasts.append(username)
+        else:
+            position = bisect.bisect_left(self._lasts, username)
+            if position == len(self._runs):
+                position = position - 1
+                self._runs[position].append(username)
+                self._lasts[position] = username
+            else:
+                bisect.insort(self._runs[position], username)
+            run = self._runs[position]
+            if len(run) > 2 * RUN_SIZE:
+                self._runs[position:position + 1] = [run[:RUN_SIZE],
+                                                     run[RUN_SIZE:]]
+                self._lasts[position:position + 1] = [run[RUN_SIZE - 1],
+                                                      run[-1]]
+        self._length = self._length + 1
+
+    def remove(self, username):
+        """ (SortedUsernames, str) -> NoneType
+
+        Remove username. Raise KeyError if it is not here.
+        """
+
+        position = bisect.bisect_left(self._lasts, username)
+        if position < len(self._runs):
+            run = self._runs[position]
+            index = bisect.bisect_left(run, username)
+            if run[index] == username:
+                del run[index]
+                if len(run) == 0:
+                    del self._runs[position]
+                    del self._lasts[position]
+                else:
+                    self._lasts[position] = run[-1]
+                self._length = self._length - 1
+                return
+        raise KeyError(username)
+
+    def first(self, k):
+        """ (SortedUsernames, int) -> list of str
+
+        Return the first k usernames, in order.
+        """
+
+        usernames = []
+        for run in self._runs:
+            if len(usernames) + len(run) >= k:
+                usernames.extend(run[:k - len(usernames)])
+                break
+            usernames.extend(run)
+        return (usernames)
+
+
+class PopularityIndex:
+    """ Usernames ordered by follower count, most first, then by username.
+
+    >>> index = PopularityIndex({'a': 0, 'b': 2, 'c': 1, 'd': 2})
+    >>> index.top(3)
+    ['b', 'd', 'c']
+    >>> index.set_count('a', 3)
+    >>> index.remove('d')
+    >>> index.top(10)
+    ['a', 'b', 'c']
+    >>> index.sort_keys['c']
+    (-1, 'c')
+    """
+
+    def __init__(self, counts):
+        """ (PopularityIndex, dict of {str: int}) -> NoneType
+
+        Index the usernames in counts, each with its follower count.
+        """
+
+        self._counts = dict(counts)
+        self.sort_keys = SortKeys()
+        groups = {}
+        for username, count in self._counts.items():
+            self.sort_keys[username] = (-count, username)
+            group = groups.get(count)
+            if group is None:
+                groups[count] = [username]
+            else:
+                group.append(username)
+        self._groups = {count: SortedUsernames(groups[count])
+                        for count in groups}
+        # The follower counts that have a group, fewest first.
+        self._group_counts = sorted(self._groups)
+
+    def __len__(self):
+        """ (PopularityIndex) -> int """
+
+        return (len(self._counts))
+
+    def __contains__(self, username):
+        """ (PopularityIndex, object) -> bool """
+
+        return (username in self._counts)
+
+    def count(self, username):
+        """ (PopularityIndex, str) -> int
+
+        Return the follower count of username, 0 if it is not indexed.
+        """
+
+        return (self._counts.get(username, 0))
+
+    def set_count(self, username, count):
+        """ (PopularityIndex, str, int) -> NoneType
+
+        Index username with count followers, moving it if it is already
+        indexed.
+        """
+
+        old_count = self._counts.get(username)
+        if old_count == count:
+            return
+        if old_count is not None:
+            self._leave_group(username, old_count)
+        self._counts[username] = count
+        self.sort_keys[username] = (-count, username)
+        group = self._groups.get(count)
+        if group is None:
+            self._groups[count] = SortedUsernames([username])
+            bisect.insort(self._group_counts, count)
+        else:
+            group.add(username)
+
+    def remove(self, username):
+        """ (PopularityIndex, str) -> NoneType
+
+        Stop indexing username.
+        """
+
+        self._leave_group(username, self._counts.pop(username))
+        del self.sort_keys[username]
+
+    def _leave_group(self, username, count):
+        """ (PopularityIndex, str, int) -> NoneType
+
+        Take username out of the group of usernames with count followers.
+        """
+
+        group = self._groups[count]
+        group.remove(username)
+        if len(group) == 0:
+            del self._groups[count]
+            del self._group_counts[bisect.bisect_left(self._group_counts,
+                                                      count)]
+
+    def iter_popular(self):
+        """ (PopularityIndex) -> generator of str
+
+        Yield every indexed username, most popular first.
+        """
+
+        for count in reversed(self._group_counts):
+            for username in self._groups[count]:
+                yield (username)
+
+    def top(self, n):
+        """ (PopularityIndex, int) -> list of str
+
+        Return the n most popular indexed usernames, most popular first.
+        """
+
+        usernames = []
+        for count in reversed(self._group_counts):
+            if len(usernames) >= n:
+                break
+            usernames.extend(self._groups[count].first(n - len(usernames)))
+        return (usernames)
+
+
+def get_popularity_index(twitterverse_dict):
+    """ (dict of {str: dict of {str: object}}) -> PopularityIndex or \
+    NoneType
+
+    Return the PopularityIndex of the graph carried by twitterverse_dict, or
+    None if it does not carry a graph that keeps one.
+    """
+
+    graph = getattr(twitterverse_dict, "graph", None)
+    if graph is None or not hasattr(graph, "popularity_index"):
+        return (None)
+    return (graph.popularity_index())
+
+
+def current_popularity_index(twitterverse_dict):
+    """ (dict of {str: dict of {str: object}}) -> PopularityIndex or \
+    NoneType
+
+    Return the PopularityIndex of the graph carried by twitterverse_dict if
+    it has already been built, without building it.
+    """
+
+    graph = getattr(twitterverse_dict, "graph", None)
+    if graph is None or not hasattr(graph, "popularity_index"):
+        return (None)
+    return (graph.popularity_index(False))
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
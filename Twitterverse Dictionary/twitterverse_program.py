@@ -1,21 +1,243 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
 import twitterverse_functions as tf
+import twitterverse_binary as tb
+import twitterverse_index as ti
+import twitterverse_parallel as tp
+import twitterverse_metrics as tm
+import twitterverse_numpy as tn
+import twitterverse_plan as tq
+from twitterverse_cache import QueryCache
+
+def answer_query(data, query, cache=None):
+    """ (Twitterverse dictionary, Query dictionary, QueryCache) -> str
+
+    Return the presented results of query against data, going through cache
+    if one is given.
+    """
+
+    if cache is not None:
+        return cache.answer(data, query)
+    return tp.answer_query(data, query)
+
+
+def explain_query(data, query):
+    """ (Twitterverse dictionary, Query dictionary) -> str
+
+    Return the plan of query against data, with the number of users each
+    stage is expected to produce, or why the query is not valid.
+    """
+
+    try:
+        plan = tq.compile_query(query, data)
+    except ValueError as error:
+        return 'invalid query: ' + str(error)
+    return plan.explain(data)
+
+
+def query_filenames(query_source):
+    """ (str) -> list of str
+
+    Return the query files named by query_source: the file itself, every
+    file in it if it is a directory, or every file matching it if it is a
+    glob pattern, in sorted order.
+    """
+
+    if os.path.isdir(query_source):
+        return sorted(os.path.join(query_source, filename)
+                      for filename in os.listdir(query_source)
+                      if os.path.isfile(os.path.join(query_source, filename)))
+    if os.path.isfile(query_source):
+        return [query_source]
+    return sorted(filename for filename in glob.glob(query_source)
+                  if os.path.isfile(filename))
+
+
+def iter_batch_queries(query_sources):
+    """ (list of str) -> generator of Query dictionary
+
+    Yield every query in the query_sources, in order. A query file may hold
+    several queries one after the other.
+    """
+
+    for query_source in query_sources:
+        if query_source == '-':
+            for query in tf.iter_queries(sys.stdin):
+                yield query
+        else:
+            for query_filename in query_filenames(query_source):
+                query_file = open(query_filename, 'r')
+                for query in tf.iter_queries(query_file):
+                    yield query
+                query_file.close()
+
+
+def run_batch(data, query_sources, output_file, cache=None, executor=None,
+              explain=False):
+    """ (Twitterverse dictionary, list of str, file open for writing, \
+    QueryCache, ParallelQueryExecutor, bool) -> (int, float)
+
+    Answer every query in query_sources against data, writing each presented
+    result to output_file in order on its own lines, and return the number
+    of queries answered and the seconds it took. If an executor is given,
+    the queries are answered by its workers instead. If explain is True,
+    the plan of each query is written instead of its results.
+    """
+
+    query_count = 0
+    start = time.perf_counter()
+    queries = iter_batch_queries(query_sources)
+    if explain:
+        all_results = (explain_query(data, query) for query in queries)
+    elif executor is not None:
+        all_results = executor.imap(queries)
+    else:
+        all_results = (answer_query(data, query, cache) for query in queries)
+    for presented_results in all_results:
+        output_file.write(presented_results)
+        if not presented_results.endswith('\n'):
+            output_file.write('\n')
+        query_count = query_count + 1
+    return query_count, time.perf_counter() - start
+
+
+def positive_int(text):
+    """ (str) -> int
+
+    Return the whole number in text, for argparse. Raise
+    argparse.ArgumentTypeError if it is not at least 1.
+
+    >>> positive_int("4")
+    4
+    """
+
+    if not text.isdigit() or int(text) < 1:
+        raise argparse.ArgumentTypeError("not a positive whole number: " +
+                                         text)
+    return int(text)
+
+
+def batch_parser():
+    """ () -> ArgumentParser
+
+    Return the parser of the command line arguments that follow --batch.
+    """
+
+    parser = argparse.ArgumentParser(
+        prog="python twitterverse_program.py --batch",
+        description="Load the data file once and answer every query in the "
+                    "query sources, writing the results in order and "
+                    "reporting throughput on standard error.")
+    parser.add_argument("--processes", type=positive_int, metavar="N",
+                        help="parse the data file and answer the queries "
+                             "on N worker processes")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="write per-stage metrics to FILE as JSON")
+    parser.add_argument("--lazy", action="store_true",
+                        help="read webs and bios from the data file only "
+                             "when they are presented")
+    parser.add_argument("--records", action="store_true",
+                        help="keep users as slotted records")
+    parser.add_argument("--numpy", action="store_true",
+                        help="use NumPy arrays for popularity sorts and "
+                             "filters if NumPy is installed")
+    parser.add_argument("--explain", action="store_true",
+                        help="check each query and write its plan instead "
+                             "of its results")
+    parser.add_argument("data_file", metavar="DATA_FILE",
+                        help="a data file or a binary Twitterverse file")
+    parser.add_argument("query_sources", metavar="QUERY_SOURCE", nargs="+",
+                        help="a query file, a directory of query files, a "
+                             "glob pattern or - for queries on standard "
+                             "input")
+    return parser
+
+
+def batch_main(arguments):
+    """ (list of str) -> NoneType
+
+    Load the data file once and answer all the queries named in arguments,
+    reporting throughput on standard error.
+    """
+
+    parser = batch_parser()
+    options = parser.parse_args(arguments)
+    if options.lazy and (options.processes is not None or options.records):
+        parser.error("--lazy cannot be combined with --processes or "
+                     "--records")
+    if ((options.lazy or options.records or options.processes is not None)
+            and tb.is_binary_file(options.data_file)):
+        parser.error("--lazy, --records and --processes cannot be used with "
+                     "a binary data file")
+    if options.numpy and not tn.enable():
+        sys.stderr.write('NumPy is not installed; using the pure Python '
+                         'functions\n')
+    processes = options.processes
+    metrics_filename = options.metrics
+    explain = options.explain
+    data_filename = options.data_file
+    query_sources = options.query_sources
+    if metrics_filename is not None:
+        metrics = tm.start()
+    load_start = time.perf_counter()
+    data = tb.load_twitterverse(data_filename, processes, options.lazy,
+                                options.records)
+    ti.build_substring_indexes(data)
+    load_seconds = time.perf_counter() - load_start
+    cache = QueryCache()
+    if processes is None or explain:
+        query_count, query_seconds = run_batch(data, query_sources,
+                                               sys.stdout, cache,
+                                               explain=explain)
+    else:
+        with tp.ParallelQueryExecutor(data, data_filename,
+                                      processes) as executor:
+            query_count, query_seconds = run_batch(data, query_sources,
+                                                   sys.stdout,
+                                                   executor=executor)
+    sys.stdout.flush()
+    if query_seconds > 0:
+        rate = query_count / query_seconds
+    else:
+        rate = float('inf')
+    report = ('loaded data in {:.3f} s; answered {} queries in {:.3f} s '
+              '({:.1f} queries/s)'.format(load_seconds, query_count,
+                                         query_seconds, rate))
+    if explain:
+        report = report.replace('answered', 'explained')
+    elif processes is None:
+        report = report + '; cache hits {}, misses {}'.format(cache.hits,
+                                                              cache.misses)
+    else:
+        report = report + ' with {} processes'.format(processes)
+    sys.stderr.write(report + '\n')
+    if metrics_filename is not None:
+        tm.stop()
+        metrics_file = open(metrics_filename, 'w')
+        metrics_file.write(metrics.to_json() + '\n')
+        metrics_file.close()
+
 
 if __name__ == '__main__':
-    
+
+    if len(sys.argv) > 1 and sys.argv[1] == '--batch':
+        batch_main(sys.argv[2:])
+        sys.exit()
+
     data_filename = input('Data file: ')
-    data_file = open(data_filename, 'r')
-    data = tf.process_data(data_file)
-    data_file.close()
-    
+    data = tb.load_twitterverse(data_filename)
+
     query_filename = input('Query file: ')
     query_file = open(query_filename, 'r')
     query = tf.process_query(query_file)
     query_file.close()
-        
+
     search_results = tf.get_search_results(data, query['search'])
-    filtered_results = tf.get_filter_results(data, search_results, 
+    filtered_results = tf.get_filter_results(data, search_results,
                                              query['filter'])
-    presented_results = tf.get_present_string(data, filtered_results, 
-                                              query['present'])
-    
-    print(presented_results, end="")
+    tf.write_present_string(data, filtered_results, query['present'],
+                            sys.stdout)
@@ -0,0 +1,118 @@
+"""
+Friends-of-friends recommendations.
+
+Searching "following" twice finds the usernames two steps away from a user
+but drops how many of the user's followees lead to each of them, which is
+the best hint of whom the user would want to follow next. recommend counts,
+for every username two following steps away, how many of the user's
+followees follow it, leaves out the user and the usernames they already
+follow, and returns the ones with the highest counts, breaking ties by
+username as username_first does.
+
+The counts are accumulated in a Counter from each followee's following list,
+so a recommendation costs one pass over the following lists of the user's
+followees however many of them there are.
+
+In a query, the search operation "recommend*K" replaces each username with
+its top K recommendations, and "recommend" with its top
+DEFAULT_RECOMMENDATIONS.
+"""
+
+import collections
+import heapq
+
+DEFAULT_RECOMMENDATIONS = 10
+
+
+def parse_recommend(operation):
+    """ (str) -> int or NoneType
+
+    Return how many recommendations the search operation asks for, or None
+    if it is not a recommend operation. Raise ValueError if it is not well
+    formed.
+
+    >>> parse_recommend("recommend*5"), parse_recommend("recommend")
+    (5, 10)
+    >>> parse_recommend("following") is None
+    True
+    >>> parse_recommend("recommend*0")
+    Traceback (most recent call last):
+    ...
+    ValueError: not a recommend operation: recommend*0
+    """
+
+    if operation == "recommend":
+        return (DEFAULT_RECOMMENDATIONS)
+    if not operation.startswith("recommend*"):
+        return (None)
+    count = operation[len("recommend*"):]
+    if not count.isdigit() or int(count) < 1:
+        raise ValueError("not a recommend operation: " + operation)
+    return (int(count))
+
+
+def _following(twitterverse_dict, username):
+    """ (dict of {str: dict of {str: object}}, str) -> list of str
+
+    Return the usernames that username is following, or an empty list if
+    username is not a user.
+    """
+
+    if username in twitterverse_dict:
+        return (twitterverse_dict[username]["following"])
+    return ([])
+
+
+def common_neighbour_counts(twitterverse_dict, username):
+    """ (dict of {str: dict of {str: object}}, str) -> Counter of {str: int}
+
+    Return, for every username two following steps away from username,
+    other than username and the usernames it already follows, how many of
+    the usernames it follows are following it.
+
+    >>> twitter_data = {\
+    'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b', 'c']}, \
+    'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':['c', 'd', 'a']}, \
+    'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', 'following':['d', 'e', 'd']}}
+    >>> sorted(common_neighbour_counts(twitter_data, 'a').items())
+    [('d', 2), ('e', 1)]
+    """
+
+    followees = dict.fromkeys(_following(twitterverse_dict, username))
+    counts = collections.Counter()
+    for followee in followees:
+        # A followee counts once for each username, however many times its
+        # following list names it.
+        counts.update(set(_following(twitterverse_dict, followee)))
+    for known in followees:
+        counts.pop(known, None)
+    counts.pop(username, None)
+    return (counts)
+
+
+def recommend(twitterverse_dict, username, k):
+    """ (dict of {str: dict of {str: object}}, str, int) -> list of str
+
+    Return the k usernames that the most of username's followees follow,
+    leaving out username and the usernames it already follows. Usernames
+    followed by the same number of followees come in username order.
+
+    >>> twitter_data = {\
+    'a':{'name':'Zed', 'location':'', 'web':'', 'bio':'', 'following':['b', 'c']}, \
+    'b':{'name':'Lee', 'location':'', 'web':'', 'bio':'', 'following':['f', 'd']}, \
+    'c':{'name':'anna', 'location':'', 'web':'', 'bio':'', 'following':['d', 'e']}}
+    >>> recommend(twitter_data, 'a', 2)
+    ['d', 'e']
+    >>> recommend(twitter_data, 'b', 2)
+    []
+    """
+
+    counts = common_neighbour_counts(twitterverse_dict, username)
+    return (heapq.nsmallest(k, counts,
+                            key=lambda candidate: (-counts[candidate],
+                                                   candidate)))
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,262 @@
+"""
+A long-running asyncio query server that keeps a Twitterverse in memory.
+
+The server loads its data file once and then answers queries from any
+number of clients over TCP or a Unix socket. Queries run on an executor
+(threads by default, or worker processes) so that a slow query never blocks
+the event loop that serves the other clients.
+
+Protocol (line-delimited, UTF-8):
+    - a client sends a query in the query file format (SEARCH, username,
+      operations, FILTER, filters, PRESENT, sort-by line, format line and
+      an optional limit line), followed by a blank line
+    - the server replies with "OK <n>" and a newline, followed by the n bytes
+      of get_present_string output, or with "ERROR <message>" and a newline
+    - a client may send any number of queries on one connection
+
+Usage:
+    python twitterverse_server.py DATA_FILE [--port N | --unix PATH] \
+[--processes N]
+
+Run with --help for a description of each option.
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import io
+import sys
+
+import twitterverse_functions as tf
+import twitterverse_binary as tb
+import twitterverse_index as ti
+import twitterverse_parallel as tp
+from twitterverse_program import positive_int
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8707
+
+
+def parse_query_text(query_text):
+    """ (str) -> dict of {str: dict of {str: object}}
+
+    Return the query dictionary of query_text, which is in the query file
+    format. Raise ValueError if query_text is not a complete query, instead
+    of letting process_query read past its end.
+
+    >>> parse_query_text("SEARCH\\na\\nFILTER\\nPRESENT\\nsort-by name\\nformat long")
+    {'search': {'username': 'a', 'operations': []}, 'filter': {}, \
+'present': {'sort-by': 'name', 'format': 'long'}}
+    >>> parse_query_text("SEARCH\\na\\nFILTER\\n")
+    Traceback (most recent call last):
+    ...
+    ValueError: query has no PRESENT line
+    """
+
+    lines = [line.strip() for line in query_text.strip().split("\n")]
+    if len(lines) < 2 or lines[0] != "SEARCH":
+        raise ValueError("query does not start with SEARCH and a username")
+    if "FILTER" not in lines[2:]:
+        raise ValueError("query has no FILTER line")
+    filter_start = lines.index("FILTER", 2)
+    if "PRESENT" not in lines[filter_start:]:
+        raise ValueError("query has no PRESENT line")
+    present_start = lines.index("PRESENT", filter_start)
+    for line in lines[filter_start + 1:present_start]:
+        if line == "":
+            raise ValueError("query has an empty filter line")
+    if len(lines) < present_start + 3:
+        raise ValueError("query needs sort-by and format lines")
+    for line in lines[present_start + 1:]:
+        if len(line.split()) < 2:
+            raise ValueError("presentation line needs a name and a value")
+    return (tf.process_query(io.StringIO(query_text)))
+
+
+class TwitterverseServer:
+    """ An asyncio server that answers queries against one Twitterverse. """
+
+    def __init__(self, data, executor=None):
+        """ (TwitterverseServer, Twitterverse dictionary, Executor) -> \
+        NoneType
+
+        Serve queries against data, running them on executor. By default a
+        thread pool is used; a process pool must already hold the
+        Twitterverse in its workers (see shared_process_executor in
+        twitterverse_parallel).
+        """
+
+        self.data = data
+        self.processes = isinstance(executor,
+                                    concurrent.futures.ProcessPoolExecutor)
+        if executor is None:
+            executor = concurrent.futures.ThreadPoolExecutor()
+        self.executor = executor
+        self.queries_answered = 0
+
+    async def answer(self, query_text):
+        """ (TwitterverseServer, str) -> str
+
+        Return the presented results of the query in query_text, computed on
+        the executor.
+        """
+
+        query = parse_query_text(query_text)
+        loop = asyncio.get_running_loop()
+        if self.processes:
+            result = await loop.run_in_executor(
+                self.executor, tp.answer_shared_query, query)
+        else:
+            result = await loop.run_in_executor(
+                self.executor, tp.answer_query, self.data, query)
+        self.queries_answered = self.queries_answered + 1
+        return (result)
+
+    async def handle_client(self, reader, writer):
+        """ (TwitterverseServer, StreamReader, StreamWriter) -> NoneType
+
+        Answer the queries of one client until it disconnects.
+        """
+
+        try:
+            query_lines = []
+            while True:
+                line = await reader.readline()
+                if line.strip() != b"":
+                    query_lines.append(line)
+                    continue
+                if query_lines == []:
+                    if line == b"":
+                        break
+                    continue
+                query_text = b"".join(query_lines).decode("utf-8", "replace")
+                query_lines = []
+                try:
+                    result = (await self.answer(query_text)).encode("utf-8")
+                    writer.write(b"OK " + str(len(result)).encode() + b"\n")
+                    writer.write(result)
+                except Exception as error:
+                    # Any failure answers this query only; the client can
+                    # go on sending others on the same connection.
+                    message = " ".join(str(error).split()) or \
+                        type(error).__name__
+                    writer.write(("ERROR " + message + "\n").encode("utf-8"))
+                await writer.drain()
+                if line == b"":
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                    unix_path=None):
+        """ (TwitterverseServer, str, int, str) -> asyncio.Server
+
+        Start listening on unix_path if it is given, or else on host and
+        port, and return the asyncio server.
+        """
+
+        if unix_path is not None:
+            return (await asyncio.start_unix_server(self.handle_client,
+                                                    unix_path))
+        return (await asyncio.start_server(self.handle_client, host, port))
+
+
+async def ask(query_text, host=DEFAULT_HOST, port=DEFAULT_PORT,
+              unix_path=None):
+    """ (str, str, int, str) -> str
+
+    Send the query in query_text to a running server and return its
+    presented results. Raise ValueError if the server rejects the query.
+    """
+
+    if unix_path is not None:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    try:
+        return (await send_query(reader, writer, query_text))
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def send_query(reader, writer, query_text):
+    """ (StreamReader, StreamWriter, str) -> str
+
+    Send the query in query_text over an open connection and return the
+    presented results the server replies with.
+    """
+
+    writer.write(query_text.strip().encode("utf-8") + b"\n\n")
+    await writer.drain()
+    status = (await reader.readline()).decode("utf-8").rstrip("\n")
+    if status.startswith("OK "):
+        return ((await reader.readexactly(int(status[3:]))).decode("utf-8"))
+    if status.startswith("ERROR "):
+        raise ValueError(status[6:])
+    raise ConnectionError("unexpected reply from server: " + repr(status))
+
+
+async def serve(data_filename, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                unix_path=None, processes=None):
+    """ (str, str, int, str, int) -> NoneType
+
+    Load data_filename and serve queries against it until cancelled.
+    """
+
+    data = tb.load_twitterverse(data_filename)
+    ti.build_substring_indexes(data)
+    executor = None
+    if processes is not None:
+        executor = tp.shared_process_executor(data, data_filename, processes)
+    server = TwitterverseServer(data, executor)
+    listener = await server.start(host, port, unix_path)
+    where = unix_path or "{}:{}".format(host, port)
+    sys.stderr.write("serving {} users on {}\n".format(len(data), where))
+    async with listener:
+        await listener.serve_forever()
+
+
+def server_parser():
+    """ () -> ArgumentParser
+
+    Return the parser of the server's command line arguments.
+    """
+
+    parser = argparse.ArgumentParser(
+        prog="python twitterverse_server.py",
+        description="Load the data file once and answer queries from any "
+                    "number of clients until interrupted.")
+    parser.add_argument("data_file", metavar="DATA_FILE",
+                        help="Twitterverse data file, text or binary")
+    where = parser.add_mutually_exclusive_group()
+    where.add_argument("--port", type=int, default=DEFAULT_PORT, metavar="N",
+                       help="listen on TCP port N of {} (default {})".format(
+                           DEFAULT_HOST, DEFAULT_PORT))
+    where.add_argument("--unix", metavar="PATH",
+                       help="listen on the Unix socket PATH instead")
+    parser.add_argument("--processes", type=positive_int, metavar="N",
+                        help="answer queries on N worker processes instead "
+                             "of threads")
+    return parser
+
+
+def main(arguments):
+    """ (list of str) -> NoneType
+
+    Run the server as described by the command line arguments.
+    """
+
+    options = server_parser().parse_args(arguments)
+    try:
+        asyncio.run(serve(options.data_file, port=options.port,
+                          unix_path=options.unix,
+                          processes=options.processes))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
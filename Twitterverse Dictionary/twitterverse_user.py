@@ -0,0 +1,100 @@
+"""
+Slotted user records for Twitterverse dictionaries.
+
+A user dictionary is a dict of five keys, which costs far more memory than
+the five values it holds. A User keeps the same five fields in __slots__
+instead, and can be used anywhere a user dictionary is read or updated: it
+is a MutableMapping, so user["name"], user.get("bio"), dict(user) and
+user.update(fields) all work as they do on a dict.
+
+process_data(data_file, records=True) loads every user as a User.
+"""
+
+from collections.abc import MutableMapping
+
+# The fields of a user, in the order a data file lists them.
+USER_FIELDS = ("name", "location", "web", "bio", "following")
+_FIELD_SET = frozenset(USER_FIELDS)
+
+
+class User(MutableMapping):
+    """ A user dictionary stored as slots.
+
+    >>> user = User('Zed', 'Toronto', '', 'hi', ['b'])
+    >>> user['name'], user['following']
+    ('Zed', ['b'])
+    >>> user.update({'bio': 'hello'})
+    >>> user == {'name': 'Zed', 'location': 'Toronto', 'web': '', \
+'bio': 'hello', 'following': ['b']}
+    True
+    """
+
+    __slots__ = USER_FIELDS
+
+    def __init__(self, name, location, web, bio, following):
+        """ (User, str, str, str, str, list of str) -> NoneType """
+
+        self.name = name
+        self.location = location
+        self.web = web
+        self.bio = bio
+        self.following = following
+
+    @classmethod
+    def from_dict(cls, user):
+        """ (type, dict of {str: object}) -> User
+
+        Return a User with the fields of the user dictionary user.
+        """
+
+        return (cls(user["name"], user["location"], user["web"], user["bio"],
+                    user["following"]))
+
+    def __getitem__(self, key):
+        """ (User, str) -> object
+
+        Return the value of field key of this user.
+        """
+
+        if key in _FIELD_SET:
+            return (getattr(self, key))
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        """ (User, str, object) -> NoneType
+
+        Change the value of field key of this user.
+        """
+
+        if key in _FIELD_SET:
+            setattr(self, key, value)
+        else:
+            raise KeyError(key)
+
+    def __delitem__(self, key):
+        """ (User, str) -> NoneType
+
+        Fields of a user cannot be deleted.
+        """
+
+        raise TypeError("user fields cannot be deleted")
+
+    def __iter__(self):
+        """ (User) -> iterator of str """
+
+        return (iter(USER_FIELDS))
+
+    def __len__(self):
+        """ (User) -> int """
+
+        return (len(USER_FIELDS))
+
+    def __repr__(self):
+        """ (User) -> str """
+
+        return (repr(dict(self)))
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()